@@ -0,0 +1,74 @@
+"""Time loading, validating and copying the stored course dicts
+
+Usage: python benchmarks/models_benchmark.py [--courses N] [--modules N]
+
+Reports the time to load a synthetic course set from JSON, the extra cost
+of validating it (what every import pays on top of parsing), and the time
+of the snapshot copy taken on every save (copy_courses against copy.deepcopy).
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+# Add src to the Python path so we can import the database package
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from database import models
+
+def make_courses(course_count, module_count):
+    return {
+        f"Course {i}": {
+            "subcourses": {
+                f"Module {j}": {
+                    "completed": j % 2 == 0,
+                    "type": "Video",
+                    "created": "2024-01-01T09:00:00",
+                    "updated": "2024-01-02T09:00:00",
+                    "completion_date": "2024-01-02"
+                }
+                for j in range(module_count)
+            },
+            "description": f"Course number {i}",
+            "category": "Data Science",
+            "notes": "",
+            "_meta": {"created": "2024-01-01T09:00:00", "updated": "2024-01-02T09:00:00"}
+        }
+        for i in range(course_count)
+    }
+
+def best_time(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark validating and copying the course dicts")
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--modules", type=int, default=50)
+    args = parser.parse_args()
+
+    courses = make_courses(args.courses, args.modules)
+    payload = json.dumps(courses)
+    loaded = json.loads(payload)
+
+    rows = [
+        ("load from JSON", best_time(lambda: json.loads(payload))),
+        ("validate", best_time(lambda: models.validate_courses(loaded))),
+        ("encode to JSON", best_time(lambda: json.dumps(loaded))),
+        ("snapshot copy: deepcopy", best_time(lambda: copy.deepcopy(loaded))),
+        ("snapshot copy: copy_courses", best_time(lambda: models.copy_courses(loaded))),
+    ]
+    print(f"{args.courses} courses x {args.modules} modules")
+    for label, seconds in rows:
+        print(f"{label + ' (ms)':36}{seconds * 1000:8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Time the dashboard statistics: per-row Python loops vs the columnar module tables
+
+Usage: python benchmarks/module_table_benchmark.py [--courses N] [--modules N]
+
+The tables are built once per data version; a save of one course only
+replaces that course's rows, and every rerun after that only runs the
+vectorized statistics.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Add src to the Python path so we can import the utils package
+src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if src_dir not in sys.path:
+    sys.path.append(src_dir)
+
+from utils import module_table
+from models_benchmark import make_courses, best_time
+
+def loop_stats(courses):
+    """The statistics as the dashboard used to compute them, one course and module at a time"""
+    rows = []
+    for course_name, course_data in courses.items():
+        subcourses = course_data.get("subcourses", {})
+        total = len(subcourses)
+        completed = sum(1 for sub_data in subcourses.values() if sub_data.get("completed", False))
+        updated = datetime.fromisoformat(course_data["_meta"]["updated"]).strftime('%Y-%m-%d %H:%M')
+        rows.append((course_name, total, completed, completed / total * 100 if total else 0, updated))
+    return rows
+
+def table_stats(tables):
+    module_table.overall_stats(tables)
+    module_table.summary_frame(tables)
+    module_table.category_counts(tables)
+
+def fresh_table_stats(courses):
+    """Statistics right after a data change: build the tables, then derive everything once"""
+    table_stats(module_table.build_tables(courses))
+
+def saved_table_stats(tables, courses, course_name):
+    """Statistics right after a save that touched one course: patch its rows, then derive everything once"""
+    table_stats(module_table.update_tables(tables, courses, [course_name]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar module tables")
+    parser.add_argument("--courses", type=int, default=1000)
+    parser.add_argument("--modules", type=int, default=100)
+    args = parser.parse_args()
+
+    courses = make_courses(args.courses, args.modules)
+    tables = module_table.build_tables(courses)
+
+    print(f"{args.courses} courses x {args.modules} modules")
+    print(f"{'python loops per rerun (ms)':34}{best_time(lambda: loop_stats(courses)) * 1000:10.1f}")
+    print(f"{'tables + stats per version (ms)':34}{best_time(lambda: fresh_table_stats(courses)) * 1000:10.1f}")
+    table_stats(tables)
+    print(f"{'table stats per rerun (ms)':34}{best_time(lambda: table_stats(tables)) * 1000:10.1f}")
+
+    course_name = next(iter(courses))
+    module_name = next(iter(courses[course_name]["subcourses"]))
+    courses[course_name]["subcourses"][module_name]["completed"] = True
+    print(f"{'tables + stats per save (ms)':34}{best_time(lambda: saved_table_stats(tables, courses, course_name)) * 1000:10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 from pymongo import MongoClient
-import os
+from config.settings import settings
+
+_client = None
 
 def get_database():
-    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
-    db_name = os.getenv("DB_NAME", "course_tracker")
-    
-    client = MongoClient(mongo_uri)
-    return client[db_name]
\ No newline at end of file
+    """Return the configured database from one shared, pooled client"""
+    global _client
+    if _client is None:
+        _client = MongoClient(
+            settings.mongodb_uri,
+            maxPoolSize=settings.mongodb_max_pool_size,
+            minPoolSize=settings.mongodb_min_pool_size,
+            serverSelectionTimeoutMS=settings.mongodb_server_selection_timeout_ms,
+            connectTimeoutMS=settings.mongodb_connect_timeout_ms,
+            socketTimeoutMS=settings.mongodb_socket_timeout_ms,
+        )
+    return _client[settings.mongodb_db_name]
@@ -1,14 +1,151 @@
-from pydantic import BaseSettings
+"""Application settings, read once from the environment (and an optional .env file)
 
-class Settings(BaseSettings):
-    mongo_uri: str = "mongodb://localhost:27017/"
-    db_name: str = "course_tracker"
-    app_title: str = "Course Tracker"
+Every tunable lives here so a deployment can be adjusted without code
+changes; see .env.example for the variable names. Older variable names
+(MONGO_URI, DB_NAME, DATABASE_URL, DATABASE_NAME) are still honoured.
+"""
+from dataclasses import dataclass, fields
+import os
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _env(names, default, cast=str):
+    """First of ``names`` set in the environment, converted with ``cast`` (``default`` if none is set)"""
+    for name in names:
+        value = os.getenv(name)
+        if value is not None and value != "":
+            try:
+                return cast(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for {name}: {value!r}") from None
+    return default
+
+@dataclass(frozen=True)
+class Settings:
+    # MongoDB connection and pool
+    mongodb_uri: str = "mongodb://localhost:27017/"
+    mongodb_db_name: str = "course_tracker"
+    mongodb_max_pool_size: int = 20
+    mongodb_min_pool_size: int = 0
+    mongodb_server_selection_timeout_ms: int = 2000
+    mongodb_connect_timeout_ms: int = 2000
+    mongodb_socket_timeout_ms: int = 10000
+
+    # Circuit breaker - how long to skip MongoDB after a failed connection
+    circuit_cooldown_seconds: float = 15.0
+    circuit_max_cooldown_seconds: float = 300.0
+
+    # Storage: "document" or "normalized"; backend "mongo" (SQLite offline fallback) or "sqlite"
+    storage_mode: str = "document"
+    storage_backend: str = "mongo"
+    local_store_path: str = os.path.join(PROJECT_ROOT, "data", "course_tracker.db")
+
+    # Overview statistics: "client" (computed in the app) or "server" (database aggregation)
+    stats_mode: str = "client"
+
+    # Caches
+    course_cache_revalidate_seconds: float = 1.0
+    invalidation_bus: str = "change_stream"
+    invalidation_poll_seconds: float = 2.0
+    stats_ttl_seconds: float = 60.0
+
+    # Writes
+    write_behind_seconds: float = 1.0
+    write_behind_max_delay_seconds: float = 5.0
+    session_check_seconds: float = 2.0
+    replication_batch_size: int = 100
+    import_batch_size: int = 200
+    export_spool_bytes: int = 8 * 1024 * 1024
+    async_max_concurrency: int = 8
+
+    # Backups and paging
+    backup_checkpoint_interval: int = 10
+    backup_page_size: int = 20
+    module_page_size: int = 25
+
+    # Page
+    app_title: str = "DataCamp Course Tracker"
     app_icon: str = "📚"
     layout: str = "wide"
     initial_sidebar_state: str = "expanded"
 
-    class Config:
-        env_file = ".env"
+    # Kept for code written against the old settings object
+    @property
+    def mongo_uri(self):
+        return self.mongodb_uri
+
+    @property
+    def db_name(self):
+        return self.mongodb_db_name
+
+# Environment variable names for each setting, first match wins
+ENV_NAMES = {
+    "mongodb_uri": ("MONGODB_URI", "MONGO_URI", "DATABASE_URL"),
+    "mongodb_db_name": ("MONGODB_DB_NAME", "DB_NAME", "DATABASE_NAME"),
+    "mongodb_max_pool_size": ("MONGODB_MAX_POOL_SIZE",),
+    "mongodb_min_pool_size": ("MONGODB_MIN_POOL_SIZE",),
+    "mongodb_server_selection_timeout_ms": ("MONGODB_SERVER_SELECTION_TIMEOUT_MS",),
+    "mongodb_connect_timeout_ms": ("MONGODB_CONNECT_TIMEOUT_MS",),
+    "mongodb_socket_timeout_ms": ("MONGODB_SOCKET_TIMEOUT_MS",),
+    "circuit_cooldown_seconds": ("MONGODB_CIRCUIT_COOLDOWN_SECONDS",),
+    "circuit_max_cooldown_seconds": ("MONGODB_CIRCUIT_MAX_COOLDOWN_SECONDS",),
+    "storage_mode": ("COURSE_STORAGE_MODE",),
+    "storage_backend": ("COURSE_STORAGE_BACKEND",),
+    "local_store_path": ("LOCAL_STORE_PATH",),
+    "stats_mode": ("COURSE_STATS_MODE",),
+    "course_cache_revalidate_seconds": ("COURSE_CACHE_REVALIDATE_SECONDS",),
+    "invalidation_bus": ("COURSE_INVALIDATION_BUS",),
+    "invalidation_poll_seconds": ("COURSE_INVALIDATION_POLL_SECONDS",),
+    "stats_ttl_seconds": ("DATABASE_STATS_TTL_SECONDS",),
+    "write_behind_seconds": ("COURSE_WRITE_BEHIND_SECONDS",),
+    "write_behind_max_delay_seconds": ("COURSE_WRITE_BEHIND_MAX_DELAY_SECONDS",),
+    "session_check_seconds": ("COURSE_SESSION_CHECK_SECONDS",),
+    "replication_batch_size": ("REPLICATION_BATCH_SIZE",),
+    "import_batch_size": ("IMPORT_BATCH_SIZE",),
+    "export_spool_bytes": ("EXPORT_SPOOL_BYTES",),
+    "async_max_concurrency": ("ASYNC_MAX_CONCURRENCY",),
+    "backup_checkpoint_interval": ("BACKUP_CHECKPOINT_INTERVAL",),
+    "backup_page_size": ("BACKUP_PAGE_SIZE",),
+    "module_page_size": ("MODULE_PAGE_SIZE",),
+    "app_title": ("APP_TITLE",),
+    "app_icon": ("APP_ICON",),
+    "layout": ("APP_LAYOUT",),
+    "initial_sidebar_state": ("APP_SIDEBAR_STATE",),
+}
+
+# Allowed values of the settings that pick an implementation
+CHOICES = {
+    "storage_mode": ("document", "normalized"),
+    "storage_backend": ("mongo", "sqlite"),
+    "stats_mode": ("client", "server"),
+    "invalidation_bus": ("change_stream", "polling", "memory"),
+}
+
+def _check_choice(name, value):
+    if value not in CHOICES[name]:
+        variable = ENV_NAMES[name][0]
+        allowed = ", ".join(repr(choice) for choice in CHOICES[name])
+        raise ValueError(f"Invalid value for {variable}: {value!r} (expected one of {allowed})")
+
+def load_settings(env_file=None):
+    """Build Settings from the environment, after loading ``env_file`` (default: the project's .env)"""
+    if load_dotenv is not None:
+        # Variables already set in the environment take precedence over the file
+        load_dotenv(env_file or os.path.join(PROJECT_ROOT, ".env"), override=False)
+    values = {}
+    for field in fields(Settings):
+        values[field.name] = _env(ENV_NAMES[field.name], field.default, field.type)
+    for name in CHOICES:
+        _check_choice(name, values[name])
+    local_store_path = values["local_store_path"]
+    if not os.path.isabs(local_store_path):
+        # Relative paths are relative to the project, not to wherever streamlit was started
+        values["local_store_path"] = os.path.join(PROJECT_ROOT, local_store_path)
+    return Settings(**values)
 
-settings = Settings()
\ No newline at end of file
+settings = load_settings()
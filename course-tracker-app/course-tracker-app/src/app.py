@@ -6,18 +6,28 @@ import os
 current_dir = os.path.dirname(__file__)
 if current_dir not in sys.path:
     sys.path.append(current_dir)
+# ...and the project root for the shared settings in config/
+project_root = os.path.dirname(os.path.abspath(current_dir))
+if project_root not in sys.path:
+    sys.path.append(project_root)
 
 from components.dashboard import display_overall_dashboard
 from components.course_view import display_course_dashboard
 from components.sidebar import display_sidebar
-from database.mongodb_client import load_courses
+from database.mongodb_client import (
+    load_courses_with_version, sync_offline_changes, get_save_status, get_changed_course_ids, is_workspace_member
+)
+from database.read_cache import thaw
+from database.owners import DEFAULT_OWNER
+from utils.helpers import ensure_progress
+from config.settings import settings
 
 # --- App Configuration ---
 st.set_page_config(
-    page_title="DataCamp Course Tracker",
-    page_icon="📚",
-    layout="wide",
-    initial_sidebar_state="expanded"
+    page_title=settings.app_title,
+    page_icon=settings.app_icon,
+    layout=settings.layout,
+    initial_sidebar_state=settings.initial_sidebar_state
 )
 
 # --- Global CSS ---
@@ -103,9 +113,61 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def resolve_owner():
+    """Whose courses this session works on: a ?workspace= the signed-in user belongs to, the user, or the shared default"""
+    user = st.user.get("email") if getattr(st.user, "is_logged_in", False) else None
+    workspace = st.query_params.get("workspace")
+    if workspace and workspace != user:
+        # Checked once per session, user and workspace - not on every rerun
+        access_key = (user, workspace)
+        if st.session_state.get("workspace_access", (None, False))[0] != access_key:
+            allowed = user is not None and is_workspace_member(workspace, user)
+            st.session_state["workspace_access"] = (access_key, allowed)
+        if st.session_state["workspace_access"][1]:
+            return workspace
+        st.warning(f"⚠️ You are not a member of workspace '{workspace}' - showing your own courses")
+    return user or DEFAULT_OWNER
+
+# Every read and write below is scoped to this owner's data
+owner = resolve_owner()
+if st.session_state.get("owner") != owner:
+    st.session_state["owner"] = owner
+    # Switching workspace - the courses held so far belong to the previous owner
+    st.session_state.pop("courses", None)
+    st.session_state.pop("courses_version", None)
+
+# Send edits made while offline once MongoDB is reachable again
+sync_offline_changes()
+
+def refresh_session_courses():
+    """Pull in the courses other sessions or instances changed since this session loaded them"""
+    version, snapshot = load_courses_with_version()
+    since = st.session_state.get("courses_version")
+    if version is None or version == since:
+        return
+    
+    course_ids = get_changed_course_ids(since, version)
+    if course_ids is None:
+        st.session_state["courses"] = thaw(snapshot)
+    else:
+        courses = st.session_state["courses"]
+        for course_id in course_ids:
+            if course_id in snapshot:
+                courses[course_id] = thaw(snapshot[course_id])
+            else:
+                courses.pop(course_id, None)
+    ensure_progress(st.session_state["courses"])
+    st.session_state["courses_version"] = version
+
 # Initialize session state
 if "courses" not in st.session_state:
-    st.session_state["courses"] = load_courses()
+    version, courses = load_courses_with_version()
+    # Counters are kept up to date by the edit helpers; only data saved without them is recounted
+    st.session_state["courses"] = ensure_progress(thaw(courses))
+    st.session_state["courses_version"] = version
+elif get_save_status()["pending_writes"] == 0:
+    # Only while nothing is queued - a refresh must not overwrite edits still being saved
+    refresh_session_courses()
 
 def main():
     """Main application function"""
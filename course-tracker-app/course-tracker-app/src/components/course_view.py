@@ -1,11 +1,14 @@
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-from utils.helpers import calculate_course_progress, get_recent_activities
-from database.mongodb_client import save_courses
+from utils.helpers import (
+    calculate_course_progress, get_recent_activities,
+    add_module, delete_module, set_module_completed, set_all_modules_completed
+)
+from database.mongodb_client import save_courses, record_completions
+from utils.module_table import get_tables, module_type_counts, course_timeline
+from config.settings import settings
 
 def display_course_dashboard(course_name, course_data):
     """Display individual course dashboard"""
@@ -106,17 +109,15 @@ def display_course_dashboard(course_name, course_data):
                 st.form_submit_button("❌ Clear", use_container_width=True)
             
             if add_clicked and new_module:
-                if new_module not in subcourses:
-                    subcourses[new_module] = {
-                        "completed": False,
-                        "created": datetime.now().isoformat(),
-                        "updated": datetime.now().isoformat(),
-                        "type": module_type
-                    }
-                    
+                if add_module(course_data, new_module, {
+                    "completed": False,
+                    "created": datetime.now().isoformat(),
+                    "updated": datetime.now().isoformat(),
+                    "type": module_type
+                }):
                     # Update session state and save to database
-                    st.session_state["courses"][course_name]["subcourses"] = subcourses
-                    save_courses(st.session_state["courses"])
+                    st.session_state["courses"][course_name] = course_data
+                    save_courses(st.session_state["courses"], course_ids=[course_name])
                     
                     st.success(f"✅ Added module: {new_module}")
                     st.rerun()
@@ -134,17 +135,28 @@ def display_course_dashboard(course_name, course_data):
             with filter_col2:
                 show_pending = st.checkbox("Show Pending", value=True, key=f"show_pending_{course_name}")
             
+            # Apply filters (idx stays the module's position in the course, for stable widget keys)
+            visible_modules = [
+                (idx, module_name, module_data)
+                for idx, (module_name, module_data) in enumerate(subcourses.items())
+                if (show_completed if module_data.get("completed", False) else show_pending)
+            ]
+            
+            # Render one page of modules at a time - long courses otherwise build hundreds of widgets per rerun
+            page_size = max(1, settings.module_page_size)
+            page_count = max(1, -(-len(visible_modules) // page_size))
+            page = 1
+            if page_count > 1:
+                page = st.number_input(
+                    f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1,
+                    key=f"module_page_{course_name}"
+                )
+            page_modules = visible_modules[(page - 1) * page_size:page * page_size]
+            
             # Display modules
-            displayed_count = 0
-            for idx, (module_name, module_data) in enumerate(subcourses.items()):
+            for idx, module_name, module_data in page_modules:
                 is_completed = module_data.get("completed", False)
                 
-                # Apply filters
-                if (is_completed and not show_completed) or (not is_completed and not show_pending):
-                    continue
-                
-                displayed_count += 1
-                
                 # Module row with unique keys
                 col_check, col_content, col_actions = st.columns([0.5, 8, 1.5])
                 
@@ -213,26 +225,23 @@ def display_course_dashboard(course_name, course_data):
                 
                 with col_actions:
                     if st.button("🗑️", key=delete_key, help="Delete module"):
-                        del subcourses[module_name]
-                        st.session_state["courses"][course_name]["subcourses"] = subcourses
-                        save_courses(st.session_state["courses"])
+                        delete_module(course_data, module_name)
+                        st.session_state["courses"][course_name] = course_data
+                        save_courses(st.session_state["courses"], course_ids=[course_name])
                         st.rerun()
                 
                 # Update completion status if changed
                 if completed != is_completed:
-                    subcourses[module_name]["completed"] = completed
-                    subcourses[module_name]["updated"] = datetime.now().isoformat()
+                    set_module_completed(course_data, module_name, completed)
+                    record_completions([(course_name, module_name, completed)])
                     if completed:
-                        subcourses[module_name]["completion_date"] = datetime.now().strftime("%Y-%m-%d")
                         st.balloons()  # Celebration effect
-                    elif "completion_date" in subcourses[module_name]:
-                        del subcourses[module_name]["completion_date"]
                     
-                    st.session_state["courses"][course_name]["subcourses"] = subcourses
-                    save_courses(st.session_state["courses"])
+                    st.session_state["courses"][course_name] = course_data
+                    save_courses(st.session_state["courses"], course_ids=[course_name])
                     st.rerun()
             
-            if displayed_count == 0:
+            if not visible_modules:
                 st.info("No modules match the selected filters.")
                 
         else:
@@ -249,30 +258,26 @@ def display_course_dashboard(course_name, course_data):
         st.markdown("### 📈 Progress Analytics")
         
         if subcourses:
-            # Progress over time (mock data)
+            # Progress over time, from the modules' completion dates
             st.markdown("#### 📅 Learning Timeline")
             
-            # Generate mock progress data
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=30)
-            date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-            
-            # Simulate cumulative progress
-            daily_progress = np.random.choice([0, 1, 2], size=len(date_range), p=[0.7, 0.25, 0.05])
-            cumulative_progress = np.cumsum(daily_progress)
-            max_progress = max(cumulative_progress) if max(cumulative_progress) > 0 else 1
-            normalized_progress = (cumulative_progress / max_progress) * progress["percentage"]
-            
-            progress_df = pd.DataFrame({
-                'Date': date_range,
-                'Progress': normalized_progress
-            })
+            timeline_days = st.radio(
+                "Timeline range",
+                [7, 30, 365],
+                index=1,
+                format_func=lambda days: f"{days} days",
+                horizontal=True,
+                label_visibility="collapsed",
+                key=f"timeline_range_{course_name}"
+            )
+            progress_df = course_timeline(get_tables(st.session_state["courses"]), course_name, timeline_days)
             
             timeline_fig = px.line(
                 progress_df,
                 x='Date',
                 y='Progress',
-                title='30-Day Progress Timeline',
+                title=f'{timeline_days}-Day Progress Timeline',
+                hover_data={'Completed': True},
                 color_discrete_sequence=['#2563EB']
             )
             
@@ -290,8 +295,7 @@ def display_course_dashboard(course_name, course_data):
             # Module types breakdown
             st.markdown("#### 🏷️ Module Types")
             
-            module_types = [data.get("type", "Module") for data in subcourses.values()]
-            type_counts = pd.Series(module_types).value_counts()
+            type_counts = module_type_counts(get_tables(st.session_state["courses"]), course_name)
             
             types_fig = px.pie(
                 values=type_counts.values,
@@ -359,26 +363,19 @@ def display_course_dashboard(course_name, course_data):
         
         # Bulk action buttons
         if st.button("✅ Mark All Complete", use_container_width=True, type="primary", key=mark_complete_key):
-            for module_name in subcourses:
-                subcourses[module_name]["completed"] = True
-                subcourses[module_name]["updated"] = datetime.now().isoformat()
-                subcourses[module_name]["completion_date"] = datetime.now().strftime("%Y-%m-%d")
-            
-            st.session_state["courses"][course_name]["subcourses"] = subcourses
-            save_courses(st.session_state["courses"])
+            changed = set_all_modules_completed(course_data, True)
+            record_completions([(course_name, module_name, True) for module_name in changed])
+            st.session_state["courses"][course_name] = course_data
+            save_courses(st.session_state["courses"], course_ids=[course_name])
             st.success("🎉 All modules completed!")
             st.balloons()
             st.rerun()
         
         if st.button("↺ Reset All Progress", use_container_width=True, key=reset_progress_key):
-            for module_name in subcourses:
-                subcourses[module_name]["completed"] = False
-                subcourses[module_name]["updated"] = datetime.now().isoformat()
-                if "completion_date" in subcourses[module_name]:
-                    del subcourses[module_name]["completion_date"]
-            
-            st.session_state["courses"][course_name]["subcourses"] = subcourses
-            save_courses(st.session_state["courses"])
+            changed = set_all_modules_completed(course_data, False)
+            record_completions([(course_name, module_name, False) for module_name in changed])
+            st.session_state["courses"][course_name] = course_data
+            save_courses(st.session_state["courses"], course_ids=[course_name])
             st.success("↺ Progress reset!")
             st.rerun()
         
@@ -428,7 +425,7 @@ def display_course_dashboard(course_name, course_data):
         # Auto-save notes when changed
         if notes != course_data.get("notes", ""):
             st.session_state["courses"][course_name]["notes"] = notes
-            save_courses(st.session_state["courses"])
+            save_courses(st.session_state["courses"], course_ids=[course_name])
         
         # Recent course activity
         st.markdown("---")
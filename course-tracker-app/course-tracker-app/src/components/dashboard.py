@@ -4,7 +4,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
-from utils.helpers import calculate_course_stats, calculate_course_progress
+from database.mongodb_client import get_learning_stats, get_course_aggregates, get_course_summary, STATS_MODE
+from utils.module_table import get_tables, get_aggregate_tables, category_counts, summary_frame
 
 def display_overall_dashboard(courses):
     """Display the main overview dashboard"""
@@ -14,19 +15,30 @@ def display_overall_dashboard(courses):
         st.warning("🎯 No courses added yet. Add your first course from the sidebar!")
         return
     
-    # Get overall statistics
-    stats = calculate_course_stats(courses)
+    # Overall statistics come from the summary stored with the data, charts from the cached tables
+    stats = get_course_summary()
+    pending = stats.get("pending", False)
+    if STATS_MODE == "server":
+        aggregates = get_course_aggregates()
+        pending = pending or aggregates.get("pending", False)
+        tables = get_aggregate_tables(aggregates)
+    else:
+        tables = get_tables(courses)
+    course_table = tables["courses"]
     
     # === TOP METRICS SECTION ===
     st.markdown("### 📊 Key Learning Metrics")
+    if pending:
+        st.caption("⏳ Saving your latest edits - the totals and charts will include them in a moment")
     
     # Create 4-column metrics row
     col1, col2, col3, col4 = st.columns(4)
     
     # Calculate additional metrics
-    weekly_completed = 5  # Mock data - could be calculated from timestamps
+    learning = get_learning_stats()
+    weekly_completed = learning["completed_this_week"]
     avg_completion = stats["progress_percentage"]
-    streak_days = 15  # Mock data
+    streak_days = learning["streak_days"]
     
     metric_cards = [
         {"title": "Total Courses", "value": str(stats["total_courses"]), "delta": "Active", "color": "#2563EB"},
@@ -72,18 +84,15 @@ def display_overall_dashboard(courses):
         st.markdown("### 📈 Course Progress Overview")
         
         # Prepare data for horizontal bar chart
-        course_progress_data = []
-        for course_name, course_data in courses.items():
-            progress = calculate_course_progress(course_data)
-            course_progress_data.append({
-                'course_name': course_name[:30] + "..." if len(course_name) > 30 else course_name,
-                'completion_percentage': progress["percentage"],
-                'completed_count': progress["completed"],
-                'total_count': progress["total"]
-            })
+        names = course_table["course"]
+        df_progress = pd.DataFrame({
+            'course_name': names.where(names.str.len() <= 30, names.str.slice(0, 30) + "..."),
+            'completion_percentage': course_table["percentage"],
+            'completed_count': course_table["completed"],
+            'total_count': course_table["total"]
+        })
         
-        if course_progress_data:
-            df_progress = pd.DataFrame(course_progress_data)
+        if not df_progress.empty:
             
             # Create horizontal bar chart
             fig = px.bar(
@@ -164,27 +173,13 @@ def display_overall_dashboard(courses):
         st.markdown("#### 📊 Course Categories")
         
         # Categorize courses based on names
-        categories = []
-        for course_name in courses.keys():
-            if "Data Scientist" in course_name:
-                categories.append("Data Science")
-            elif "SQL" in course_name or "Analyst" in course_name:
-                categories.append("Analytics")
-            elif "ML" in course_name or "Machine Learning" in course_name:
-                categories.append("ML/AI")
-            elif "Power BI" in course_name or "BI" in course_name:
-                categories.append("Business Intelligence")
-            elif "Python" in course_name:
-                categories.append("Programming")
-            else:
-                categories.append("General")
+        categories = category_counts(tables)
         
-        if categories:
-            category_counts = pd.Series(categories).value_counts()
+        if not categories.empty:
             
             category_fig = px.pie(
-                values=category_counts.values,
-                names=category_counts.index,
+                values=categories.values,
+                names=categories.index,
                 color_discrete_sequence=[
                     '#2563EB', '#10B981', '#F59E0B', 
                     '#EF4444', '#8B5CF6', '#06B6D4'
@@ -204,33 +199,9 @@ def display_overall_dashboard(courses):
     st.markdown("---")
     st.markdown("### 📋 Detailed Course Summary")
     
-    summary_data = []
-    for course_name, course_data in courses.items():
-        progress = calculate_course_progress(course_data)
-        last_updated = course_data.get("_meta", {}).get("updated", "N/A")
-        
-        # Format last updated date
-        if last_updated != "N/A" and isinstance(last_updated, str):
-            try:
-                dt = datetime.fromisoformat(last_updated.replace('Z', '+00:00'))
-                formatted_date = dt.strftime('%Y-%m-%d %H:%M')
-            except:
-                formatted_date = last_updated
-        else:
-            formatted_date = "N/A"
-        
-        summary_data.append({
-            "📚 Course Name": course_name,
-            "📊 Total Modules": progress["total"],
-            "✅ Completed": progress["completed"],
-            "📈 Progress": f"{progress['percentage']:.1f}%",
-            "🕒 Last Updated": formatted_date,
-            "📝 Description": course_data.get('description', 'No description')[:50] + "..." if len(course_data.get('description', '')) > 50 else course_data.get('description', 'No description')
-        })
+    summary_df = summary_frame(tables)
     
-    if summary_data:
-        summary_df = pd.DataFrame(summary_data)
-        
+    if not summary_df.empty:
         # Style the dataframe
         st.dataframe(
             summary_df,
@@ -267,7 +238,10 @@ def display_overall_dashboard(courses):
                 • Overall Progress: {stats['progress_percentage']:.1f}%
                 
                 📋 Course Details:
-                """ + "\n".join([f"• {row['📚 Course Name']}: {row['✅ Completed']}/{row['📊 Total Modules']} ({row['📈 Progress']})" for _, row in summary_df.iterrows()])
+                """ + "\n".join(
+                    "• " + summary_df["📚 Course Name"] + ": " + summary_df["✅ Completed"].astype(str)
+                    + "/" + summary_df["📊 Total Modules"].astype(str) + " (" + summary_df["📈 Progress"] + ")"
+                )
                 
                 st.text_area("Copy this report:", value=summary_text, height=200)
         
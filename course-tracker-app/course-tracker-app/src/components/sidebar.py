@@ -2,8 +2,12 @@ import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
 from datetime import datetime
-from utils.helpers import calculate_course_stats
-from database.mongodb_client import save_courses
+from utils.analytics import get_analytics
+from database.mongodb_client import (
+    save_courses, get_save_status, get_sync_state, export_to_ndjson_file, import_from_json, get_learning_stats,
+    get_course_summary
+)
+from database import async_client
 
 def display_sidebar():
     """Display the sidebar with controls and course management"""
@@ -35,9 +39,23 @@ def display_sidebar():
         </div>
         """, unsafe_allow_html=True)
         
-        # Quick Stats Panel
+        # Save status from the write-behind queue
+        save_status = get_save_status()
+        if save_status["state"] == "pending":
+            st.caption("⏳ Saving changes...")
+        elif save_status["state"] == "error":
+            st.caption(f"⚠️ Changes pending sync: {save_status['error']}")
+        elif save_status["last_saved"] is not None:
+            st.caption(f"✅ All changes saved at {save_status['last_saved'].strftime('%H:%M:%S')}")
+        if save_status["offline_changes"]:
+            st.caption(f"📴 {save_status['offline_changes']} offline changes will sync when MongoDB reconnects")
+        sync_conflicts = get_sync_state()["conflicts"]
+        if sync_conflicts:
+            st.warning(f"⚠️ Offline edits to {', '.join(sync_conflicts)} conflicted with newer changes - the database version was kept")
+        
+        # Quick Stats Panel (from the summary maintained on every save)
         all_courses = st.session_state["courses"]
-        stats = calculate_course_stats(all_courses)
+        stats = get_course_summary()
         
         st.markdown("""
         <div style='
@@ -54,13 +72,16 @@ def display_sidebar():
             st.metric("Courses", value=str(stats["total_courses"]), delta="Active")
         with col2:
             st.metric("Completed", value=f"{stats['completed_modules']}/{stats['total_modules']}")
+        if stats.get("pending"):
+            st.caption("⏳ Latest edits are still saving")
         
         col3, col4 = st.columns(2)
         with col3:
             st.metric("Progress", value=f"{stats['progress_percentage']:.0f}%")
         with col4:
-            streak_days = 12  # Mock data
-            st.metric("Streak", value=f"{streak_days}d", delta="2")
+            learning = get_learning_stats()
+            completed_today = learning["completed_today"]
+            st.metric("Streak", value=f"{learning['streak_days']}d", delta=f"+{completed_today} today" if completed_today else None)
         
         st.markdown("</div>", unsafe_allow_html=True)
         
@@ -122,24 +143,23 @@ def display_sidebar():
         with export_col1:
             if st.button("📁 CSV", use_container_width=True):
                 # Generate CSV export
-                export_data = []
-                for course_name, course_data in all_courses.items():
-                    subcourses = course_data.get("subcourses", {})
-                    total_modules = len(subcourses)
-                    completed_modules = sum(1 for sub_data in subcourses.values() if sub_data.get("completed", False))
-                    progress_pct = (completed_modules / total_modules * 100) if total_modules > 0 else 0
-                    
-                    export_data.append({
-                        "Course Name": course_name,
-                        "Description": course_data.get("description", ""),
-                        "Total Modules": total_modules,
-                        "Completed Modules": completed_modules,
-                        "Progress %": f"{progress_pct:.1f}%",
-                        "Last Updated": course_data.get("_meta", {}).get("updated", "N/A")
-                    })
+                course_rows = get_analytics(all_courses).courses
+                df_export = pd.DataFrame(
+                    [
+                        {
+                            "Course Name": course_name,
+                            "Description": course["description"],
+                            "Total Modules": course["total"],
+                            "Completed Modules": course["completed"],
+                            "Progress %": f"{course['percentage']:.1f}%",
+                            "Last Updated": course["updated"] or "N/A"
+                        }
+                        for course_name, course in course_rows.items()
+                    ],
+                    columns=["Course Name", "Description", "Total Modules", "Completed Modules", "Progress %", "Last Updated"]
+                )
                 
-                if export_data:
-                    df_export = pd.DataFrame(export_data)
+                if not df_export.empty:
                     csv = df_export.to_csv(index=False)
                     
                     st.download_button(
@@ -168,16 +188,42 @@ def display_sidebar():
                     "📋 Course Details:"
                 ]
                 
-                for course_name, course_data in all_courses.items():
-                    subcourses = course_data.get("subcourses", {})
-                    total = len(subcourses)
-                    completed = sum(1 for sub_data in subcourses.values() if sub_data.get("completed", False))
-                    progress_pct = (completed / total * 100) if total > 0 else 0
-                    report_lines.append(f"• {course_name}: {completed}/{total} ({progress_pct:.0f}%)")
+                report_lines.extend(
+                    f"• {course['course']}: {course['completed']}/{course['total']} ({course['percentage']:.0f}%)"
+                    for course in stats["courses"]
+                )
                 
                 report_text = "\n".join(report_lines)
                 st.text_area("Progress Report:", value=report_text, height=200, help="Copy this report")
         
+        if st.button("🗄️ Full Data Export", use_container_width=True, help="All courses and modules as gzipped NDJSON"):
+            export_file = export_to_ndjson_file(compress=True)
+            if export_file is not None:
+                st.download_button(
+                    label="📥 Download NDJSON",
+                    data=export_file,
+                    file_name=f"datacamp_courses_{datetime.now().strftime('%Y%m%d')}.ndjson.gz",
+                    mime="application/gzip",
+                    use_container_width=True
+                )
+        
+        uploaded_file = st.file_uploader(
+            "Import data",
+            type=["json", "ndjson", "gz"],
+            help="Replaces all courses with a JSON or NDJSON export (a backup is created first)",
+            key="import_file"
+        )
+        if uploaded_file is not None and st.button("📥 Import", use_container_width=True):
+            progress_bar = st.progress(0.0, text="Importing courses...")
+            
+            def update_progress(imported, fraction):
+                progress_bar.progress(min(fraction or 0.0, 1.0), text=f"Imported {imported} courses...")
+            
+            if import_from_json(uploaded_file, progress_callback=update_progress):
+                # app.py reloads the session's courses on the next run
+                st.session_state.pop("courses", None)
+                st.rerun()
+        
         # Course Management Section
         st.markdown("---")
         st.markdown("### ➕ Add New Course")
@@ -196,6 +242,7 @@ def display_sidebar():
                     # Add new course to session state
                     all_courses[new_course_name] = {
                         "subcourses": {},
+                        "_progress": {"total": 0, "completed": 0},
                         "description": new_course_desc,
                         "category": course_category,
                         "notes": "",
@@ -207,7 +254,7 @@ def display_sidebar():
                     
                     # Update session state and save to database
                     st.session_state["courses"] = all_courses
-                    save_courses(all_courses)
+                    save_courses(all_courses, course_ids=[new_course_name])
                     
                     st.success(f"✅ Added course: {new_course_name}")
                     st.rerun()
@@ -234,12 +281,44 @@ def display_sidebar():
                 if st.button("🗑️ Delete Course", use_container_width=True, type="secondary"):
                     del all_courses[course_to_delete]
                     st.session_state["courses"] = all_courses
-                    save_courses(all_courses)
+                    save_courses(all_courses, course_ids=[course_to_delete])
                     st.success(f"🗑️ Deleted: {course_to_delete}")
                     st.rerun()
         else:
             st.info("No courses to manage")
         
+        # Database Section - stats (cached) and the latest backups are fetched concurrently
+        db_stats, recent_backups = async_client.gather(
+            async_client.get_database_stats(),
+            async_client.get_backup_list(page_size=5)
+        )
+        if db_stats:
+            with st.expander("🗄️ Database"):
+                st.caption(f"Updated {db_stats['refreshed_at'].strftime('%H:%M:%S')}")
+                st.progress(
+                    min(db_stats["main_document_usage"], 1.0),
+                    text=f"Course document: {db_stats['main_document_size'] / 1024:.0f} KB of 16 MB"
+                )
+                if db_stats["main_document_usage"] >= 0.8:
+                    st.warning("⚠️ The main course document is close to MongoDB's 16 MB limit - consider normalized storage")
+                st.dataframe(
+                    pd.DataFrame([
+                        {
+                            "Collection": name,
+                            "Documents": stats["documents"],
+                            "Size (KB)": round(stats["size"] / 1024, 1),
+                            "Avg Doc (B)": round(stats["avg_document_size"])
+                        }
+                        for name, stats in db_stats["collection_stats"].items()
+                    ]),
+                    hide_index=True,
+                    use_container_width=True
+                )
+                if recent_backups:
+                    st.markdown("**Latest backups:**")
+                    for backup in recent_backups:
+                        st.caption(f"💾 {backup['formatted_date']} ({backup['kind']})")
+        
         # Study Goals Section
         st.markdown("---")
         st.markdown("### 🎯 Daily Goals")
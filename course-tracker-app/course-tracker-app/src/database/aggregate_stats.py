@@ -0,0 +1,111 @@
+"""Course statistics computed by the database instead of in the app
+
+Returns per-course module counts and per-type totals - a few hundred bytes
+per course - so the overview doesn't need every module pulled into the
+Streamlit process. Both storage modes are covered: the course document is
+aggregated with one pipeline, the normalized collections use their stored
+per-course counters plus a group-by over the modules.
+
+Result shape (shared with ``SQLiteStore.course_aggregates``)::
+
+    {"courses": [{"course", "description", "category", "updated", "total", "completed"}, ...],
+     "types": [{"type", "total", "completed"}, ...]}
+"""
+from pymongo import ASCENDING
+
+COURSE_FIELDS = ("course", "description", "category", "updated", "total", "completed")
+
+def _completed_flag(path):
+    # Only a stored boolean true counts, as in the app
+    return {"$eq": [path, True]}
+
+def document_pipeline(doc_id):
+    """Pipeline over the owner's course document yielding one ``{"courses", "types"}`` result"""
+    return [
+        {"$match": {"_id": doc_id}},
+        {"$project": {"_id": 0, "course": {"$objectToArray": {"$ifNull": ["$courses", {}]}}}},
+        {"$unwind": {"path": "$course", "includeArrayIndex": "position"}},
+        {"$project": {
+            "position": 1,
+            "course": "$course.k",
+            "description": "$course.v.description",
+            "category": "$course.v.category",
+            "updated": "$course.v._meta.updated",
+            "modules": {"$map": {
+                "input": {"$objectToArray": {"$ifNull": ["$course.v.subcourses", {}]}},
+                "as": "module",
+                "in": {
+                    "type": {"$ifNull": ["$$module.v.type", "Module"]},
+                    "completed": _completed_flag("$$module.v.completed")
+                }
+            }}
+        }},
+        {"$facet": {
+            "courses": [
+                {"$project": {
+                    "position": 1,
+                    "course": 1,
+                    "description": 1,
+                    "category": 1,
+                    "updated": 1,
+                    "total": {"$size": "$modules"},
+                    "completed": {"$size": {"$filter": {"input": "$modules", "as": "module", "cond": "$$module.completed"}}}
+                }},
+                {"$sort": {"position": 1}}
+            ],
+            "types": [
+                {"$unwind": "$modules"},
+                {"$group": {
+                    "_id": "$modules.type",
+                    "total": {"$sum": 1},
+                    "completed": {"$sum": {"$cond": ["$modules.completed", 1, 0]}}
+                }}
+            ]
+        }}
+    ]
+
+def _course_row(doc):
+    return {field: doc.get(field) for field in COURSE_FIELDS}
+
+def _type_row(doc):
+    return {"type": doc["_id"], "total": doc["total"], "completed": doc["completed"]}
+
+def collect_document(db, doc_id):
+    """Aggregates of one course document (document storage mode)"""
+    result = next(db["courses"].aggregate(document_pipeline(doc_id)), None)
+    if result is None:
+        return {"courses": [], "types": []}
+    return {
+        "courses": [_course_row(doc) for doc in result["courses"]],
+        "types": [_type_row(doc) for doc in result["types"]]
+    }
+
+def collect_normalized(db, owner, course_collection, module_collection):
+    """Aggregates of one owner's normalized courses, from the counters stored on each course"""
+    courses = db[course_collection].find(
+        {"owner": owner},
+        {"_id": 0, "name": 1, "description": 1, "category": 1, "_meta.updated": 1,
+         "total_modules": 1, "completed_modules": 1}
+    ).sort("position", ASCENDING)
+    types = db[module_collection].aggregate([
+        {"$match": {"owner": owner}},
+        {"$group": {
+            "_id": {"$ifNull": ["$type", "Module"]},
+            "total": {"$sum": 1},
+            "completed": {"$sum": {"$cond": [_completed_flag("$completed"), 1, 0]}}
+        }}
+    ])
+    return {
+        "courses": [
+            {
+                "course": doc["name"],
+                "description": doc.get("description"),
+                "category": doc.get("category"),
+                "updated": doc.get("_meta", {}).get("updated"),
+                "total": doc.get("total_modules", 0),
+                "completed": doc.get("completed_modules", 0)
+            }
+            for doc in courses
+        ],
+        "types": [_type_row(doc) for doc in types]
+    }
@@ -0,0 +1,104 @@
+"""Asyncio data-access layer over the MongoDB client
+
+Each operation of ``mongodb_client`` is available here as a coroutine
+function, so independent calls can run concurrently::
+
+    stats, backups = gather(get_database_stats(), get_backup_list(page_size=5))
+
+Each call runs on a worker thread against the process-wide (thread-safe)
+MongoClient pool, coordinated by one event loop in a background thread. Streamlit
+code stays synchronous and uses :func:`run` / :func:`gather` as the bridge;
+the caller's script context travels with each call so ``st.error`` and
+friends still render in the right session.
+"""
+from streamlit.runtime.scriptrunner import get_script_run_ctx, add_script_run_ctx
+import asyncio
+import atexit
+import functools
+import threading
+from config.settings import settings
+from database import mongodb_client
+
+# Upper bound on database calls running at once through this layer
+ASYNC_MAX_CONCURRENCY = settings.async_max_concurrency
+
+_slots = threading.BoundedSemaphore(ASYNC_MAX_CONCURRENCY)
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    """Return the background event loop, starting it on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="db-event-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+def _shutdown():
+    with _loop_lock:
+        if _loop is not None:
+            _loop.call_soon_threadsafe(_loop.stop)
+
+atexit.register(_shutdown)
+
+def _resolve(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+async def _run_in_thread(ctx, fn, args, kwargs):
+    """Run a blocking call on its own worker thread, attached to the caller's script context"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def target():
+        result, error = None, None
+        with _slots:
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                error = e
+        loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    thread = threading.Thread(target=target, name="db-async", daemon=True)
+    if ctx is not None:
+        add_script_run_ctx(thread, ctx)
+    thread.start()
+    return await future
+
+def _operation(fn):
+    """Expose a blocking mongodb_client operation as a coroutine function"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # Captured here, in the caller's thread - the coroutine body runs on the loop thread
+        return _run_in_thread(get_script_run_ctx(), fn, args, kwargs)
+    return wrapper
+
+load_courses = _operation(mongodb_client.load_courses)
+save_courses = _operation(mongodb_client.save_courses)
+backup_data = _operation(mongodb_client.backup_data)
+restore_data = _operation(mongodb_client.restore_data)
+get_backup_page = _operation(mongodb_client.get_backup_page)
+get_backup_list = _operation(mongodb_client.get_backup_list)
+delete_backup = _operation(mongodb_client.delete_backup)
+get_database_stats = _operation(mongodb_client.get_database_stats)
+get_course_aggregates = _operation(mongodb_client.get_course_aggregates)
+get_course_summary = _operation(mongodb_client.get_course_summary)
+export_to_ndjson_file = _operation(mongodb_client.export_to_ndjson_file)
+import_from_json = _operation(mongodb_client.import_from_json)
+check_connection = _operation(mongodb_client.check_connection)
+
+def run(coro, timeout=None):
+    """Run a coroutine on the background loop from synchronous code and return its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+def gather(*coros, timeout=None):
+    """Run coroutines concurrently from synchronous code; returns their results in order"""
+    async def _gather():
+        return await asyncio.gather(*coros)
+    return run(_gather(), timeout)
@@ -0,0 +1,225 @@
+"""Incremental, compressed course backups
+
+Each backup stores only the difference from the previous one, with a full
+checkpoint every ``checkpoint_interval`` backups. A "head" document keeps the
+newest full state so the next backup can diff against it and restoring the
+newest backup is a single read. Older backups are rebuilt by replaying the
+chain of deltas forward from the nearest checkpoint. The head also holds the
+owner's sequence counter, which each backup increments atomically; the head's
+state only ever moves forward to a newer backup.
+
+Every owner has its own chain (sequence numbers and head), so one owner's
+backups never touch another's.
+"""
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from bson import BSON, Binary
+from datetime import datetime
+import zlib
+from database.change_tracker import diff_paths, apply_delta
+from database.owners import DEFAULT_OWNER
+
+BACKUP_COLLECTION = "courses_backup"
+BACKUP_META_COLLECTION = "courses_backup_meta"
+HEAD_ID = "head"
+
+def encode_payload(value):
+    """BSON-encode and zlib-compress a payload"""
+    return Binary(zlib.compress(BSON.encode({"v": value})))
+
+def decode_payload(data):
+    """Reverse of :func:`encode_payload`"""
+    return BSON(zlib.decompress(data)).decode()["v"]
+
+def head_id(owner):
+    """_id of the owner's head document"""
+    return HEAD_ID if owner == DEFAULT_OWNER else f"{HEAD_ID}:{owner}"
+
+def ensure_indexes(db):
+    """Index backups by owner and sequence number (chain replay) and creation time (listing)"""
+    backups = db[BACKUP_COLLECTION]
+    backups.create_index([("owner", ASCENDING), ("seq", ASCENDING)])
+    backups.create_index([("owner", ASCENDING), ("backup_created", DESCENDING), ("_id", DESCENDING)])
+    # Backups written before owner partitioning belong to the default owner
+    backups.update_many({"owner": {"$exists": False}}, {"$set": {"owner": DEFAULT_OWNER}})
+    _migrate_legacy_dates(backups)
+
+def _migrate_legacy_dates(backups):
+    """Convert ISO-string backup_created values to native datetimes so they sort and page together"""
+    for doc in backups.find({"backup_created": {"$type": "string"}}, {"backup_created": 1}):
+        try:
+            created = datetime.fromisoformat(doc["backup_created"])
+        except ValueError:
+            continue
+        backups.update_one({"_id": doc["_id"]}, {"$set": {"backup_created": created}})
+
+def encode_cursor(backup):
+    """Opaque "after" token pointing just past ``backup`` in the listing order"""
+    return f"{backup['backup_created'].isoformat()}|{backup['_id']}"
+
+def decode_cursor(token):
+    created, _, backup_id = token.partition("|")
+    return datetime.fromisoformat(created), backup_id
+
+def list_backups(db, page_size, after=None, owner=DEFAULT_OWNER):
+    """Return (backups, next_token) for one page of the owner's backups, newest first
+
+    Uses the (owner, backup_created, _id) index for keyset pagination, so each
+    page costs the same regardless of how many backups exist.
+    """
+    query = {"owner": owner, "backup_created": {"$type": "date"}}
+    if after:
+        created, backup_id = decode_cursor(after)
+        query["$or"] = [
+            {"backup_created": {"$lt": created}},
+            {"backup_created": created, "_id": {"$lt": backup_id}}
+        ]
+
+    cursor = db[BACKUP_COLLECTION].find(
+        query,
+        {"_id": 1, "backup_created": 1, "kind": 1, "stored_size": 1}
+    ).sort([("backup_created", DESCENDING), ("_id", DESCENDING)]).limit(page_size + 1)
+
+    backups = list(cursor)
+    next_token = encode_cursor(backups[page_size - 1]) if len(backups) > page_size else None
+    return backups[:page_size], next_token
+
+def create_backup(db, courses, checkpoint_interval=10, owner=DEFAULT_OWNER):
+    """Store a backup of the owner's ``courses`` and return its id"""
+    backups = db[BACKUP_COLLECTION]
+    meta = db[BACKUP_META_COLLECTION]
+    # Allocating the sequence number is atomic, so concurrent backups never share one
+    head = meta.find_one_and_update(
+        {"_id": head_id(owner)},
+        {"$inc": {"seq": 1}, "$setOnInsert": {"owner": owner}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    seq = head["seq"]
+    # Backup the head's payload is the state of (heads written before payload_seq: the previous one)
+    base_seq = head.get("payload_seq", seq - 1)
+    now = datetime.now()
+    prefix = "backup" if owner == DEFAULT_OWNER else f"backup_{owner}"
+    backup_id = f"{prefix}_{now.strftime('%Y%m%d_%H%M%S')}_{seq}"
+
+    full = (
+        "payload" not in head
+        or head.get("force_full", False)
+        or seq - head.get("checkpoint_seq", 0) >= checkpoint_interval
+    )
+    if full:
+        payload = {"courses": courses}
+    else:
+        sets, unsets = diff_paths(decode_payload(head["payload"]), courses)
+        payload = {"sets": [[list(path), value] for path, value in sets],
+                   "unsets": [list(path) for path in unsets]}
+
+    encoded = encode_payload(payload)
+    backups.insert_one({
+        "_id": backup_id,
+        "owner": owner,
+        "seq": seq,
+        "kind": "full" if full else "delta",
+        "base_seq": None if full else base_seq,
+        "backup_created": now,
+        "payload": encoded,
+        "stored_size": len(encoded)
+    })
+
+    # Only a newer backup moves the head - a slower concurrent one must not roll it back
+    meta.update_one(
+        {"_id": head_id(owner), "$or": [{"payload_seq": {"$lt": seq}}, {"payload_seq": {"$exists": False}}]},
+        {
+            "$set": {
+                "payload_seq": seq,
+                "backup_id": backup_id,
+                "checkpoint_seq": seq if full else head.get("checkpoint_seq", 0),
+                "payload": encoded if full else encode_payload({"courses": courses})
+            },
+            "$unset": {"force_full": ""}
+        }
+    )
+    return backup_id
+
+def _replay(db, entry):
+    """Rebuild the courses stored by ``entry`` from its checkpoint and deltas"""
+    backups = db[BACKUP_COLLECTION]
+    owner = entry.get("owner", DEFAULT_OWNER)
+    checkpoint = backups.find_one(
+        {"owner": owner, "kind": "full", "seq": {"$lte": entry["seq"]}},
+        sort=[("seq", DESCENDING)]
+    )
+    if checkpoint is None:
+        raise ValueError(f"No checkpoint found for backup {entry['_id']}")
+
+    chain = {doc["seq"]: doc for doc in backups.find(
+        {"owner": owner, "seq": {"$gt": checkpoint["seq"], "$lte": entry["seq"]}},
+        {"seq": 1, "base_seq": 1, "payload": 1}
+    )}
+
+    # Walk back from the target to the checkpoint through the base links
+    deltas = []
+    seq = entry["seq"]
+    while seq != checkpoint["seq"]:
+        doc = chain.get(seq)
+        if doc is None:
+            raise ValueError(f"Backup chain for {entry['_id']} is broken at #{seq}")
+        deltas.append(doc)
+        seq = doc["base_seq"]
+
+    courses = decode_payload(checkpoint["payload"])["courses"]
+    for doc in reversed(deltas):
+        delta = decode_payload(doc["payload"])
+        courses = apply_delta(
+            courses,
+            [(tuple(path), value) for path, value in delta["sets"]],
+            [tuple(path) for path in delta["unsets"]]
+        )
+    return courses
+
+def load_backup(db, backup_id, owner=DEFAULT_OWNER):
+    """Return the courses stored in one of the owner's backups, or None if it doesn't exist"""
+    head = db[BACKUP_META_COLLECTION].find_one({"_id": head_id(owner), "backup_id": backup_id})
+    if head is not None:
+        return decode_payload(head["payload"])["courses"]
+
+    entry = db[BACKUP_COLLECTION].find_one({"_id": backup_id, "owner": owner})
+    if entry is None:
+        return None
+    if "payload" not in entry:
+        # Backup written before incremental backups - a plain copy of the document
+        return entry.get("courses", {})
+    if entry["kind"] == "full":
+        return decode_payload(entry["payload"])["courses"]
+    return _replay(db, entry)
+
+def delete_backup(db, backup_id, owner=DEFAULT_OWNER):
+    """Delete one of the owner's backups without breaking the chain of the backups that build on it
+
+    Deltas based on this backup are rebased into checkpoints first; if one of
+    them can't be rebuilt the backup is kept and False is returned.
+    """
+    backups = db[BACKUP_COLLECTION]
+    entry = backups.find_one({"_id": backup_id, "owner": owner}, {"seq": 1, "kind": 1})
+    if entry is None:
+        return False
+
+    if "seq" in entry:
+        # The deltas built on this backup become checkpoints so they no longer need it
+        for child in backups.find({"owner": owner, "base_seq": entry["seq"]}, {"seq": 1}):
+            try:
+                courses = load_backup(db, child["_id"], owner)
+            except ValueError:
+                return False
+            encoded = encode_payload({"courses": courses})
+            backups.update_one(
+                {"_id": child["_id"]},
+                {"$set": {"kind": "full", "base_seq": None, "payload": encoded, "stored_size": len(encoded)}}
+            )
+
+        # A deleted head must not stay loadable, and the next backup can't diff against it
+        db[BACKUP_META_COLLECTION].update_one(
+            {"_id": head_id(owner), "backup_id": backup_id},
+            {"$set": {"backup_id": None, "force_full": True}, "$unset": {"payload": ""}}
+        )
+
+    return backups.delete_one({"_id": backup_id}).deleted_count > 0
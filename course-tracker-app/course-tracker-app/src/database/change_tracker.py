@@ -0,0 +1,125 @@
+"""Minimal $set/$unset paths between the last persisted course snapshot and the new state"""
+
+
+def is_safe_key(key):
+    """Return True if the key can be addressed in a MongoDB dotted update path"""
+    return isinstance(key, str) and key != "" and "." not in key and not key.startswith("$")
+
+def diff_paths(old, new, path=()):
+    """Return (sets, unsets) describing how to turn ``old`` into ``new``
+
+    ``sets`` is a list of ``(path, value)`` pairs and ``unsets`` a list of
+    paths, where each path is a tuple of keys. Nested dicts are compared key
+    by key; any other value is replaced as a whole when it differs.
+    """
+    sets = []
+    unsets = []
+    _diff(old, new, path, sets, unsets)
+    return sets, unsets
+
+def _diff(old, new, path, sets, unsets):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, path + (key,), sets, unsets)
+            else:
+                sets.append((path + (key,), value))
+        for key in old:
+            if key not in new:
+                unsets.append(path + (key,))
+    elif type(old) is not type(new) or old != new:
+        sets.append((path, new))
+
+def changed_keys(old, new):
+    """Return the top-level keys added, changed or removed between ``old`` and ``new`` (None if ``old`` is unknown)"""
+    if old is None:
+        return None
+    changed = [key for key, value in new.items() if key not in old or old[key] != value]
+    changed.extend(key for key in old if key not in new)
+    return changed
+
+def get_path(doc, path):
+    """Return the value stored at ``path`` inside nested dicts"""
+    for key in path:
+        doc = doc[key]
+    return doc
+
+def apply_delta(doc, sets, unsets):
+    """Apply ``(sets, unsets)`` from :func:`diff_paths` to ``doc`` in place and return it"""
+    for path in unsets:
+        parent = get_path(doc, path[:-1])
+        parent.pop(path[-1], None)
+    for path, value in sets:
+        if not path:
+            return value
+        parent = doc
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = value
+    return doc
+
+def _first_unsafe_index(path):
+    for index, key in enumerate(path):
+        if not is_safe_key(key):
+            return index
+    return None
+
+def _collapse_unsafe(sets, unsets, new):
+    """Rewrite paths through keys MongoDB cannot address as a $set of the nearest safe parent"""
+    collapsed = {}
+    safe_sets = []
+    safe_unsets = []
+
+    for path, value in sets:
+        index = _first_unsafe_index(path)
+        if index is None:
+            safe_sets.append((path, value))
+        else:
+            collapsed[path[:index]] = get_path(new, path[:index])
+
+    for path in unsets:
+        index = _first_unsafe_index(path)
+        if index is None:
+            safe_unsets.append(path)
+        else:
+            collapsed[path[:index]] = get_path(new, path[:index])
+
+    if not collapsed:
+        return safe_sets, safe_unsets
+
+    def covered(path):
+        return any(path[:len(prefix)] == prefix for prefix in collapsed)
+
+    safe_sets = [(path, value) for path, value in safe_sets if not covered(path)]
+    safe_unsets = [path for path in safe_unsets if not covered(path)]
+
+    # Drop collapsed paths nested inside another collapsed path
+    for prefix in sorted(collapsed, key=len):
+        if prefix in collapsed:
+            for other in list(collapsed):
+                if other != prefix and other[:len(prefix)] == prefix:
+                    del collapsed[other]
+
+    return safe_sets + list(collapsed.items()), safe_unsets
+
+def _dotted(root, path):
+    return ".".join((root,) + path) if path else root
+
+def build_update(old, new, root="courses"):
+    """Build a MongoDB update document that turns ``old`` into ``new`` under ``root``
+
+    Returns an empty dict when nothing changed. When there is no previous
+    snapshot the whole ``root`` field is set.
+    """
+    if old is None:
+        return {"$set": {root: new}}
+
+    sets, unsets = diff_paths(old, new)
+    sets, unsets = _collapse_unsafe(sets, unsets, new)
+
+    update = {}
+    if sets:
+        update["$set"] = {_dotted(root, path): value for path, value in sets}
+    if unsets:
+        update["$unset"] = {_dotted(root, path): "" for path in unsets}
+    return update
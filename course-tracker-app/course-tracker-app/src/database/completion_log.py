@@ -0,0 +1,145 @@
+"""Append-only log of module completions with daily rollups
+
+Every time a module is marked complete or incomplete an event is appended
+to ``completion_events`` and the owner's rollup for that day in
+``completion_days`` is incremented in the same call. Streaks and weekly
+counts are read from the rollups - walking back one day document at a time
+from today - so they cost O(days in the streak), not a scan of every module.
+
+Events carry a unique id, so replaying ones recorded offline is idempotent.
+"""
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import date, datetime, timedelta
+import uuid
+
+EVENT_COLLECTION = "completion_events"
+DAY_COLLECTION = "completion_days"
+
+# Days counted in "completed this week" (today and the six before it)
+WEEK_DAYS = 7
+
+def ensure_indexes(db):
+    """Index events by owner and time and rollups by owner and day"""
+    db[EVENT_COLLECTION].create_index([("owner", ASCENDING), ("at", DESCENDING)])
+    db[EVENT_COLLECTION].create_index([("owner", ASCENDING), ("course", ASCENDING), ("module", ASCENDING)])
+    db[DAY_COLLECTION].create_index([("owner", ASCENDING), ("day", DESCENDING)], unique=True)
+
+def new_event(owner, course_name, module_name, completed, at=None):
+    """Build a completion event (``completed`` False records an un-completion)"""
+    at = at or datetime.now()
+    return {
+        "_id": uuid.uuid4().hex,
+        "owner": owner,
+        "course": course_name,
+        "module": module_name,
+        "completed": bool(completed),
+        "at": at,
+        "day": at.strftime("%Y-%m-%d")
+    }
+
+def _day_increment(event):
+    return {"completed": 1} if event["completed"] else {"uncompleted": 1}
+
+def record_events(db, events):
+    """Append events and add them to their day's rollup; events already logged are skipped
+
+    Returns the number of events that were new.
+    """
+    if not events:
+        return 0
+    failed = set()
+    try:
+        db[EVENT_COLLECTION].insert_many(events, ordered=False)
+    except BulkWriteError as e:
+        # Duplicate ids are events replayed twice - anything else is a real failure
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        failed = {error["index"] for error in errors}
+
+    new_events = [event for index, event in enumerate(events) if index not in failed]
+    if new_events:
+        db[DAY_COLLECTION].bulk_write([
+            UpdateOne(
+                {"owner": event["owner"], "day": event["day"]},
+                {"$inc": _day_increment(event)},
+                upsert=True
+            )
+            for event in new_events
+        ], ordered=False)
+    return len(new_events)
+
+def has_days(db, owner):
+    return db[DAY_COLLECTION].find_one({"owner": owner}, {"_id": 1}) is not None
+
+def iter_active_days(db, owner):
+    """Yield the owner's days with at least one completion, newest first (read lazily)"""
+    cursor = db[DAY_COLLECTION].find(
+        {"owner": owner, "completed": {"$gt": 0}},
+        {"_id": 0, "day": 1}
+    ).sort("day", DESCENDING).batch_size(32)
+    for doc in cursor:
+        yield doc["day"]
+
+def net_completions_by_day(db, owner, since_day):
+    """{day: completions minus un-completions} for the owner's days from ``since_day`` on"""
+    return {
+        doc["day"]: doc.get("completed", 0) - doc.get("uncompleted", 0)
+        for doc in db[DAY_COLLECTION].find({"owner": owner, "day": {"$gte": since_day}})
+    }
+
+def backfill_days(db, owner, counts):
+    """Seed the owner's rollups from ``{day: completed modules}`` (see :func:`day_counts`)"""
+    if counts:
+        db[DAY_COLLECTION].bulk_write([
+            UpdateOne({"owner": owner, "day": day}, {"$setOnInsert": {"completed": count, "backfilled": True}}, upsert=True)
+            for day, count in counts.items()
+        ], ordered=False)
+
+def day_counts(courses):
+    """{day: completed modules} from the completion dates stored on the modules
+
+    Used once per owner to seed the rollups with completions made before the
+    log existed.
+    """
+    counts = {}
+    for course_data in courses.values():
+        for module_data in course_data.get("subcourses", {}).values():
+            day = module_data.get("completion_date")
+            if module_data.get("completed", False) and isinstance(day, str) and day:
+                counts[day[:10]] = counts.get(day[:10], 0) + 1
+    return counts
+
+def streak_length(active_days, today=None):
+    """Consecutive days with completions ending today (or yesterday - today isn't over yet)
+
+    ``active_days`` are ISO day strings, newest first; iteration stops at the
+    first gap, so only the days of the streak itself are read.
+    """
+    today = today or date.today()
+    expected = None
+    streak = 0
+    for day in active_days:
+        current = date.fromisoformat(day)
+        if expected is None:
+            if current > today:
+                continue
+            if current < today - timedelta(days=1):
+                return 0
+        elif current != expected:
+            break
+        streak += 1
+        expected = current - timedelta(days=1)
+    return streak
+
+def summarize(active_days, net_by_day, today=None):
+    """Streak and completion counts for the learning-streak widgets"""
+    today = today or date.today()
+    week_start = today - timedelta(days=WEEK_DAYS - 1)
+    week = sum(count for day, count in net_by_day.items() if week_start.isoformat() <= day <= today.isoformat())
+    return {
+        "streak_days": streak_length(active_days, today),
+        "completed_this_week": max(week, 0),
+        "completed_today": max(net_by_day.get(today.isoformat(), 0), 0)
+    }
@@ -0,0 +1,155 @@
+"""Materialized overview summary stored on the owner's course document
+
+Every write that changes an owner's courses also updates a ``summary``
+field in the same update that bumps the document's version, so the totals
+can never disagree with the data version they were computed from. The
+dashboard header, progress gauges and sidebar metrics read just that field
+instead of recomputing the totals from every module in every session.
+
+Stored shape (:func:`materialize`) - one row per course, category and module
+type under a key MongoDB can address, plus running totals::
+
+    {"rows": {<key>: {"course", "category", "total", "completed"}, ...},
+     "categories": {<key>: {"category", "courses"}, ...},
+     "types": {<key>: {"type", "total", "completed"}, ...},
+     "totals": {"courses", "modules", "completed_modules", "percentage_sum",
+                "not_started", "in_progress", "completed"},
+     "last_updated"}
+
+A save sends :func:`changes`: a ``$set``/``$unset`` of the rows of the
+courses it changed and an ``$inc`` of the totals, so its size follows the
+edit rather than the number of courses. :func:`from_stored` turns the stored
+form into the summary the components show::
+
+    {"total_courses", "total_modules", "completed_modules", "progress_percentage",
+     "avg_progress", "courses_not_started", "courses_in_progress", "courses_completed",
+     "completion_rate",
+     "courses": [{"course", "total", "completed", "percentage"}, ...],
+     "categories": [{"category", "courses"}, ...],
+     "types": [{"type", "total", "completed"}, ...],
+     "last_updated"}
+
+The totals are ``utils.analytics.overall_totals``. A summary read while
+saves are still queued carries ``"pending": True``.
+"""
+from datetime import datetime
+import hashlib
+from utils.analytics import STATUSES, analyze, from_aggregates, overall_totals, percentage
+
+UNCATEGORIZED = "Uncategorized"
+
+def field_key(name):
+    """Key for a course, category or type name that is safe in a dotted update path"""
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+
+def _row(name, course):
+    return {"course": name, "category": course["category"], "total": course["total"], "completed": course["completed"]}
+
+def _category(course):
+    return course["category"] or UNCATEGORIZED
+
+def materialize(aggregates, last_updated=None):
+    """Stored summary from per-course and per-type counts (see ``aggregate_stats``)"""
+    analytics = from_aggregates(aggregates)
+    categories = {}
+    for course in analytics.courses.values():
+        entry = categories.setdefault(field_key(_category(course)), {"category": _category(course), "courses": 0})
+        entry["courses"] += 1
+    return {
+        "rows": {field_key(name): _row(name, course) for name, course in analytics.courses.items()},
+        "categories": categories,
+        "types": {field_key(name): {"type": name, **counts} for name, counts in analytics.types.items()},
+        "totals": {
+            "courses": len(analytics.courses),
+            "modules": analytics.total_modules,
+            "completed_modules": analytics.completed_modules,
+            "percentage_sum": analytics.percentage_sum,
+            **analytics.status_counts
+        },
+        "last_updated": last_updated or datetime.now().isoformat()
+    }
+
+def from_stored(stored):
+    """Summary for the components from the stored form"""
+    totals = stored["totals"]
+    return {
+        **overall_totals(
+            totals["courses"], totals["modules"], totals["completed_modules"], totals["percentage_sum"],
+            {status: totals[status] for status in STATUSES}
+        ),
+        "courses": [
+            {"course": row["course"], "total": row["total"], "completed": row["completed"],
+             "percentage": percentage(row["completed"], row["total"])}
+            for row in stored["rows"].values()
+        ],
+        # Counters of categories and types that emptied out stay behind at zero
+        "categories": [
+            {"category": entry["category"], "courses": entry["courses"]}
+            for entry in stored["categories"].values() if entry["courses"] > 0
+        ],
+        "types": [
+            {"type": entry["type"], "total": entry["total"], "completed": entry["completed"]}
+            for entry in stored["types"].values() if entry["total"] > 0
+        ],
+        "last_updated": stored["last_updated"]
+    }
+
+def summarize(aggregates, last_updated=None):
+    """Summary for the components from per-course and per-type counts"""
+    return from_stored(materialize(aggregates, last_updated))
+
+def is_materialized(stored):
+    """True if ``stored`` has the shape :func:`changes` updates (summaries written before it don't)"""
+    return isinstance(stored, dict) and isinstance(stored.get("rows"), dict) and "totals" in stored
+
+def changes(previous, courses, course_ids, field="summary", last_updated=None):
+    """Update document turning the stored summary of ``previous`` into that of ``courses``
+
+    Only the courses in ``course_ids`` are recounted - a row ``$set`` (or
+    ``$unset``) each and ``$inc`` of the totals they moved.
+    """
+    before = analyze({name: previous[name] for name in course_ids if name in previous})
+    after = analyze({name: courses[name] for name in course_ids if name in courses})
+    sets = {f"{field}.last_updated": last_updated or datetime.now().isoformat()}
+    unsets = {}
+    increments = {}
+
+    def increment(path, amount):
+        if amount:
+            path = f"{field}.{path}"
+            increments[path] = increments.get(path, 0) + amount
+
+    for name in course_ids:
+        old, new = before.courses.get(name), after.courses.get(name)
+        path = f"{field}.rows.{field_key(name)}"
+        if new is None:
+            if old is not None:
+                unsets[path] = ""
+        elif old is None or _row(name, old) != _row(name, new):
+            sets[path] = _row(name, new)
+
+    for analytics, sign in ((before, -1), (after, 1)):
+        increment("totals.courses", sign * len(analytics.courses))
+        increment("totals.modules", sign * analytics.total_modules)
+        increment("totals.completed_modules", sign * analytics.completed_modules)
+        increment("totals.percentage_sum", sign * analytics.percentage_sum)
+        for status, count in analytics.status_counts.items():
+            increment(f"totals.{status}", sign * count)
+        for course in analytics.courses.values():
+            key = field_key(_category(course))
+            increment(f"categories.{key}.courses", sign)
+            if sign > 0:
+                sets[f"{field}.categories.{key}.category"] = _category(course)
+        for name, counts in analytics.types.items():
+            key = field_key(name)
+            increment(f"types.{key}.total", sign * counts["total"])
+            increment(f"types.{key}.completed", sign * counts["completed"])
+            if sign > 0:
+                sets[f"{field}.types.{key}.type"] = name
+
+    update = {"$set": sets}
+    if unsets:
+        update["$unset"] = unsets
+    if increments:
+        update["$inc"] = increments
+    return update
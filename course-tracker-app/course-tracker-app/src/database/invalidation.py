@@ -0,0 +1,160 @@
+"""Cache invalidation across app instances sharing one MongoDB
+
+Every write publishes ``(owner, version, course_ids)``: whose data changed,
+the data version it produced (versions count up per owner) and the courses it
+touched (None when everything may have changed). Each instance subscribes and
+refreshes only those entries of its cache.
+
+* :class:`InProcessBus` - delivers within this process (tests, single instance)
+* :class:`PollingBus` - writes change records to MongoDB and polls recent ones
+* :class:`ChangeStreamBus` - same records, pushed by a MongoDB change stream;
+  falls back to polling when change streams aren't available (standalone server)
+"""
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from datetime import datetime, timedelta, timezone
+import threading
+
+CHANGES_COLLECTION = "course_changes"
+CHANGE_RETENTION_SECONDS = 24 * 60 * 60
+
+# Records written before owner partitioning concern the default owner's data
+LEGACY_OWNER = "main"
+
+# Polls re-read this far back, so records stamped by an instance with a slightly slow clock aren't missed
+CLOCK_SKEW_SECONDS = 10
+
+class InProcessBus:
+    """Invalidation bus that only reaches subscribers in this process"""
+
+    def __init__(self):
+        self._subscribers = []
+        self._delivery_lock = threading.Lock()
+        self._last_versions = {}
+
+    def subscribe(self, callback):
+        """Call ``callback(owner, version, course_ids)`` for every change"""
+        self._subscribers.append(callback)
+
+    def publish(self, db, owner, version, course_ids):
+        self._deliver(owner, version, course_ids)
+
+    def _deliver(self, owner, version, course_ids):
+        with self._delivery_lock:
+            last_version = self._last_versions.get(owner)
+            if last_version is not None:
+                if version <= last_version:
+                    return
+                if version > last_version + 1:
+                    # A change was missed - its course ids are unknown
+                    course_ids = None
+            self._last_versions[owner] = version
+        for callback in self._subscribers:
+            callback(owner, version, course_ids)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+class PollingBus(InProcessBus):
+    """Publish change records to MongoDB and poll the recent ones
+
+    Versions only order the changes of one owner, so polling reads by time
+    and drops the records already delivered.
+    """
+
+    def __init__(self, get_db, poll_seconds=2.0):
+        super().__init__()
+        self._get_db = get_db
+        self._poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+        self._thread = None
+        self._indexes_ready = False
+        self._polled_at = None
+
+    def _collection(self, db):
+        collection = db[CHANGES_COLLECTION]
+        if not self._indexes_ready:
+            collection.create_index([("at", ASCENDING)], expireAfterSeconds=CHANGE_RETENTION_SECONDS)
+            self._indexes_ready = True
+        return collection
+
+    def publish(self, db, owner, version, course_ids):
+        self._collection(db).insert_one({
+            "owner": owner,
+            "version": version,
+            "course_ids": list(course_ids) if course_ids is not None else None,
+            # UTC - MongoDB stores dates as UTC, so naive local times would shift by the instance's offset
+            "at": datetime.now(timezone.utc)
+        })
+        # Subscribers here hear about it right away; the poller skips it later
+        self._deliver(owner, version, course_ids)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="course-invalidation", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self._poll_seconds):
+            self.poll()
+
+    def poll(self):
+        """Deliver the change records written since the previous poll"""
+        db = self._get_db()
+        if db is None:
+            return
+        try:
+            collection = self._collection(db)
+            now = datetime.now(timezone.utc)
+            if self._polled_at is None:
+                # Start from now - older changes are already in what gets loaded
+                self._polled_at = now
+                return
+            since = self._polled_at - timedelta(seconds=CLOCK_SKEW_SECONDS)
+            records = collection.find({"at": {"$gte": since}}).sort([("owner", ASCENDING), ("version", ASCENDING)])
+            for record in records:
+                self._deliver(record.get("owner", LEGACY_OWNER), record["version"], record.get("course_ids"))
+            self._polled_at = now
+        except Exception:
+            # MongoDB went away - try again on the next tick
+            pass
+
+class ChangeStreamBus(PollingBus):
+    """Receive change records through a change stream (replica sets / Atlas), polling otherwise"""
+
+    def _run(self):
+        while not self._stopped.is_set():
+            db = self._get_db()
+            if db is None:
+                self._stopped.wait(self._poll_seconds)
+                continue
+            try:
+                pipeline = [{"$match": {"operationType": "insert"}}]
+                with self._collection(db).watch(pipeline, max_await_time_ms=int(self._poll_seconds * 1000)) as stream:
+                    # Catch up on anything written before the stream opened
+                    self.poll()
+                    while not self._stopped.is_set():
+                        change = stream.try_next()
+                        if change is not None:
+                            record = change["fullDocument"]
+                            self._deliver(record.get("owner", LEGACY_OWNER), record["version"], record.get("course_ids"))
+            except OperationFailure:
+                # Standalone servers have no change streams
+                super()._run()
+                return
+            except Exception:
+                self._stopped.wait(self._poll_seconds)
+
+def create_bus(kind, get_db, poll_seconds=2.0):
+    """Build the bus named by ``kind``: "change_stream", "polling" or "memory" """
+    if kind == "memory":
+        return InProcessBus()
+    if kind == "polling":
+        return PollingBus(get_db, poll_seconds)
+    return ChangeStreamBus(get_db, poll_seconds)
@@ -1,41 +1,77 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+"""Validation and copying of stored course data
+
+The app works on courses as the plain nested dicts they are stored as::
+
+    {course name: {"subcourses": {module name: {"completed", "type", "created",
+                                                "updated", "completion_date", ...}},
+                   "description", "category", "notes", "_meta", ...}}
+
+There is no second in-memory representation to convert to and from. This
+module checks that data has that shape - every import validates each course
+through :func:`validate_course` - and copies it for the save snapshots with
+:func:`copy_courses`. Validation only reads the data: keys it doesn't check
+are left alone, so stored data round-trips unchanged.
+"""
 from datetime import datetime
+import copy
+
+class ModelError(ValueError):
+    """Stored or imported data doesn't have the shape of a course"""
+
+# Leaf types of decoded JSON/BSON that are immutable and can be shared by copies
+_IMMUTABLE = (str, int, float, bool, type(None), datetime)
+
+def _copy(value):
+    """Independent copy of a decoded JSON/BSON value - containers are copied, immutable leaves shared"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_copy(item) for item in value]
+    if isinstance(value, _IMMUTABLE):
+        return value
+    return copy.deepcopy(value)
+
+def validate_module(name, data, course_name=None):
+    """Raise ModelError unless ``data`` is a stored module; returns whether it is completed"""
+    where = f" in '{course_name}'" if course_name is not None else ""
+    if not isinstance(data, dict):
+        raise ModelError(f"Module '{name}'{where} must be an object")
+    completed = data.get("completed", False)
+    if not isinstance(completed, bool):
+        raise ModelError(f"Module '{name}'{where} has a non-boolean 'completed'")
+    return completed
+
+def validate_course(name, data):
+    """Raise ModelError unless ``data`` is a stored course; returns its (total, completed) module counts"""
+    if not isinstance(name, str) or not name.strip():
+        raise ModelError(f"Invalid course name: {name!r}")
+    if not isinstance(data, dict):
+        raise ModelError(f"Course '{name}' must be an object")
+    subcourses = data.get("subcourses", {})
+    if not isinstance(subcourses, dict):
+        raise ModelError(f"Course '{name}' has invalid 'subcourses'")
+    completed = sum(
+        validate_module(module_name, module_data, name) for module_name, module_data in subcourses.items()
+    )
+    return len(subcourses), completed
+
+def validate_courses(courses):
+    """Validate a ``{course name: course dict}`` mapping; returns it unchanged"""
+    if not isinstance(courses, dict):
+        raise ModelError("Courses must be an object of course name to course")
+    for name, data in courses.items():
+        validate_course(name, data)
+    return courses
+
+def course_document(name, data):
+    """Self-describing form of one course: its name and module counts plus the stored fields"""
+    total, completed = validate_course(name, data)
+    return {"course_name": name, "total_modules": total, "completed_modules": completed, **data}
+
+def copy_courses(courses):
+    """Independent, faithful copy of a stored course dict - much cheaper than copy.deepcopy
 
-class Subcourse(BaseModel):
-    name: str
-    completed: bool = False
-    created: datetime = Field(default_factory=datetime.now)
-    updated: datetime = Field(default_factory=datetime.now)
-
-class Course(BaseModel):
-    course_name: str
-    description: Optional[str] = None
-    subcourses: Dict[str, Subcourse] = Field(default_factory=dict)
-    total_modules: int = 0
-
-    def add_subcourse(self, subcourse_name: str):
-        if subcourse_name not in self.subcourses:
-            self.subcourses[subcourse_name] = Subcourse(name=subcourse_name)
-            self.total_modules += 1
-
-    def remove_subcourse(self, subcourse_name: str):
-        if subcourse_name in self.subcourses:
-            del self.subcourses[subcourse_name]
-            self.total_modules -= 1
-
-    def update_subcourse(self, subcourse_name: str, completed: bool):
-        if subcourse_name in self.subcourses:
-            self.subcourses[subcourse_name].completed = completed
-            self.subcourses[subcourse_name].updated = datetime.now()
-
-class CourseTracker(BaseModel):
-    courses: Dict[str, Course] = Field(default_factory=dict)
-
-    def add_course(self, course_name: str, description: Optional[str] = None):
-        if course_name not in self.courses:
-            self.courses[course_name] = Course(course_name=course_name, description=description)
-
-    def remove_course(self, course_name: str):
-        if course_name in self.courses:
-            del self.courses[course_name]
\ No newline at end of file
+    Every field is copied as stored (frozen cache values come back as plain
+    dicts and lists); nothing is added or validated.
+    """
+    return {name: _copy(data) for name, data in courses.items()}
@@ -1,228 +1,1139 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import ConnectionFailure
 import streamlit as st
-from datetime import datetime
-import os
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from datetime import date, datetime, timedelta
+from database.change_tracker import build_update, changed_keys, is_safe_key
+from database import normalized_store, backup_store, ndjson_export, streaming_import, replication, read_cache, invalidation, stats_provider, owners, completion_log, aggregate_stats, course_summary
+from database.owners import DEFAULT_OWNER, course_key, document_id
+from database.models import copy_courses
+from database.write_behind import WriteBehindQueue, SessionWatcher
+from database.sqlite_store import SQLiteStore
+from utils.analytics import CourseAnalytics, analyze
+from config.settings import settings
+from collections import OrderedDict
+import atexit
+import tempfile
+import threading
+import time
 
-def get_db():
-    """Connect to MongoDB and return the database"""
+# Connection tuning - shared by every call in this process (see config/settings.py)
+MONGODB_URI = settings.mongodb_uri
+MONGODB_DB_NAME = settings.mongodb_db_name
+MONGODB_MAX_POOL_SIZE = settings.mongodb_max_pool_size
+MONGODB_MIN_POOL_SIZE = settings.mongodb_min_pool_size
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = settings.mongodb_server_selection_timeout_ms
+MONGODB_CONNECT_TIMEOUT_MS = settings.mongodb_connect_timeout_ms
+MONGODB_SOCKET_TIMEOUT_MS = settings.mongodb_socket_timeout_ms
+
+# "document" keeps each owner's courses in one document ({"_id": "main"} for the default owner),
+# "normalized" stores one document per course and per module
+STORAGE_MODE = settings.storage_mode
+
+# "mongo" uses MongoDB with the local SQLite store as offline fallback, "sqlite" uses only the local store
+STORAGE_BACKEND = settings.storage_backend
+LOCAL_STORE_PATH = settings.local_store_path
+
+# Overview statistics - "client" computes them in the app, "server" has the database aggregate them
+STATS_MODE = settings.stats_mode
+
+# Read cache - serve the cached courses this long before re-checking the stored version (0 = every read)
+COURSE_CACHE_REVALIDATE_SECONDS = settings.course_cache_revalidate_seconds
+
+# Cross-instance invalidation: "change_stream" (polls on standalone servers), "polling" or "memory" (single instance)
+INVALIDATION_BUS = settings.invalidation_bus
+INVALIDATION_POLL_SECONDS = settings.invalidation_poll_seconds
+
+# Write-behind - saves within this window are merged into one background write (0 = write immediately)
+WRITE_BEHIND_SECONDS = settings.write_behind_seconds
+WRITE_BEHIND_MAX_DELAY_SECONDS = settings.write_behind_max_delay_seconds
+# How often sessions with queued saves are checked for having closed (their saves are then written at once)
+SESSION_CHECK_SECONDS = settings.session_check_seconds
+
+# Backups - every Nth backup is a full checkpoint, the rest store only the changes
+BACKUP_CHECKPOINT_INTERVAL = settings.backup_checkpoint_interval
+BACKUP_PAGE_SIZE = settings.backup_page_size
+
+# Streaming export - spool to memory up to this size, then to a temp file
+EXPORT_SPOOL_BYTES = settings.export_spool_bytes
+
+# Streaming import - courses (document mode) or documents (normalized mode) per bulk write
+IMPORT_BATCH_SIZE = settings.import_batch_size
+
+# Offline replication - outbox operations sent to MongoDB per batch after reconnecting
+REPLICATION_BATCH_SIZE = settings.replication_batch_size
+
+# Database stats are cached this long and then refreshed in the background
+STATS_TTL_SECONDS = settings.stats_ttl_seconds
+
+# Circuit breaker - how long to skip MongoDB after a failed connection
+CIRCUIT_BREAKER_COOLDOWN_SECONDS = settings.circuit_cooldown_seconds
+CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS = settings.circuit_max_cooldown_seconds
+
+_client = None
+_client_lock = threading.Lock()
+_circuit = {"open_until": 0.0, "failures": 0}
+
+# Last course state known to be in MongoDB, per owner - saves only send the difference
+_snapshot_lock = threading.Lock()
+_persisted = {}
+
+# Writes of one owner are serialized; different owners write concurrently
+_write_locks = {}
+
+# Frozen course data shared by every session of the same owner, keyed by the stored data version
+_course_cache = read_cache.VersionedCache(COURSE_CACHE_REVALIDATE_SECONDS)
+
+# Owners whose local outbox is known to hold nothing MongoDB hasn't seen (none are known at startup)
+_outbox_synced = set()
+_sync_state = {}
+
+def current_owner():
+    """Owner whose courses the current session works on (set by app.py, the default owner otherwise)"""
     try:
-        # Try to get MongoDB URI from environment variable first
-        mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-        client = MongoClient(mongo_uri)
-        
-        # Test the connection
+        return st.session_state.get("owner", DEFAULT_OWNER)
+    except Exception:
+        # No script run context (background threads, CLI)
+        return DEFAULT_OWNER
+
+# Saves whose touched courses the session remembers, for views patching their rows
+SESSION_CHANGES_LIMIT = 50
+
+def _mark_session_changed(course_ids=None):
+    """Count a save of the session's courses (and which ones it touched, None if unknown) for derived views"""
+    try:
+        revision = st.session_state.get("courses_revision", 0) + 1
+        changes = st.session_state.setdefault("course_changes", {})
+        changes[revision] = list(course_ids) if course_ids is not None else None
+        changes.pop(revision - SESSION_CHANGES_LIMIT, None)
+        st.session_state["courses_revision"] = revision
+    except Exception:
+        pass
+
+def is_workspace_member(workspace, user):
+    """True if ``user`` may open ``workspace``; fails closed when membership can't be checked"""
+    if STORAGE_BACKEND == "sqlite":
+        try:
+            return get_local_store().is_workspace_member(workspace, user)
+        except Exception as e:
+            st.error(f"❌ Error checking workspace access: {e}")
+            return False
+    db = get_db()
+    if db is None:
+        return False
+    try:
+        return owners.is_member(db, workspace, user)
+    except Exception as e:
+        record_failure(e)
+        st.error(f"❌ Error checking workspace access: {e}")
+        return False
+
+def set_workspace_member(workspace, user, member=True):
+    """Add ``user`` to ``workspace`` (or remove them with ``member=False``); returns True when stored"""
+    if STORAGE_BACKEND == "sqlite":
+        store = get_local_store()
+        (store.add_workspace_member if member else store.remove_workspace_member)(workspace, user)
+        return True
+    db = get_db()
+    if db is None:
+        return False
+    (owners.add_member if member else owners.remove_member)(db, workspace, user)
+    return True
+
+def _write_lock(owner):
+    with _snapshot_lock:
+        return _write_locks.setdefault(owner, threading.Lock())
+
+def _create_client():
+    """Create the process-wide MongoClient with pool and timeout settings"""
+    return MongoClient(
+        MONGODB_URI,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+    )
+
+def is_circuit_open():
+    """Return True while MongoDB is known to be down and calls should be skipped"""
+    return time.monotonic() < _circuit["open_until"]
+
+def _trip_circuit():
+    """Mark MongoDB as down and back off exponentially on repeated failures"""
+    global _client
+    with _client_lock:
+        _circuit["failures"] += 1
+        cooldown = min(
+            CIRCUIT_BREAKER_COOLDOWN_SECONDS * (2 ** (_circuit["failures"] - 1)),
+            CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS
+        )
+        _circuit["open_until"] = time.monotonic() + cooldown
+        if _client is not None:
+            _client.close()
+            _client = None
+    return cooldown
+
+def record_failure(error):
+    """Open the circuit if an operation failed because MongoDB is unreachable"""
+    if isinstance(error, ConnectionFailure):
+        _trip_circuit()
+
+def get_client():
+    """Return the shared MongoClient, or None while the circuit is open"""
+    global _client
+    if STORAGE_BACKEND == "sqlite" or is_circuit_open():
+        return None
+    
+    with _client_lock:
+        if _client is not None:
+            return _client
+        client = _create_client()
+    
+    try:
+        # Only ping when (re)connecting - the pool keeps the connection afterwards
         client.admin.command('ping')
-        
-        db = client["course_tracker"]
-        return db
     except Exception as e:
+        client.close()
+        cooldown = _trip_circuit()
         st.error(f"❌ Failed to connect to MongoDB: {e}")
-        st.info("💡 Make sure MongoDB is running on your system, or we'll use local storage")
+        st.info(f"💡 Using local storage - retrying MongoDB in {cooldown:.0f}s")
         return None
+    
+    with _client_lock:
+        if _client is None:
+            _client = client
+            _circuit["failures"] = 0
+            _circuit["open_until"] = 0.0
+        else:
+            # Another thread connected first - keep its pool
+            client.close()
+        return _client
+
+def get_db():
+    """Return the course tracker database from the shared client"""
+    client = get_client()
+    if client is None:
+        return None
+    return client[MONGODB_DB_NAME]
+
+def close_connection():
+    """Close the shared client (called on interpreter shutdown)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+atexit.register(close_connection)
+
+_local_store = None
+
+def get_local_store():
+    """Return the process-wide SQLite store used offline (and as the only store for the sqlite backend)"""
+    global _local_store
+    with _client_lock:
+        if _local_store is None:
+            _local_store = SQLiteStore(LOCAL_STORE_PATH)
+        return _local_store
+
+def _load_local(owner):
+    try:
+        return get_local_store().load_courses(owner)
+    except Exception as e:
+        st.error(f"❌ Error loading courses from local storage: {e}")
+        return {}
+
+def _save_local(courses, owner):
+    try:
+        store = get_local_store()
+        # Stamp edited courses - offline replication uses the stamp to detect conflicts
+        previous = store.last_saved(owner)
+        replication.stamp_changed_courses(previous if previous is not None else _snapshot(owner), courses)
+        return store.save_courses(courses, owner)
+    except Exception as e:
+        st.warning(f"⚠️ Could not save to local storage: {e}")
+        return False
+
+def _remember_snapshot(owner, courses, assumed=False, version=None, summarized=False):
+    """Record the owner's course state that MongoDB now holds (and its data version, if known)
+
+    ``assumed`` marks a state taken from the local store while offline - it is
+    replaced by what MongoDB really holds once the connection recovers.
+    ``summarized`` says the stored summary is known to count exactly ``courses``,
+    so the next save can send just the rows it changes.
+    """
+    with _snapshot_lock:
+        _persisted[owner] = {
+            "courses": copy_courses(courses) if courses is not None else None,
+            "assumed": assumed,
+            "version": version,
+            "summarized": summarized
+        }
+
+def _snapshot(owner):
+    with _snapshot_lock:
+        return _persisted.get(owner, {}).get("courses")
+
+def _snapshot_version(owner):
+    with _snapshot_lock:
+        return _persisted.get(owner, {}).get("version")
+
+def _snapshot_assumed(owner):
+    with _snapshot_lock:
+        return _persisted.get(owner, {}).get("assumed", False)
+
+def _snapshot_summarized(owner):
+    with _snapshot_lock:
+        return _persisted.get(owner, {}).get("summarized", False)
+
+def _forget_summary(owner):
+    with _snapshot_lock:
+        if owner in _persisted:
+            _persisted[owner]["summarized"] = False
+
+_owners_ready = threading.Event()
+
+def _prepare_owners(db):
+    """Create the owner index once per process"""
+    if not _owners_ready.is_set():
+        owners.ensure_indexes(db)
+        _owners_ready.set()
+
+def _fetch_version(db, owner):
+    """Owner's current data version - a projected read of the owner's course document"""
+    doc = db["courses"].find_one({"_id": document_id(owner)}, {"version": 1})
+    return (doc or {}).get("version", 0)
+
+def _bump_version(db, owner, update=None):
+    """Apply ``update`` to the owner's course document and increment its version; returns the new version"""
+    _prepare_owners(db)
+    update = dict(update or {})
+    update["$inc"] = {**update.get("$inc", {}), "version": 1}
+    update["$setOnInsert"] = {"owner": owner}
+    doc = db["courses"].find_one_and_update(
+        {"_id": document_id(owner)},
+        update,
+        projection={"version": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+def _summary(courses):
+    """Overview summary of ``courses`` in its stored form (see course_summary)"""
+    return course_summary.materialize(analyze(courses).aggregates())
+
+def _summary_update(owner, previous, courses, course_ids):
+    """Summary part of a save's update: the changed rows if the stored summary counts ``previous``, else all of it"""
+    if previous is None or course_ids is None or not _snapshot_summarized(owner):
+        return {"$set": {"summary": _summary(courses)}}
+    return course_summary.changes(previous, courses, course_ids)
+
+def _merge_updates(*updates):
+    """Combine update documents operator by operator (their paths must not overlap)"""
+    merged = {}
+    for update in updates:
+        for operator, fields in update.items():
+            merged.setdefault(operator, {}).update(fields)
+    return merged
+
+def _has_pending_saves(owner):
+    """True while the owner has saves queued or being written that MongoDB doesn't hold yet"""
+    return _write_behind.status(owner)["state"] != "saved"
+
+def _store_summary(db, owner, version, summary):
+    """Set the summary computed from data at ``version`` unless another write has bumped it since
+
+    Returns True if it was stored.
+    """
+    # Documents written before versioning have no version field - None matches those
+    result = db["courses"].update_one({"_id": document_id(owner), "version": version or None}, {"$set": {"summary": summary}})
+    return result.matched_count > 0
+
+_normalized_ready = threading.Event()
+_normalized_owners = set()
+_backups_ready = threading.Event()
+
+def _prepare_backups(db):
+    """Create the backup indexes once per process"""
+    if not _backups_ready.is_set():
+        backup_store.ensure_indexes(db)
+        _backups_ready.set()
+
+def _prepare_normalized(db, owner):
+    """Create indexes on first use and migrate the owner's legacy course document"""
+    if not _normalized_ready.is_set():
+        normalized_store.ensure_indexes(db)
+        _normalized_ready.set()
+    with _snapshot_lock:
+        if owner in _normalized_owners:
+            return
+    if normalized_store.is_empty(db, owner):
+        migrated = normalized_store.migrate_from_main_document(db, owner)
+        if migrated:
+            st.success(f"✅ Migrated {migrated} courses to normalized storage")
+    with _snapshot_lock:
+        _normalized_owners.add(owner)
+
+def _read_courses(db, owner):
+    """Read the owner's stored course dict for the active storage mode (None if nothing stored)"""
+    return _read_versioned(db, owner)[1]
+
+def _read_versioned(db, owner):
+    """Return (data version, the owner's stored courses or None) for the active storage mode"""
+    _prepare_owners(db)
+    if STORAGE_MODE == "normalized":
+        _prepare_normalized(db, owner)
+        # Version first - if a write lands in between, the next check just reloads
+        version = _fetch_version(db, owner)
+        return version, normalized_store.load_courses(db, owner)
+    doc = db["courses"].find_one({"_id": document_id(owner)})
+    if doc and "courses" in doc:
+        return doc.get("version", 0), doc["courses"]
+    return (doc or {}).get("version", 0), None
+
+def _outbox_is_synced(owner):
+    with _snapshot_lock:
+        return owner in _outbox_synced
+
+def _sync_outbox(db, owner):
+    """Replay the owner's edits made while MongoDB was unreachable (a no-op when there are none)"""
+    if _outbox_is_synced(owner):
+        return
+    with _write_lock(owner):
+        if _outbox_is_synced(owner):
+            return
+        store = get_local_store()
+        if store.count_operations(owner):
+            if STORAGE_MODE == "normalized":
+                _prepare_normalized(db, owner)
+            applied, conflicts = replication.replay(db, store, STORAGE_MODE, REPLICATION_BATCH_SIZE, owner)
+            # Sessions reload everything to pick up the merged state (and the server copy of conflicts)
+            _publish_change(db, owner, _bump_version(db, owner), None)
+            _course_cache.invalidate(owner)
+            with _snapshot_lock:
+                _sync_state[owner] = conflicts
+            version, courses = _read_versioned(db, owner)
+            summarized = _store_summary(db, owner, version, _summary(courses or {}))
+            _remember_snapshot(owner, courses, version=version, summarized=summarized)
+        elif _snapshot_assumed(owner):
+            version, courses = _read_versioned(db, owner)
+            _remember_snapshot(owner, courses, version=version)
+        _sync_completion_events(db, owner)
+        with _snapshot_lock:
+            _outbox_synced.add(owner)
+
+def _sync_completion_events(db, owner):
+    """Send the owner's completion events recorded while offline (already-logged ones are skipped)"""
+    store = get_local_store()
+    events = store.unsynced_events(REPLICATION_BATCH_SIZE, owner)
+    if events:
+        _prepare_completion_log(db)
+    while events:
+        completion_log.record_events(db, events)
+        store.mark_events_synced([event["_id"] for event in events])
+        events = store.unsynced_events(REPLICATION_BATCH_SIZE, owner)
+    _forget_learning_stats(owner)
+
+def _record_offline_changes(courses, owner):
+    """Queue the owner's per-course changes MongoDB hasn't seen in the local outbox"""
+    with _write_lock(owner):
+        previous = _snapshot(owner)
+        if previous is None:
+            # Offline since startup - the local store holds the last state that was synced
+            previous = get_local_store().last_saved(owner) or {}
+        operations = replication.build_operations(previous, courses, owner)
+        if operations:
+            get_local_store().record_operations(operations)
+            with _snapshot_lock:
+                _outbox_synced.discard(owner)
+        _remember_snapshot(owner, courses, assumed=True)
+    return True
+
+def _replace_courses(db, owner, courses, **metadata):
+    """Overwrite all of the owner's stored courses (restore/import) in the active storage mode"""
+    # Queued edits predate the restore/import - write them first so they can't land on top
+    flush_pending_saves(timeout=WRITE_BEHIND_MAX_DELAY_SECONDS, owner=owner)
+    _sync_outbox(db, owner)
+    with _write_lock(owner):
+        if STORAGE_MODE == "normalized":
+            _prepare_normalized(db, owner)
+            acknowledged = normalized_store.save_courses(db, None, courses, owner)
+            summary = _summary(courses)
+            version = _bump_version(db, owner, {"$set": {"summary": summary}})
+        else:
+            summary = _summary(courses)
+            # Set rather than replace - the version counter must keep counting up
+            version = _bump_version(db, owner, {"$set": {
+                "courses": courses,
+                "summary": summary,
+                "last_updated": datetime.now().isoformat(),
+                **metadata
+            }})
+            acknowledged = True
+        _remember_snapshot(owner, courses, version=version, summarized=True)
+    _course_cache.invalidate(owner)
+    _publish_change(db, owner, version, None)
+    return acknowledged
+
+def _load_from_db(db, owner):
+    """Cache loader: (version, courses) of one owner read from MongoDB"""
+    version, courses = _read_versioned(db, owner)
+    _remember_snapshot(owner, courses, version=version)
+    
+    # Seed the offline store so it has data if MongoDB goes away
+    if courses and get_local_store().is_empty(owner):
+        get_local_store().replace_courses(courses, owner)
+    
+    # Return empty dict if no data found
+    return version, courses if courses is not None else {}
+
+def load_courses(owner=None):
+    """Load the owner's courses (the current session's by default) from MongoDB or local storage
 
-@st.cache_data
-def load_courses():
-    """Load courses from MongoDB or local storage"""
+    Returns a read-only snapshot shared between sessions; take a working copy
+    with ``read_cache.thaw`` before editing it.
+    """
+    return load_courses_with_version(owner)[1]
+
+def load_courses_with_version(owner=None):
+    """Return (data version, read-only courses); the version is None for local storage"""
+    owner = owner or current_owner()
     db = get_db()
     if db is not None:
         try:
-            courses_collection = db["courses"]
-            doc = courses_collection.find_one({"_id": "main"})
-            
-            if doc and "courses" in doc:
-                return doc["courses"]
-            else:
-                # Return empty dict if no data found
-                return {}
+            _start_invalidation_bus()
+            _sync_outbox(db, owner)
+            return _course_cache.get_with_version(
+                owner, lambda: _fetch_version(db, owner), lambda: _load_from_db(db, owner)
+            )
         except Exception as e:
+            record_failure(e)
             st.error(f"❌ Error loading courses from MongoDB: {e}")
-            # Fall back to session state if MongoDB fails
-            return st.session_state.get("courses_backup", {})
+    # Fall back to the local store when MongoDB is not available
+    return None, read_cache.freeze(_load_offline(owner))
+
+def _background_db():
+    """Database for background threads - never connects or reports errors itself"""
+    with _client_lock:
+        if _client is None or is_circuit_open():
+            return None
+        return _client[MONGODB_DB_NAME]
+
+_invalidation_bus = invalidation.create_bus(INVALIDATION_BUS, _background_db, INVALIDATION_POLL_SECONDS)
+_bus_started = threading.Event()
+atexit.register(_invalidation_bus.stop)
+
+# Course ids changed by each recent (owner, version), so sessions can refresh just those courses
+_recent_changes = OrderedDict()
+_recent_changes_lock = threading.Lock()
+RECENT_CHANGES_LIMIT = 1000
+
+def _start_invalidation_bus():
+    if not _bus_started.is_set():
+        _bus_started.set()
+        _invalidation_bus.start()
+
+def _publish_change(db, owner, version, course_ids):
+    """Tell every instance (this one included) which of the owner's courses a write touched"""
+    try:
+        _invalidation_bus.publish(db, owner, version, course_ids)
+    except Exception:
+        # Other instances still notice the new version on their next check
+        _on_data_change(owner, version, course_ids)
+
+def _read_course_subset(db, owner, course_ids):
+    """Return (version, {course id: data or None if deleted}) for a few of the owner's courses, or (version, None)"""
+    if STORAGE_MODE == "normalized":
+        version = _fetch_version(db, owner)
+        keys = {course_key(owner, course_id): course_id for course_id in course_ids}
+        module_docs = {}
+        for doc in db[normalized_store.MODULE_COLLECTION].find({"course_id": {"$in": list(keys)}}):
+            module_docs.setdefault(doc["course_id"], []).append(doc)
+        found = {keys[doc["_id"]]: normalized_store.build_course(doc, module_docs.get(doc["_id"], []))
+                 for doc in db[normalized_store.COURSE_COLLECTION].find({"_id": {"$in": list(keys)}})}
+        return version, {course_id: found.get(course_id) for course_id in course_ids}
+
+    if not all(is_safe_key(course_id) for course_id in course_ids):
+        return None, None
+    projection = {f"courses.{course_id}": 1 for course_id in course_ids}
+    projection["version"] = 1
+    doc = db["courses"].find_one({"_id": document_id(owner)}, projection) or {}
+    stored = doc.get("courses", {})
+    return doc.get("version", 0), {course_id: stored.get(course_id) for course_id in course_ids}
+
+def _on_data_change(owner, version, course_ids):
+    """Invalidation bus subscriber: refresh only the cached courses that changed"""
+    with _recent_changes_lock:
+        _recent_changes[(owner, version)] = course_ids
+        while len(_recent_changes) > RECENT_CHANGES_LIMIT:
+            _recent_changes.popitem(last=False)
+
+    cached_version = _course_cache.version(owner)
+    if cached_version is None or cached_version >= version:
+        return
+    if course_ids is None or cached_version != version - 1:
+        _course_cache.invalidate(owner)
+        return
+
+    db = _background_db()
+    try:
+        read_version, changes = _read_course_subset(db, owner, course_ids) if db is not None else (None, None)
+    except Exception:
+        read_version, changes = None, None
+    if changes is None or read_version != version:
+        _course_cache.invalidate(owner)
+        return
+    _course_cache.patch(owner, cached_version, version, changes)
+
+_invalidation_bus.subscribe(_on_data_change)
+
+def get_changed_course_ids(since_version, version, owner=None):
+    """Course ids changed after ``since_version`` up to ``version`` (None if unknown - reload everything)"""
+    if since_version is None or version is None or version < since_version:
+        return None
+    owner = owner or current_owner()
+    changed = set()
+    with _recent_changes_lock:
+        for step in range(since_version + 1, version + 1):
+            course_ids = _recent_changes.get((owner, step))
+            if course_ids is None:
+                return None
+            changed.update(course_ids)
+    return changed
+
+def _load_offline(owner):
+    """Load from the local store, taking it as MongoDB's state until the connection recovers"""
+    courses = _load_local(owner)
+    if STORAGE_BACKEND != "sqlite" and _snapshot(owner) is None:
+        _remember_snapshot(owner, courses, assumed=True)
+        with _snapshot_lock:
+            _outbox_synced.discard(owner)
+    return courses
+
+def _persist_courses(db, owner, courses):
+    """Write the owner's courses to MongoDB, sending only what changed since the last persisted state"""
+    _sync_outbox(db, owner)
+    with _write_lock(owner):
+        previous = _snapshot(owner)
+        previous_version = _snapshot_version(owner)
+        course_ids = changed_keys(previous, courses)
+        if STORAGE_MODE == "normalized":
+            if previous == courses:
+                return True
+            _prepare_normalized(db, owner)
+            acknowledged = normalized_store.save_courses(db, previous, courses, owner)
+            version = _bump_version(db, owner, _summary_update(owner, previous, courses, course_ids))
+        else:
+            update = build_update(previous, courses)
+            if not update:
+                return True
+            
+            update = _merge_updates(
+                update,
+                {"$set": {"last_updated": datetime.now().isoformat()}},
+                _summary_update(owner, previous, courses, course_ids)
+            )
+            version = _bump_version(db, owner, update)
+            acknowledged = True
+        _remember_snapshot(owner, courses, version=version, summarized=True)
+    
+    if previous_version is not None and version == previous_version + 1:
+        # Nobody else wrote in between - MongoDB holds exactly these courses now
+        _course_cache.put(owner, version, courses)
     else:
-        # Use session state as fallback when MongoDB is not available
-        return st.session_state.get("courses_backup", {})
+        _course_cache.invalidate(owner)
+        # Another writer's changes are stored too - the summary updated above only counted ours
+        stored_version, stored = _read_versioned(db, owner)
+        _store_summary(db, owner, stored_version, _summary(stored or {}))
+        _forget_summary(owner)
+    _publish_change(db, owner, version, course_ids)
+    return acknowledged
+
+def _write_behind_writer(owner, courses):
+    """Background writer for the write-behind queue (keyed by owner)"""
+    db = get_db()
+    if db is None:
+        return _record_offline_changes(courses, owner)
+    try:
+        return _persist_courses(db, owner, courses)
+    except Exception as e:
+        record_failure(e)
+        raise
+
+_write_behind = WriteBehindQueue(
+    _write_behind_writer,
+    delay_seconds=WRITE_BEHIND_SECONDS,
+    max_delay_seconds=WRITE_BEHIND_MAX_DELAY_SECONDS
+)
+atexit.register(_write_behind.stop)
+
+def _completion_event_writer(owner, _):
+    """Background sender for the completion-event queue: sends the owner's unsynced events from the local store"""
+    db = get_db()
+    if db is None:
+        # They stay unsynced locally and go with the offline edits once MongoDB is back
+        with _snapshot_lock:
+            _outbox_synced.discard(owner)
+        return True
+    try:
+        _sync_completion_events(db, owner)
+        return True
+    except Exception as e:
+        record_failure(e)
+        raise
+
+# Completion events are logged locally at once and sent to MongoDB in the background, keyed by owner
+_completion_events = WriteBehindQueue(
+    _completion_event_writer,
+    delay_seconds=WRITE_BEHIND_SECONDS,
+    max_delay_seconds=WRITE_BEHIND_MAX_DELAY_SECONDS
+)
+atexit.register(_completion_events.stop)
+
+def _write_owner_now(owner):
+    _write_behind.write_now(owner)
+    _completion_events.write_now(owner)
+
+def _session_is_active(session_id):
+    return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
+
+# A closed session's queued saves are written right away rather than after their debounce window
+_session_watcher = SessionWatcher(_session_is_active, _write_owner_now, SESSION_CHECK_SECONDS)
 
-def save_courses(courses):
-    """Save courses to MongoDB and local backup"""
-    # Always save to session state as backup
-    st.session_state["courses_backup"] = courses
+def _watch_session(owner):
+    ctx = get_script_run_ctx()
+    if ctx is not None and Runtime.exists():
+        _session_watcher.watch(ctx.session_id, owner)
+
+def flush_pending_saves(timeout=None, owner=None):
+    """Write any queued saves and completion events (of every owner, or just ``owner``) now
+
+    Returns True when they were all persisted.
+    """
+    saved = _write_behind.flush(timeout, key=owner)
+    return _completion_events.flush(timeout, key=owner) and saved
+
+def get_save_status(owner=None):
+    """Return the owner's write-behind status ("saved", "pending" or "error") for the sidebar
+
+    ``offline_changes`` counts the courses edited offline that are still waiting to sync.
+    """
+    owner = owner or current_owner()
+    status = _write_behind.status(owner)
+    try:
+        status["offline_changes"] = get_local_store().count_operations(owner) if STORAGE_BACKEND != "sqlite" else 0
+    except Exception:
+        status["offline_changes"] = 0
+    return status
+
+def sync_offline_changes(owner=None):
+    """Replay the owner's edits made while offline if MongoDB is reachable again; returns :func:`get_sync_state`"""
+    owner = owner or current_owner()
+    if STORAGE_BACKEND != "sqlite" and not _outbox_is_synced(owner):
+        db = get_db()
+        if db is not None:
+            try:
+                # Queued saves go first so the replay sees the latest offline edits
+                flush_pending_saves(timeout=WRITE_BEHIND_MAX_DELAY_SECONDS, owner=owner)
+                _sync_outbox(db, owner)
+            except Exception as e:
+                record_failure(e)
+                st.error(f"❌ Error syncing offline changes: {e}")
+    return get_sync_state(owner)
+
+def get_sync_state(owner=None):
+    """Return {"conflicts": [course ids]} for the owner's offline edits that lost against newer changes"""
+    owner = owner or current_owner()
+    with _snapshot_lock:
+        return {"conflicts": list(_sync_state.get(owner, []))}
+
+def save_courses(courses, owner=None, course_ids=None):
+    """Save the owner's courses (the current session's by default) to MongoDB and local backup
+
+    ``course_ids`` names the courses the edit touched, so the session's derived
+    views update just those; without it they are rebuilt.
+    """
+    owner = owner or current_owner()
+    _mark_session_changed(course_ids)
+    # Always save to the local store as backup
+    saved_locally = _save_local(courses, owner)
+    if STORAGE_BACKEND == "sqlite":
+        return saved_locally
+    
+    if WRITE_BEHIND_SECONDS > 0:
+        # Copy now - the session keeps mutating its dict after this returns
+        _write_behind.submit(owner, copy_courses(courses))
+        _watch_session(owner)
+        return True
     
     db = get_db()
     if db is not None:
         try:
-            courses_collection = db["courses"]
-            
-            # Update the document with timestamp
-            result = courses_collection.update_one(
-                {"_id": "main"},
-                {
-                    "$set": {
-                        "courses": courses,
-                        "last_updated": datetime.now().isoformat()
-                    }
-                },
-                upsert=True
-            )
-            
-            # Clear the cache to ensure fresh data on next load
-            load_courses.clear()
-            
-            return result.acknowledged
+            return _persist_courses(db, owner, courses)
         except Exception as e:
+            record_failure(e)
             st.error(f"❌ Error saving courses to MongoDB: {e}")
             st.info("💡 Data saved locally but not synced to database")
             return False
     else:
-        # When MongoDB is not available, just confirm local save
-        st.info("💾 Data saved locally (MongoDB not connected)")
+        # Queue the changes so they sync once MongoDB is back
+        _record_offline_changes(courses, owner)
+        st.info("💾 Data saved locally - changes will sync when MongoDB reconnects")
         return True
 
-def backup_data():
-    """Create a backup of all course data"""
+def backup_data(owner=None):
+    """Create a backup of the owner's course data"""
+    owner = owner or current_owner()
     db = get_db()
     if db is not None:
         try:
-            courses_collection = db["courses"]
-            backup_collection = db["courses_backup"]
-            
             # Get current data
-            current_data = courses_collection.find_one({"_id": "main"})
+            current_courses = _read_courses(db, owner)
             
-            if current_data:
-                # Add backup timestamp
-                backup_doc = {
-                    **current_data,
-                    "_id": f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                    "backup_created": datetime.now().isoformat()
-                }
-                
-                result = backup_collection.insert_one(backup_doc)
-                return result.acknowledged
+            if current_courses is not None:
+                _prepare_backups(db)
+                backup_store.create_backup(db, current_courses, BACKUP_CHECKPOINT_INTERVAL, owner)
+                return True
             else:
                 st.warning("⚠️ No data found to backup")
                 return False
                 
         except Exception as e:
+            record_failure(e)
             st.error(f"❌ Error creating backup: {e}")
             return False
     return False
 
-def restore_data(backup_id):
-    """Restore data from a specific backup"""
+def restore_data(backup_id, owner=None):
+    """Restore the owner's data from one of their backups"""
+    owner = owner or current_owner()
     db = get_db()
     if db is not None:
         try:
-            courses_collection = db["courses"]
-            backup_collection = db["courses_backup"]
-            
-            # Get backup data
-            backup_data = backup_collection.find_one({"_id": backup_id})
+            # Rebuild the backed-up courses (newest backup is a single read)
+            backup_courses = backup_store.load_backup(db, backup_id, owner)
             
-            if backup_data:
-                # Restore the data (remove backup-specific fields)
-                restore_doc = {
-                    "_id": "main",
-                    "courses": backup_data.get("courses", {}),
-                    "last_updated": datetime.now().isoformat(),
-                    "restored_from": backup_id,
-                    "restored_at": datetime.now().isoformat()
-                }
-                
-                result = courses_collection.replace_one(
-                    {"_id": "main"},
-                    restore_doc,
-                    upsert=True
+            if backup_courses is not None:
+                acknowledged = _replace_courses(
+                    db,
+                    owner,
+                    backup_courses,
+                    restored_from=backup_id,
+                    restored_at=datetime.now().isoformat()
                 )
                 
-                # Clear cache
-                load_courses.clear()
-                
-                return result.acknowledged
+                return acknowledged
             else:
                 st.error(f"❌ Backup {backup_id} not found")
                 return False
                 
         except Exception as e:
+            record_failure(e)
             st.error(f"❌ Error restoring data: {e}")
             return False
     return False
 
-def get_backup_list():
-    """Get list of available backups"""
+def get_backup_page(page_size=None, after=None, owner=None):
+    """Get one page of the owner's backups, newest first
+
+    Returns {"backups": [...], "next_after": token}; pass ``next_after`` back as
+    ``after`` to fetch the following page (None when there are no more).
+    """
+    owner = owner or current_owner()
     db = get_db()
     if db is not None:
         try:
-            backup_collection = db["courses_backup"]
-            backups = backup_collection.find({}, {"_id": 1, "backup_created": 1}).sort("backup_created", -1)
+            _prepare_backups(db)
+            backups, next_after = backup_store.list_backups(db, page_size or BACKUP_PAGE_SIZE, after, owner)
             
             backup_list = []
             for backup in backups:
+                created = backup["backup_created"]
                 backup_list.append({
                     "id": backup["_id"],
-                    "created": backup.get("backup_created", "Unknown"),
-                    "formatted_date": datetime.fromisoformat(backup.get("backup_created", "")).strftime("%Y-%m-%d %H:%M:%S") if backup.get("backup_created") else "Unknown"
+                    "created": created.isoformat(),
+                    "formatted_date": created.strftime("%Y-%m-%d %H:%M:%S"),
+                    "kind": backup.get("kind", "full"),
+                    "size": backup.get("stored_size")
                 })
             
-            return backup_list
+            return {"backups": backup_list, "next_after": next_after}
         except Exception as e:
+            record_failure(e)
             st.error(f"❌ Error getting backup list: {e}")
-            return []
-    return []
+            return {"backups": [], "next_after": None}
+    return {"backups": [], "next_after": None}
 
-def delete_backup(backup_id):
-    """Delete a specific backup"""
+def get_backup_list(page_size=None, after=None, owner=None):
+    """Get list of the owner's available backups (one page, newest first)"""
+    return get_backup_page(page_size, after, owner)["backups"]
+
+def delete_backup(backup_id, owner=None):
+    """Delete one of the owner's backups"""
+    owner = owner or current_owner()
     db = get_db()
     if db is not None:
         try:
-            backup_collection = db["courses_backup"]
-            result = backup_collection.delete_one({"_id": backup_id})
-            return result.deleted_count > 0
+            return backup_store.delete_backup(db, backup_id, owner)
         except Exception as e:
+            record_failure(e)
             st.error(f"❌ Error deleting backup: {e}")
             return False
     return False
 
-def get_database_stats():
-    """Get database statistics"""
-    db = get_db()
-    if db is not None:
+# owner -> (data version, aggregates) of the last server-side aggregation
+_aggregates = {}
+
+def _aggregate(db, owner):
+    if STORAGE_MODE == "normalized":
+        _prepare_normalized(db, owner)
+        return aggregate_stats.collect_normalized(
+            db, owner, normalized_store.COURSE_COLLECTION, normalized_store.MODULE_COLLECTION
+        )
+    return aggregate_stats.collect_document(db, document_id(owner))
+
+def get_course_aggregates(owner=None):
+    """Per-course module counts and per-type totals, computed by the database
+
+    MongoDB runs an aggregation pipeline (the local SQLite store a SQL
+    query) and only the aggregates are transferred - see aggregate_stats for
+    the result shape. MongoDB results are reused until the data version changes.
+    They cover the persisted data only: while saves are still queued the
+    result is marked ``"pending"`` instead of waiting for them.
+    """
+    owner = owner or current_owner()
+    db = get_db() if STORAGE_BACKEND != "sqlite" else None
+    if db is None:
         try:
-            courses_collection = db["courses"]
-            backup_collection = db["courses_backup"]
-            
-            # Get document count and size
-            courses_count = courses_collection.count_documents({})
-            backup_count = backup_collection.count_documents({})
-            
-            # Get database stats
-            db_stats = db.command("dbStats")
-            
-            return {
-                "courses_documents": courses_count,
-                "backup_documents": backup_count,
-                "database_size": db_stats.get("dataSize", 0),
-                "storage_size": db_stats.get("storageSize", 0),
-                "indexes": db_stats.get("indexes", 0),
-                "collections": db_stats.get("collections", 0)
-            }
+            return get_local_store().course_aggregates(owner)
         except Exception as e:
-            st.error(f"❌ Error getting database stats: {e}")
-            return {}
-    return {}
+            st.error(f"❌ Error aggregating courses in local storage: {e}")
+            return {"courses": [], "types": []}
+    try:
+        _sync_outbox(db, owner)
+        version = _fetch_version(db, owner)
+        with _snapshot_lock:
+            cached = _aggregates.get(owner)
+        if cached is not None and cached[0] == version:
+            result = cached[1]
+        else:
+            result = _aggregate(db, owner)
+            with _snapshot_lock:
+                _aggregates[owner] = (version, result)
+        if _has_pending_saves(owner):
+            result = {**result, "pending": True}
+        return result
+    except Exception as e:
+        record_failure(e)
+        st.error(f"❌ Error aggregating courses: {e}")
+        return {"courses": [], "types": []}
 
-def export_to_json():
-    """Export all course data to JSON format"""
+def get_course_summary(owner=None):
+    """Overview totals, per-course progress and per-category/type counts (see course_summary)
+
+    Kept up to date by every write, so with MongoDB this is one projected read
+    of the owner's course document; the local store is summarized with one query.
+    Saves still queued aren't waited for - the summary is then marked ``"pending"``.
+    """
+    owner = owner or current_owner()
+    db = get_db() if STORAGE_BACKEND != "sqlite" else None
+    if db is None:
+        try:
+            return course_summary.summarize(get_local_store().course_aggregates(owner))
+        except Exception as e:
+            st.error(f"❌ Error summarizing courses in local storage: {e}")
+            return course_summary.from_stored(_summary({}))
+    try:
+        _sync_outbox(db, owner)
+        doc = db["courses"].find_one({"_id": document_id(owner)}, {"summary": 1, "version": 1})
+        if doc is not None and course_summary.is_materialized(doc.get("summary")):
+            summary = course_summary.from_stored(doc["summary"])
+        else:
+            # Stored before summaries (or this form of them) existed - materialize it once
+            version, courses = _read_versioned(db, owner)
+            stored = _summary(courses or {})
+            _store_summary(db, owner, version, stored)
+            summary = course_summary.from_stored(stored)
+        if _has_pending_saves(owner):
+            summary = {**summary, "pending": True}
+        return summary
+    except Exception as e:
+        record_failure(e)
+        st.error(f"❌ Error loading course summary: {e}")
+        return course_summary.from_stored(_summary({}))
+
+_completion_log_ready = threading.Event()
+_backfilled_owners = set()
+
+# (owner, day) -> (computed at, stats); entries of other days are dropped when a day is cached
+_learning_stats = {}
+
+def _prepare_completion_log(db):
+    """Create the completion log indexes once per process"""
+    if not _completion_log_ready.is_set():
+        completion_log.ensure_indexes(db)
+        _completion_log_ready.set()
+
+def _forget_learning_stats(owner):
+    with _snapshot_lock:
+        for key in [key for key in _learning_stats if key[0] == owner]:
+            del _learning_stats[key]
+
+def record_completions(changes, owner=None):
+    """Log module completions - ``changes`` lists (course name, module name, completed) tuples
+
+    Events are written to the local store right away and sent to MongoDB in
+    the background with the write-behind saves (at once when write-behind is
+    off); ones MongoDB didn't get are sent with the offline edits once it is
+    reachable again.
+    """
+    owner = owner or current_owner()
+    events = [completion_log.new_event(owner, course_name, module_name, completed)
+              for course_name, module_name, completed in changes]
+    if not events:
+        return True
+    _forget_learning_stats(owner)
+    try:
+        get_local_store().record_events(events)
+    except Exception as e:
+        st.warning(f"⚠️ Could not save to local storage: {e}")
+        return False
+    if STORAGE_BACKEND == "sqlite":
+        return True
+    if WRITE_BEHIND_SECONDS > 0:
+        _completion_events.submit(owner, None)
+        _watch_session(owner)
+        return True
+    try:
+        _completion_event_writer(owner, None)
+    except Exception:
+        with _snapshot_lock:
+            _outbox_synced.discard(owner)
+    return True
+
+def _backfill_completion_days(source, owner, has_days, load_courses, backfill):
+    """Seed an owner's empty rollups in ``source`` once from the completion dates stored on their modules"""
+    with _snapshot_lock:
+        if (source, owner) in _backfilled_owners:
+            return
+    if not has_days():
+        backfill(completion_log.day_counts(load_courses() or {}))
+    with _snapshot_lock:
+        _backfilled_owners.add((source, owner))
+
+def get_learning_stats(owner=None):
+    """Current streak and the completions made today and this week, from the completion log
+
+    Cached per owner and day. Completions logged by this process refresh it
+    at once, ones from other instances within the stats TTL.
+    """
+    owner = owner or current_owner()
+    today = date.today()
+    key = (owner, today.isoformat())
+    with _snapshot_lock:
+        cached = _learning_stats.get(key)
+    if cached is not None and time.monotonic() - cached[0] < STATS_TTL_SECONDS:
+        return cached[1]
+
+    since = (today - timedelta(days=completion_log.WEEK_DAYS - 1)).isoformat()
+    db = get_db() if STORAGE_BACKEND != "sqlite" else None
+    try:
+        if db is not None:
+            _prepare_completion_log(db)
+            _backfill_completion_days(
+                "mongo",
+                owner,
+                lambda: completion_log.has_days(db, owner),
+                lambda: _read_courses(db, owner),
+                lambda counts: completion_log.backfill_days(db, owner, counts)
+            )
+            stats = completion_log.summarize(
+                completion_log.iter_active_days(db, owner),
+                completion_log.net_completions_by_day(db, owner, since),
+                today
+            )
+        else:
+            store = get_local_store()
+            _backfill_completion_days(
+                "local",
+                owner,
+                lambda: store.has_days(owner),
+                lambda: dict(store.iter_courses(owner)),
+                lambda counts: store.backfill_days(owner, counts)
+            )
+            stats = completion_log.summarize(store.iter_active_days(owner), store.net_completions_by_day(owner, since), today)
+    except Exception as e:
+        if db is not None:
+            record_failure(e)
+        st.error(f"❌ Error loading learning streak: {e}")
+        return {"streak_days": 0, "completed_this_week": 0, "completed_today": 0}
+
+    _forget_learning_stats(owner)
+    with _snapshot_lock:
+        _learning_stats[key] = (time.monotonic(), stats)
+    return stats
+
+def _stats_db():
+    db = _background_db()
+    if db is None:
+        raise ConnectionFailure("MongoDB is not connected")
+    return db
+
+# One provider for the database-wide stats, shared by every owner, and one per owner for its own figures
+_database_stats = stats_provider.StatsProvider(
+    lambda: stats_provider.collect_database_stats(_stats_db()), STATS_TTL_SECONDS
+)
+_owner_stats = {}
+
+def _owner_stats_provider(owner):
+    with _snapshot_lock:
+        if owner not in _owner_stats:
+            _owner_stats[owner] = stats_provider.StatsProvider(
+                lambda: stats_provider.collect_owner_stats(_stats_db(), owner), STATS_TTL_SECONDS
+            )
+        return _owner_stats[owner]
+
+def get_database_stats(owner=None):
+    """Get database statistics (cached - refreshed in the background once older than the TTL)
+
+    Besides the database totals and per-collection sizes (``collection_stats``),
+    shared by every owner, reports the owner's course and backup counts
+    (``owner_courses`` / ``owner_backups``) and how close the owner's course
+    document is to MongoDB's 16 MB document limit (``main_document_size`` /
+    ``main_document_usage``).
+    """
+    owner = owner or current_owner()
+    if get_client() is None:
+        return {}
+    try:
+        database_stats = _database_stats.get()
+        owner_stats = _owner_stats_provider(owner).get()
+        return {
+            **database_stats,
+            **owner_stats,
+            "refreshed_at": min(database_stats["refreshed_at"], owner_stats["refreshed_at"])
+        }
+    except Exception as e:
+        record_failure(e)
+        st.error(f"❌ Error getting database stats: {e}")
+        return {}
+
+def export_to_json(owner=None):
+    """Export the owner's course data to JSON format"""
+    owner = owner or current_owner()
     db = get_db()
     if db is not None:
         try:
-            courses_collection = db["courses"]
-            doc = courses_collection.find_one({"_id": "main"})
+            courses = _read_courses(db, owner)
             
-            if doc:
+            if courses is not None:
                 import json
                 # Remove MongoDB-specific _id field
                 export_data = {
-                    "courses": doc.get("courses", {}),
+                    "courses": courses,
                     "exported_at": datetime.now().isoformat(),
                     "export_version": "1.0"
                 }
@@ -230,14 +1141,15 @@ def export_to_json():
             else:
                 return None
         except Exception as e:
+            record_failure(e)
             st.error(f"❌ Error exporting data: {e}")
             return None
     else:
-        # Export from session state if MongoDB not available
+        # Export from the local store if MongoDB not available
         try:
             import json
             export_data = {
-                "courses": st.session_state.get("courses_backup", {}),
+                "courses": get_local_store().load_courses(owner),
                 "exported_at": datetime.now().isoformat(),
                 "export_version": "1.0"
             }
@@ -246,56 +1158,107 @@ def export_to_json():
             st.error(f"❌ Error exporting data: {e}")
             return None
 
-def import_from_json(json_data):
-    """Import course data from JSON"""
+def _iter_stored_courses(db, owner):
+    """Yield the owner's (course_name, course_data) one course at a time for the active storage mode"""
+    if STORAGE_MODE == "normalized":
+        _prepare_normalized(db, owner)
+        return ndjson_export.iter_normalized_courses(db, owner)
+    return ndjson_export.iter_document_courses(db, owner=owner)
+
+def export_to_ndjson(compress=False, owner=None):
+    """Stream the owner's course data as NDJSON bytes, one course per line (gzip-compressed if requested)"""
+    owner = owner or current_owner()
+    db = get_db()
+    if db is not None:
+        course_items = _iter_stored_courses(db, owner)
+    else:
+        # Export from the local store if MongoDB not available
+        course_items = get_local_store().iter_courses(owner)
+    
+    chunks = ndjson_export.iter_ndjson(course_items)
+    return ndjson_export.gzip_chunks(chunks) if compress else chunks
+
+def export_to_ndjson_file(compress=False, owner=None):
+    """Write the streaming export to a spooled temp file that st.download_button can read"""
+    export_file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    try:
+        ndjson_export.write_stream(export_to_ndjson(compress, owner), export_file)
+        export_file.seek(0)
+        return export_file
+    except Exception as e:
+        record_failure(e)
+        export_file.close()
+        st.error(f"❌ Error exporting data: {e}")
+        return None
+
+def import_from_json(json_data, progress_callback=None, owner=None):
+    """Import the owner's course data from a JSON or NDJSON export (str, bytes or uploaded file)
+
+    The payload is parsed and validated one course at a time and written in
+    batches, so memory stays bounded. ``progress_callback(courses_imported,
+    fraction)`` is called after each course; ``fraction`` is None when the
+    payload size is unknown.
+    """
+    owner = owner or current_owner()
     db = get_db()
     try:
-        import json
-        data = json.loads(json_data)
+        stream, total_bytes, counter = streaming_import.open_source(json_data)
         
-        if "courses" in data:
-            courses = data["courses"]
+        if db is not None:
+            # Queued edits predate the import - write them first so they can't land on top
+            # (and so the backup below includes them)
+            flush_pending_saves(timeout=WRITE_BEHIND_MAX_DELAY_SECONDS, owner=owner)
+            _sync_outbox(db, owner)
             
-            # Save to session state first
-            st.session_state["courses_backup"] = courses
+            # Create backup before importing
+            backup_result = backup_data(owner)
+            if backup_result:
+                st.success("✅ Backup created before import")
             
-            if db is not None:
-                courses_collection = db["courses"]
-                
-                # Create backup before importing
-                backup_result = backup_data()
-                if backup_result:
-                    st.success("✅ Backup created before import")
-                
-                # Import the data
-                import_doc = {
-                    "_id": "main",
-                    "courses": courses,
-                    "last_updated": datetime.now().isoformat(),
-                    "imported_at": datetime.now().isoformat()
-                }
-                
-                result = courses_collection.replace_one(
-                    {"_id": "main"},
-                    import_doc,
-                    upsert=True
+            with _write_lock(owner):
+                if STORAGE_MODE == "normalized":
+                    _prepare_normalized(db, owner)
+                    writer = streaming_import.NormalizedImportWriter(db, IMPORT_BATCH_SIZE, owner)
+                else:
+                    writer = streaming_import.DocumentImportWriter(db, IMPORT_BATCH_SIZE, owner)
+                analytics = CourseAnalytics()
+                imported, _ = streaming_import.import_courses(
+                    stream, writer, total_bytes, counter, progress_callback, analytics
                 )
-                
-                # Clear cache
-                load_courses.clear()
-                
-                return result.acknowledged
-            else:
-                st.info("💾 Data imported locally (MongoDB not connected)")
-                return True
+                if STORAGE_MODE == "normalized":
+                    summary = course_summary.materialize(analytics.aggregates())
+                    version = _bump_version(db, owner, {"$set": {"summary": summary}})
+                else:
+                    version = _fetch_version(db, owner)
+                # The imported data was never held in memory - the next save sends everything
+                _remember_snapshot(owner, None)
+            
+            _course_cache.invalidate(owner)
+            _publish_change(db, owner, version, None)
+            
+            st.success(f"✅ Imported {imported} courses")
+            return True
         else:
-            st.error("❌ Invalid JSON format - missing 'courses' field")
-            return False
+            store = get_local_store()
+            with _write_lock(owner):
+                previous = _snapshot(owner)
+                if previous is None:
+                    # Offline since startup - the local store holds the last state that was synced
+                    previous = store.last_saved(owner) or store.load_courses(owner)
+                writer = replication.OutboxImportWriter(store.import_writer(owner), previous, owner)
+                imported, _ = streaming_import.import_courses(stream, writer, total_bytes, counter, progress_callback)
+                with _snapshot_lock:
+                    _outbox_synced.discard(owner)
+                # Later offline saves are diffed against the imported courses
+                _remember_snapshot(owner, store.load_courses(owner), assumed=True)
+            st.info(f"💾 Imported {imported} courses locally (MongoDB not connected)")
+            return True
             
-    except json.JSONDecodeError as e:
-        st.error(f"❌ Invalid JSON format: {e}")
+    except streaming_import.ImportFormatError as e:
+        st.error(f"❌ Invalid import file: {e}")
         return False
     except Exception as e:
+        record_failure(e)
         st.error(f"❌ Error importing data: {e}")
         return False
 
@@ -304,21 +1267,29 @@ def check_connection():
     db = get_db()
     return db is not None
 
-def initialize_database():
-    """Initialize the database with default structure if needed"""
+def initialize_database(owner=None):
+    """Initialize the database with default structure for the owner if needed"""
+    owner = owner or current_owner()
     db = get_db()
     if db is not None:
         try:
+            _prepare_owners(db)
+            if STORAGE_MODE == "normalized":
+                _prepare_normalized(db, owner)
+                return True
+            
             courses_collection = db["courses"]
             
-            # Check if main document exists
-            doc = courses_collection.find_one({"_id": "main"})
+            # Check if the owner's document exists
+            doc = courses_collection.find_one({"_id": document_id(owner)})
             
             if not doc:
                 # Create initial document
                 initial_doc = {
-                    "_id": "main",
+                    "_id": document_id(owner),
+                    "owner": owner,
                     "courses": {},
+                    "summary": _summary({}),
                     "created": datetime.now().isoformat(),
                     "last_updated": datetime.now().isoformat()
                 }
@@ -330,6 +1301,7 @@ def initialize_database():
                 return True
                 
         except Exception as e:
+            record_failure(e)
             st.error(f"❌ Error initializing database: {e}")
             return False
     return False
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""Streaming NDJSON export: one line per course, optionally gzip-compressed"""
+from pymongo import ASCENDING
+from datetime import datetime
+import json
+import zlib
+from database import normalized_store
+from database.owners import DEFAULT_OWNER, document_id
+
+EXPORT_VERSION = "2.0"
+
+def iter_document_courses(db, batch_size=50, owner=DEFAULT_OWNER):
+    """Yield (course_name, course_data) from the owner's course document without loading it client-side"""
+    pipeline = [
+        {"$match": {"_id": document_id(owner)}},
+        {"$project": {"items": {"$objectToArray": "$courses"}}},
+        {"$unwind": "$items"},
+        {"$replaceRoot": {"newRoot": "$items"}}
+    ]
+    for item in db["courses"].aggregate(pipeline, batchSize=batch_size):
+        yield item["k"], item["v"]
+
+def iter_normalized_courses(db, owner=DEFAULT_OWNER):
+    """Yield (course_name, course_data) one course at a time from the owner's normalized documents"""
+    courses = db[normalized_store.COURSE_COLLECTION]
+    modules = db[normalized_store.MODULE_COLLECTION]
+    for doc in courses.find({"owner": owner}).sort("position", ASCENDING):
+        yield doc["name"], normalized_store.build_course(doc, modules.find({"course_id": doc["_id"]}))
+
+def iter_ndjson(course_items):
+    """Yield NDJSON lines (bytes): a header line, then one line per course"""
+    header = {
+        "type": "export",
+        "export_version": EXPORT_VERSION,
+        "exported_at": datetime.now().isoformat()
+    }
+    yield (json.dumps(header) + "\n").encode("utf-8")
+    for course_name, course_data in course_items:
+        line = {"type": "course", "name": course_name, "data": course_data}
+        yield (json.dumps(line, default=str) + "\n").encode("utf-8")
+
+def gzip_chunks(chunks, min_chunk_size=64 * 1024):
+    """Gzip-compress a stream of byte chunks, yielding compressed blocks as they fill"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            buffer.append(data)
+            size += len(data)
+        if size >= min_chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    buffer.append(compressor.flush())
+    yield b"".join(buffer)
+
+def write_stream(chunks, fileobj):
+    """Write a chunk stream to a binary file object; returns bytes written"""
+    written = 0
+    for chunk in chunks:
+        fileobj.write(chunk)
+        written += len(chunk)
+    return written
@@ -0,0 +1,219 @@
+"""Normalized storage: one document per course and one per module instead of the "main" blob"""
+from pymongo import ASCENDING, DESCENDING, UpdateOne, DeleteOne, DeleteMany, ReplaceOne
+from datetime import datetime
+import hashlib
+from database.owners import DEFAULT_OWNER, course_key, document_id
+from utils.analytics import count_modules, course_status
+
+COURSE_COLLECTION = "course_items"
+MODULE_COLLECTION = "module_items"
+
+# Fields owned by the storage layer - everything else is course/module data
+COURSE_RESERVED_FIELDS = ("_id", "owner", "name", "position", "module_order", "status", "total_modules", "completed_modules")
+MODULE_RESERVED_FIELDS = ("_id", "owner", "course_id", "name")
+
+def module_id(course_id, module_name):
+    """Stable id for a module inside a course"""
+    return hashlib.sha1(f"{course_id}\x1f{module_name}".encode("utf-8")).hexdigest()
+
+def ensure_indexes(db):
+    """Create the secondary indexes used by the normalized collections"""
+    courses = db[COURSE_COLLECTION]
+    courses.create_index([("owner", ASCENDING), ("position", ASCENDING)])
+    courses.create_index([("owner", ASCENDING), ("status", ASCENDING)])
+    courses.create_index([("owner", ASCENDING), ("category", ASCENDING)])
+    courses.create_index([("owner", ASCENDING), ("_meta.updated", DESCENDING)])
+
+    modules = db[MODULE_COLLECTION]
+    modules.create_index([("course_id", ASCENDING), ("name", ASCENDING)], unique=True)
+    modules.create_index([("course_id", ASCENDING), ("completed", ASCENDING)])
+    modules.create_index([("owner", ASCENDING), ("type", ASCENDING)])
+    modules.create_index([("owner", ASCENDING), ("updated", DESCENDING)])
+    modules.create_index([("owner", ASCENDING), ("completion_date", DESCENDING)])
+    _tag_legacy_documents(db)
+
+def _tag_legacy_documents(db):
+    """Documents written before owner partitioning belong to the default owner"""
+    db[COURSE_COLLECTION].update_many(
+        {"owner": {"$exists": False}},
+        [{"$set": {"owner": DEFAULT_OWNER, "name": "$_id"}}]
+    )
+    db[MODULE_COLLECTION].update_many({"owner": {"$exists": False}}, {"$set": {"owner": DEFAULT_OWNER}})
+
+def _course_fields(course_data):
+    """Course document fields (without modules), including derived counters"""
+    subcourses = course_data.get("subcourses", {})
+    total, completed = count_modules(course_data)
+    fields = {key: value for key, value in course_data.items()
+              if key != "subcourses" and key not in COURSE_RESERVED_FIELDS}
+    fields.update({
+        "module_order": list(subcourses),
+        "status": course_status(total, completed),
+        "total_modules": total,
+        "completed_modules": completed
+    })
+    return fields
+
+def _module_doc(owner, course_id, module_name, module_data):
+    doc = {key: value for key, value in module_data.items() if key not in MODULE_RESERVED_FIELDS}
+    doc.update({"_id": module_id(course_id, module_name), "owner": owner, "course_id": course_id, "name": module_name})
+    return doc
+
+def course_documents(owner, course_name, course_data, position):
+    """Return (course document, module documents) for inserting one course"""
+    course_id = course_key(owner, course_name)
+    course_doc = _course_fields(course_data)
+    course_doc.update({"_id": course_id, "owner": owner, "name": course_name, "position": position})
+    module_docs = [_module_doc(owner, course_id, name, module_data)
+                   for name, module_data in course_data.get("subcourses", {}).items()]
+    return course_doc, module_docs
+
+def build_course(course_doc, module_docs):
+    """Assemble the nested course dict from a course document and its module documents"""
+    modules = {
+        doc["name"]: {key: value for key, value in doc.items() if key not in MODULE_RESERVED_FIELDS}
+        for doc in module_docs
+    }
+    ordered = {name: modules[name] for name in course_doc.get("module_order", []) if name in modules}
+    # Modules written outside the recorded order still show up, at the end
+    for name, module_data in modules.items():
+        ordered.setdefault(name, module_data)
+
+    course_data = {key: value for key, value in course_doc.items() if key not in COURSE_RESERVED_FIELDS}
+    course_data["subcourses"] = ordered
+    return course_data
+
+def load_courses(db, owner=DEFAULT_OWNER):
+    """Rebuild one owner's nested course dict from the normalized collections"""
+    modules_by_course = {}
+    for doc in db[MODULE_COLLECTION].find({"owner": owner}):
+        modules_by_course.setdefault(doc["course_id"], []).append(doc)
+
+    courses = {}
+    for doc in db[COURSE_COLLECTION].find({"owner": owner}).sort("position", ASCENDING):
+        courses[doc["name"]] = build_course(doc, modules_by_course.get(doc["_id"], []))
+    return courses
+
+def _course_ops(owner, course_name, old_course, new_course, module_ops):
+    """Queue the module writes for one course and return its course-document update"""
+    course_id = course_key(owner, course_name)
+    old_modules = (old_course or {}).get("subcourses", {})
+    new_modules = new_course.get("subcourses", {})
+
+    for name, module_data in new_modules.items():
+        if old_modules.get(name) != module_data:
+            doc = _module_doc(owner, course_id, name, module_data)
+            module_ops.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+    for name in old_modules:
+        if name not in new_modules:
+            module_ops.append(DeleteOne({"_id": module_id(course_id, name)}))
+
+    new_fields = _course_fields(new_course)
+    if old_course is None:
+        new_fields.update({"owner": owner, "name": course_name})
+        return UpdateOne({"_id": course_id}, {"$set": new_fields}, upsert=True)
+
+    old_fields = _course_fields(old_course)
+    changed = {key: value for key, value in new_fields.items() if old_fields.get(key) != value}
+    removed = {key: "" for key in old_fields if key not in new_fields}
+    if not changed and not removed:
+        return None
+
+    update = {}
+    if changed:
+        update["$set"] = changed
+    if removed:
+        update["$unset"] = removed
+    return UpdateOne({"_id": course_id}, update, upsert=True)
+
+def save_courses(db, old, new, owner=DEFAULT_OWNER):
+    """Write only the courses and modules of ``owner`` that differ between ``old`` and ``new``
+
+    With no previous snapshot (``old`` is None) every course is upserted and
+    the owner's courses that are no longer present are removed.
+    Returns True when MongoDB acknowledged the writes.
+    """
+    course_ops = []
+    module_ops = []
+
+    if old is None:
+        keys = [course_key(owner, name) for name in new]
+        course_ops.append(DeleteMany({"owner": owner, "_id": {"$nin": keys}}))
+        module_ops.append(DeleteMany({"owner": owner, "course_id": {"$nin": keys}}))
+        old = {}
+
+    for course_name in old:
+        if course_name not in new:
+            course_ops.append(DeleteOne({"_id": course_key(owner, course_name)}))
+            module_ops.append(DeleteMany({"course_id": course_key(owner, course_name)}))
+
+    for course_name, course_data in new.items():
+        if old.get(course_name) != course_data:
+            op = _course_ops(owner, course_name, old.get(course_name), course_data, module_ops)
+            if op is not None:
+                course_ops.append(op)
+
+    # Positions only change when courses are added, removed or reordered
+    if list(old) != list(new):
+        course_ops.extend(
+            UpdateOne(
+                {"_id": course_key(owner, course_name)},
+                {"$set": {"position": position, "owner": owner, "name": course_name}},
+                upsert=True
+            )
+            for position, course_name in enumerate(new)
+        )
+
+    acknowledged = True
+    if module_ops:
+        acknowledged = db[MODULE_COLLECTION].bulk_write(module_ops, ordered=False).acknowledged and acknowledged
+    if course_ops:
+        acknowledged = db[COURSE_COLLECTION].bulk_write(course_ops, ordered=True).acknowledged and acknowledged
+    return acknowledged
+
+def replace_course(db, owner, course_name, course_data):
+    """Overwrite one course and its modules, keeping its position (new courses go last)"""
+    courses = db[COURSE_COLLECTION]
+    course_id = course_key(owner, course_name)
+    existing = courses.find_one({"_id": course_id}, {"position": 1})
+    if existing is not None:
+        position = existing.get("position", 0)
+    else:
+        last = courses.find_one({"owner": owner}, {"position": 1}, sort=[("position", DESCENDING)])
+        position = last.get("position", 0) + 1 if last else 0
+
+    course_doc, module_docs = course_documents(owner, course_name, course_data, position)
+    db[MODULE_COLLECTION].delete_many({"course_id": course_id})
+    if module_docs:
+        db[MODULE_COLLECTION].insert_many(module_docs, ordered=False)
+    courses.replace_one({"_id": course_id}, course_doc, upsert=True)
+
+def delete_course(db, owner, course_name):
+    """Remove one course and its modules"""
+    course_id = course_key(owner, course_name)
+    db[MODULE_COLLECTION].delete_many({"course_id": course_id})
+    db[COURSE_COLLECTION].delete_one({"_id": course_id})
+
+def is_empty(db, owner=DEFAULT_OWNER):
+    """Return True if no course of ``owner`` has been stored in the normalized collections yet"""
+    return db[COURSE_COLLECTION].find_one({"owner": owner}, {"_id": 1}) is None
+
+def migrate_from_main_document(db, owner=DEFAULT_OWNER):
+    """Copy the owner's legacy course document into the normalized collections
+
+    The document is kept (marked as migrated) so the move can be rolled back;
+    a marked document is never migrated again, so courses deleted since then
+    stay deleted. Returns the number of courses migrated.
+    """
+    main_doc = db["courses"].find_one({"_id": document_id(owner), "migrated_to": {"$exists": False}})
+    if not main_doc or not main_doc.get("courses"):
+        return 0
+
+    courses = main_doc["courses"]
+    ensure_indexes(db)
+    save_courses(db, None, courses, owner)
+    db["courses"].update_one(
+        {"_id": document_id(owner)},
+        {"$set": {"migrated_to": "normalized", "migrated_at": datetime.now().isoformat()}}
+    )
+    return len(courses)
@@ -0,0 +1,44 @@
+"""Owner partitioning: every course belongs to one owner (a user or a workspace)
+
+The default owner keeps the identifiers used before partitioning existed -
+the ``{"_id": "main"}`` document and plain course names - so existing data
+needs no rewrite.
+
+Signed-in users own their courses under their identity. A workspace is only
+opened for users listed as its members in ``WORKSPACE_COLLECTION``
+(``{"_id": workspace, "members": [user, ...]}``).
+"""
+from pymongo import ASCENDING
+
+DEFAULT_OWNER = "main"
+
+# Separates the owner from the course name in normalized course ids
+KEY_SEPARATOR = "\x1f"
+
+WORKSPACE_COLLECTION = "workspaces"
+
+def document_id(owner):
+    """_id of the owner's course document (document storage mode)"""
+    return "main" if owner == DEFAULT_OWNER else f"workspace:{owner}"
+
+def course_key(owner, course_name):
+    """Globally unique _id for one owner's course in normalized storage"""
+    return course_name if owner == DEFAULT_OWNER else f"{owner}{KEY_SEPARATOR}{course_name}"
+
+def ensure_indexes(db):
+    """Index the course documents by owner and tag documents written before partitioning"""
+    db["courses"].create_index([("owner", ASCENDING)])
+    db["courses"].update_many(
+        {"_id": "main", "owner": {"$exists": False}},
+        {"$set": {"owner": DEFAULT_OWNER}}
+    )
+
+def is_member(db, workspace, user):
+    """True if ``user`` is listed as a member of ``workspace``"""
+    return db[WORKSPACE_COLLECTION].find_one({"_id": workspace, "members": user}, {"_id": 1}) is not None
+
+def add_member(db, workspace, user):
+    db[WORKSPACE_COLLECTION].update_one({"_id": workspace}, {"$addToSet": {"members": user}}, upsert=True)
+
+def remove_member(db, workspace, user):
+    db[WORKSPACE_COLLECTION].update_one({"_id": workspace}, {"$pull": {"members": user}})
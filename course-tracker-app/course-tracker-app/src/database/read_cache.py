@@ -0,0 +1,153 @@
+"""Process-wide read cache of the course data, keyed by the stored data version
+
+Every write to MongoDB increments a ``version`` counter, so a cached copy is
+still valid as long as that counter hasn't moved - which costs a single
+projected read to check. Cached values are frozen and shared by every
+session as-is; a session takes one mutable copy with :func:`thaw` when it
+starts working on the data.
+"""
+import threading
+import time
+
+class FrozenDict(dict):
+    """A dict that refuses to be modified"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Cached course data is read-only - use thaw() for a working copy")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+def freeze(value):
+    """Return a read-only copy of nested dicts/lists (lists become tuples)"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """Return a plain, mutable copy of a frozen value"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+class VersionedCache:
+    """Frozen values keyed by name, each tagged with the data version it was read at
+
+    ``revalidate_seconds`` lets a value be served without checking the version
+    again for a short while (0 checks on every read).
+
+    The shared lock only guards reading and swapping entries. Version checks
+    and loads run outside it under a per-key lock, so a slow read of one key
+    never holds up another, and concurrent readers of the same key share one
+    check (and one load) instead of each going to the database.
+    """
+
+    def __init__(self, revalidate_seconds=0.0):
+        self._revalidate_seconds = revalidate_seconds
+        self._entries = {}
+        self._key_locks = {}
+        # key -> number of invalidations, so a load that raced one isn't stored
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(self, key, fetch_version, load):
+        """Return the value for ``key``, reloading it only when the version changed
+
+        ``fetch_version()`` returns the current version cheaply; ``load()``
+        returns ``(version, value)`` read together.
+        """
+        return self.get_with_version(key, fetch_version, load)[1]
+
+    def get_with_version(self, key, fetch_version, load):
+        """Like :meth:`get` but returns ``(version, value)``"""
+        started = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and started - entry["checked"] < self._revalidate_seconds:
+                return entry["version"], entry["value"]
+
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+                generation = self._generations.get(key, 0)
+            # Checked by another reader while this one waited - that check is recent enough
+            if entry is not None and entry["checked"] >= started:
+                return entry["version"], entry["value"]
+
+            now = time.monotonic()
+            version = fetch_version()
+            if entry is not None and entry["version"] == version:
+                with self._lock:
+                    entry["checked"] = now
+                return version, entry["value"]
+
+            version, value = load()
+            value = freeze(value)
+            with self._lock:
+                current = self._entries.get(key)
+                newer = current is not None and current["version"] is not None and version is not None \
+                    and current["version"] > version
+                if not newer and self._generations.get(key, 0) == generation:
+                    self._entries[key] = {"version": version, "value": value, "checked": now}
+            return version, value
+
+    def put(self, key, version, value):
+        """Store a value written by this process (ignored if a newer version is already cached)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] is not None and version is not None \
+                    and entry["version"] > version:
+                return
+            self._entries[key] = {"version": version, "value": freeze(value), "checked": time.monotonic()}
+
+    def patch(self, key, base_version, version, changes):
+        """Move a cached dict from ``base_version`` to ``version`` by replacing only ``changes``
+
+        ``changes`` maps entry names to their new value (None removes the
+        entry). Returns False - and drops the entry - if the cached value is
+        not at ``base_version``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if entry["version"] != base_version:
+                self._entries.pop(key, None)
+                return False
+            value = {name: item for name, item in entry["value"].items()
+                     if name not in changes or changes[name] is not None}
+            for name, item in changes.items():
+                if item is not None:
+                    value[name] = freeze(item)
+            self._entries[key] = {"version": version, "value": FrozenDict(value), "checked": time.monotonic()}
+            return True
+
+    def invalidate(self, key=None):
+        """Drop one entry (or all of them) so the next read goes to the database"""
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            for name in keys:
+                self._entries.pop(name, None)
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+    def version(self, key):
+        """Version of the cached value for ``key`` (None if not cached)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry["version"] if entry is not None else None
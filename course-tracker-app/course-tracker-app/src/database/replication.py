@@ -0,0 +1,231 @@
+"""Replication of offline edits back to MongoDB
+
+While MongoDB is unreachable every save (and import) records one operation per
+changed or removed course in the local store's outbox. When the connection recovers the
+outbox is replayed in batches. Each operation carries the course's
+``_meta.updated`` stamp as MongoDB last held it (``base_updated``) and is only
+applied if MongoDB still holds that version - or already holds the
+operation's own result, which makes replaying twice harmless. Anything else is
+a conflict: the server copy wins and the offline copy is kept in
+``sync_conflicts`` so it can be recovered by hand.
+
+Each owner's outbox is replayed separately, against that owner's data only.
+"""
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import datetime
+import uuid
+from database import normalized_store
+from database.change_tracker import is_safe_key
+from database.owners import DEFAULT_OWNER, course_key, document_id
+
+APPLIED_COLLECTION = "sync_applied_ops"
+CONFLICT_COLLECTION = "sync_conflicts"
+
+def course_stamp(course_data):
+    """Return the course's ``_meta.updated`` stamp (None if it has none)"""
+    return ((course_data or {}).get("_meta") or {}).get("updated")
+
+def stamp_changed_courses(previous, courses):
+    """Set ``_meta.updated`` on every course of ``courses`` that differs from ``previous``"""
+    if previous is None:
+        return
+    now = datetime.now().isoformat()
+    for course_id, course_data in courses.items():
+        if previous.get(course_id) != course_data and isinstance(course_data, dict):
+            course_data["_meta"] = {**(course_data.get("_meta") or {}), "updated": now}
+
+def build_operations(previous, courses, owner=DEFAULT_OWNER):
+    """Return the outbox operations that turn the owner's ``previous`` (MongoDB's state) into ``courses``"""
+    now = datetime.now().isoformat()
+    operations = []
+    for course_id, course_data in courses.items():
+        old_course = previous.get(course_id)
+        if old_course == course_data:
+            continue
+        base = course_stamp(old_course)
+        if course_stamp(course_data) in (None, base):
+            # The new version needs its own stamp to be told apart from the base
+            course_data = {**course_data, "_meta": {**(course_data.get("_meta") or {}), "updated": now}}
+        operations.append({
+            "op_id": uuid.uuid4().hex,
+            "owner": owner,
+            "course_id": course_id,
+            "op": "upsert",
+            "payload": course_data,
+            "base_updated": base,
+            "created": now
+        })
+    for course_id, old_course in previous.items():
+        if course_id not in courses:
+            operations.append({
+                "op_id": uuid.uuid4().hex,
+                "owner": owner,
+                "course_id": course_id,
+                "op": "delete",
+                "payload": None,
+                "base_updated": course_stamp(old_course),
+                "created": now
+            })
+    return operations
+
+class OutboxImportWriter:
+    """Import writer (see ``streaming_import.import_courses``) that records the import in the outbox
+
+    Wraps the local store's import writer and queues, in the same
+    transaction, the operations that turn ``previous`` (MongoDB's last known
+    state of the owner's courses) into the imported courses: an upsert per
+    imported course that differs and a delete per course the import dropped.
+    """
+
+    def __init__(self, writer, previous, owner=DEFAULT_OWNER):
+        self._writer = writer
+        self._previous = previous
+        self._owner = owner
+        self._imported = set()
+
+    def add(self, name, data):
+        old = {name: self._previous[name]} if name in self._previous else {}
+        operations = build_operations(old, {name: data}, self._owner)
+        if operations:
+            # Store the course with the stamp its operation carries
+            data = operations[0]["payload"]
+            self._writer.queue_operations(operations)
+        self._writer.add(name, data)
+        self._imported.add(name)
+
+    def commit(self, **metadata):
+        removed = {name: course for name, course in self._previous.items() if name not in self._imported}
+        self._writer.queue_operations(build_operations(removed, {}, self._owner))
+        self._writer.commit(**metadata)
+
+    def abort(self):
+        self._writer.abort()
+
+def _document_update(doc_id, operation):
+    """Conditional UpdateOne for a course with a dotted-path-safe name"""
+    path = f"courses.{operation['course_id']}"
+    if operation["op"] == "delete":
+        condition = {"$or": [{f"{path}._meta.updated": operation["base_updated"]}, {path: {"$exists": False}}]}
+        return UpdateOne({"_id": doc_id, **condition}, {"$unset": {path: ""}})
+    expected = [operation["base_updated"], course_stamp(operation["payload"])]
+    return UpdateOne(
+        {"_id": doc_id, f"{path}._meta.updated": {"$in": expected}},
+        {"$set": {path: operation["payload"]}}
+    )
+
+def _document_unsafe_update(collection, doc_id, operation):
+    """Course names with '.' or a leading '$' can't be matched by path - applied without the version check"""
+    if operation["op"] == "delete":
+        value = "$$REMOVE"
+    else:
+        value = {"$literal": operation["payload"]}
+    collection.update_one({"_id": doc_id}, [{"$set": {"courses": {"$setField": {
+        "field": {"$literal": operation["course_id"]}, "input": "$courses", "value": value
+    }}}}])
+
+def _apply_document(db, operations, owner):
+    """Apply a batch to the owner's course document; returns the operations that conflicted"""
+    collection = db["courses"]
+    doc_id = document_id(owner)
+    collection.update_one({"_id": doc_id}, {"$setOnInsert": {"owner": owner, "courses": {}}}, upsert=True)
+
+    safe = [operation for operation in operations if is_safe_key(operation["course_id"])]
+    for operation in operations:
+        if not is_safe_key(operation["course_id"]):
+            _document_unsafe_update(collection, doc_id, operation)
+    if not safe:
+        return []
+
+    collection.bulk_write([_document_update(doc_id, operation) for operation in safe], ordered=False)
+
+    # Read back only the stamps of the courses in this batch to see which writes matched
+    projection = {f"courses.{operation['course_id']}._meta.updated": 1 for operation in safe}
+    stored = (collection.find_one({"_id": doc_id}, projection) or {}).get("courses", {})
+    conflicts = []
+    for operation in safe:
+        course_id = operation["course_id"]
+        if operation["op"] == "delete":
+            applied = course_id not in stored
+        else:
+            applied = course_stamp(stored.get(course_id)) == course_stamp(operation["payload"])
+        if not applied:
+            conflicts.append((operation, course_stamp(stored.get(course_id))))
+    return conflicts
+
+def _apply_normalized(db, operations, owner):
+    """Apply a batch to the owner's normalized documents; returns the operations that conflicted"""
+    courses = db[normalized_store.COURSE_COLLECTION]
+    stored = {doc["_id"]: doc for doc in courses.find(
+        {"_id": {"$in": [course_key(owner, operation["course_id"]) for operation in operations]}},
+        {"_meta.updated": 1}
+    )}
+
+    conflicts = []
+    for operation in operations:
+        course_doc = stored.get(course_key(owner, operation["course_id"]))
+        server_stamp = course_stamp(course_doc)
+        if operation["op"] == "delete":
+            if course_doc is not None and server_stamp != operation["base_updated"]:
+                conflicts.append((operation, server_stamp))
+                continue
+            normalized_store.delete_course(db, owner, operation["course_id"])
+        else:
+            expected = (operation["base_updated"], course_stamp(operation["payload"]))
+            if course_doc is not None and server_stamp not in expected:
+                conflicts.append((operation, server_stamp))
+                continue
+            normalized_store.replace_course(db, owner, operation["course_id"], operation["payload"])
+    return conflicts
+
+def _record_conflicts(db, conflicts):
+    now = datetime.now().isoformat()
+    for operation, server_stamp in conflicts:
+        db[CONFLICT_COLLECTION].replace_one({"_id": operation["op_id"]}, {
+            "_id": operation["op_id"],
+            "owner": operation.get("owner", DEFAULT_OWNER),
+            "course_id": operation["course_id"],
+            "op": operation["op"],
+            "local": operation["payload"],
+            "base_updated": operation["base_updated"],
+            "server_updated": server_stamp,
+            "detected_at": now
+        }, upsert=True)
+
+def _mark_applied(db, operations):
+    now = datetime.now().isoformat()
+    docs = [{"_id": operation["op_id"], "course_id": operation["course_id"], "applied_at": now}
+            for operation in operations]
+    if not docs:
+        return
+    try:
+        db[APPLIED_COLLECTION].insert_many(docs, ordered=False)
+    except BulkWriteError:
+        # Already recorded by an earlier, interrupted replay
+        pass
+
+def replay(db, store, storage_mode="document", batch_size=100, owner=DEFAULT_OWNER):
+    """Send the owner's local outbox to MongoDB; returns (operations applied, course ids in conflict)"""
+    applied = 0
+    conflicted = []
+    while True:
+        operations = store.pending_operations(batch_size, owner)
+        if not operations:
+            break
+
+        # Operations recorded as applied by an interrupted replay are just dropped from the outbox
+        op_ids = [operation["op_id"] for operation in operations]
+        done = {doc["_id"] for doc in db[APPLIED_COLLECTION].find({"_id": {"$in": op_ids}}, {"_id": 1})}
+        todo = [operation for operation in operations if operation["op_id"] not in done]
+
+        if storage_mode == "normalized":
+            conflicts = _apply_normalized(db, todo, owner)
+        else:
+            conflicts = _apply_document(db, todo, owner)
+        _record_conflicts(db, conflicts)
+        _mark_applied(db, todo)
+        store.complete_operations(op_ids)
+
+        applied += len(todo) - len(conflicts)
+        conflicted.extend(operation["course_id"] for operation, _ in conflicts)
+    return applied, conflicted
@@ -0,0 +1,498 @@
+"""Embedded SQLite course store - durable offline fallback shared by every session of the process"""
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+from utils.analytics import count_modules, course_status
+from database.owners import DEFAULT_OWNER, course_key
+from database.models import copy_courses
+
+# course_id holds owners.course_key(owner, name), so ids are unique across owners
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    course_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT 'main',
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    total_modules INTEGER NOT NULL,
+    completed_modules INTEGER NOT NULL,
+    updated TEXT,
+    module_order TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS modules (
+    course_id TEXT NOT NULL,
+    owner TEXT NOT NULL DEFAULT 'main',
+    name TEXT NOT NULL,
+    completed INTEGER NOT NULL,
+    type TEXT,
+    created TEXT,
+    updated TEXT,
+    completion_date TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (course_id, name)
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    course_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT 'main',
+    name TEXT NOT NULL,
+    op_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    payload TEXT,
+    base_updated TEXT,
+    created TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS completion_events (
+    event_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    course TEXT NOT NULL,
+    module TEXT NOT NULL,
+    completed INTEGER NOT NULL,
+    at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS completion_days (
+    owner TEXT NOT NULL,
+    day TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    uncompleted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (owner, day)
+);
+CREATE TABLE IF NOT EXISTS workspace_members (
+    workspace TEXT NOT NULL,
+    member TEXT NOT NULL,
+    PRIMARY KEY (workspace, member)
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_courses_owner_position ON courses (owner, position);
+CREATE INDEX IF NOT EXISTS idx_courses_status ON courses (status);
+CREATE INDEX IF NOT EXISTS idx_courses_updated ON courses (updated);
+CREATE INDEX IF NOT EXISTS idx_modules_owner ON modules (owner);
+CREATE INDEX IF NOT EXISTS idx_modules_completed ON modules (course_id, completed);
+CREATE INDEX IF NOT EXISTS idx_modules_type ON modules (type);
+CREATE INDEX IF NOT EXISTS idx_modules_updated ON modules (updated);
+CREATE INDEX IF NOT EXISTS idx_modules_completion_date ON modules (completion_date);
+CREATE INDEX IF NOT EXISTS idx_outbox_owner_created ON outbox (owner, created);
+CREATE INDEX IF NOT EXISTS idx_completion_events_owner_at ON completion_events (owner, at);
+CREATE INDEX IF NOT EXISTS idx_completion_events_unsynced ON completion_events (owner, synced, at);
+"""
+
+def _migrate(connection):
+    """Add the owner columns to tables created before owner partitioning
+
+    Existing rows belong to the default owner, whose course ids are the plain
+    course names - so only the new columns need filling in.
+    """
+    columns = {row["name"] for row in connection.execute("PRAGMA table_info(courses)")}
+    if "owner" in columns:
+        return
+    with connection:
+        for table in ("courses", "modules", "outbox"):
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN owner TEXT NOT NULL DEFAULT '{DEFAULT_OWNER}'")
+        for table in ("courses", "outbox"):
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN name TEXT")
+            connection.execute(f"UPDATE {table} SET name = course_id")
+
+def _course_row(owner, name, course_data, position):
+    subcourses = course_data.get("subcourses", {})
+    total, completed = count_modules(course_data)
+    fields = {key: value for key, value in course_data.items() if key != "subcourses"}
+    return (
+        course_key(owner, name),
+        owner,
+        name,
+        position,
+        course_status(total, completed),
+        total,
+        completed,
+        course_data.get("_meta", {}).get("updated"),
+        json.dumps(list(subcourses)),
+        json.dumps(fields, default=str)
+    )
+
+def _module_rows(owner, course_id, subcourses):
+    return [
+        (
+            course_id,
+            owner,
+            name,
+            1 if module_data.get("completed", False) else 0,
+            module_data.get("type"),
+            module_data.get("created"),
+            module_data.get("updated"),
+            module_data.get("completion_date"),
+            json.dumps(module_data, default=str)
+        )
+        for name, module_data in subcourses.items()
+    ]
+
+def _build_course(course_row, module_rows):
+    course_data = json.loads(course_row["data"])
+    modules = {row["name"]: json.loads(row["data"]) for row in module_rows}
+    ordered = {name: modules[name] for name in json.loads(course_row["module_order"]) if name in modules}
+    for name, module_data in modules.items():
+        ordered.setdefault(name, module_data)
+    course_data["subcourses"] = ordered
+    return course_data
+
+UPSERT_COURSE = """
+INSERT INTO courses (course_id, owner, name, position, status, total_modules, completed_modules, updated, module_order, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (course_id) DO UPDATE SET
+    position = excluded.position, status = excluded.status, total_modules = excluded.total_modules,
+    completed_modules = excluded.completed_modules, updated = excluded.updated,
+    module_order = excluded.module_order, data = excluded.data
+"""
+
+UPSERT_MODULE = """
+INSERT INTO modules (course_id, owner, name, completed, type, created, updated, completion_date, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (course_id, name) DO UPDATE SET
+    completed = excluded.completed, type = excluded.type, created = excluded.created,
+    updated = excluded.updated, completion_date = excluded.completion_date, data = excluded.data
+"""
+
+UPSERT_OPERATION = """
+INSERT INTO outbox (course_id, owner, name, op_id, op, payload, base_updated, created)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (course_id) DO UPDATE SET
+    op_id = excluded.op_id, op = excluded.op, payload = excluded.payload
+"""
+
+INSERT_EVENT = """
+INSERT OR IGNORE INTO completion_events (event_id, owner, course, module, completed, at, day, synced)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+ADD_TO_DAY = """
+INSERT INTO completion_days (owner, day, completed, uncompleted) VALUES (?, ?, ?, ?)
+ON CONFLICT (owner, day) DO UPDATE SET
+    completed = completed + excluded.completed, uncompleted = uncompleted + excluded.uncompleted
+"""
+
+def _operation_row(operation):
+    owner = operation.get("owner", DEFAULT_OWNER)
+    return (
+        course_key(owner, operation["course_id"]),
+        owner,
+        operation["course_id"],
+        operation["op_id"],
+        operation["op"],
+        json.dumps(operation["payload"], default=str) if operation["payload"] is not None else None,
+        operation["base_updated"],
+        operation["created"]
+    )
+
+class SQLiteStore:
+    """Course store backed by one SQLite file in WAL mode
+
+    Offers the same load/save surface as the MongoDB backend, partitioned
+    by owner. Saves only rewrite the owner's courses and modules that
+    changed since the store last loaded or saved them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        _migrate(connection)
+        connection.executescript(INDEXES)
+
+    def _connection(self):
+        """Per-thread connection (sqlite3 connections can't be shared across threads)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def is_empty(self, owner=DEFAULT_OWNER):
+        return self._connection().execute(
+            "SELECT 1 FROM courses WHERE owner = ? LIMIT 1", (owner,)
+        ).fetchone() is None
+
+    def iter_courses(self, owner=DEFAULT_OWNER):
+        """Yield (course_name, course_data) one course of ``owner`` at a time"""
+        connection = self._connection()
+        for course_row in connection.execute("SELECT * FROM courses WHERE owner = ? ORDER BY position", (owner,)):
+            module_rows = connection.execute(
+                "SELECT name, data FROM modules WHERE course_id = ?", (course_row["course_id"],)
+            ).fetchall()
+            yield course_row["name"], _build_course(course_row, module_rows)
+
+    def load_courses(self, owner=DEFAULT_OWNER):
+        """Load every course of ``owner`` into the nested dict used by the app"""
+        connection = self._connection()
+        modules_by_course = {}
+        for row in connection.execute("SELECT course_id, name, data FROM modules WHERE owner = ?", (owner,)):
+            modules_by_course.setdefault(row["course_id"], []).append(row)
+
+        courses = {}
+        for course_row in connection.execute("SELECT * FROM courses WHERE owner = ? ORDER BY position", (owner,)):
+            courses[course_row["name"]] = _build_course(course_row, modules_by_course.get(course_row["course_id"], []))
+
+        with self._lock:
+            self._snapshots[owner] = copy_courses(courses)
+        return courses
+
+    def save_courses(self, courses, owner=DEFAULT_OWNER):
+        """Write the owner's courses and modules that changed since the last load/save in one transaction"""
+        with self._lock:
+            old = self._snapshots.get(owner)
+            connection = self._connection()
+            with connection:
+                if old is None:
+                    connection.execute("DELETE FROM modules WHERE owner = ?", (owner,))
+                    connection.execute("DELETE FROM courses WHERE owner = ?", (owner,))
+                    old = {}
+
+                removed = [(course_key(owner, name),) for name in old if name not in courses]
+                connection.executemany("DELETE FROM modules WHERE course_id = ?", removed)
+                connection.executemany("DELETE FROM courses WHERE course_id = ?", removed)
+
+                structure_changed = list(old) != list(courses)
+                for position, (name, course_data) in enumerate(courses.items()):
+                    old_course = old.get(name)
+                    if old_course == course_data and not structure_changed:
+                        continue
+                    connection.execute(UPSERT_COURSE, _course_row(owner, name, course_data, position))
+                    if old_course == course_data:
+                        continue
+
+                    course_id = course_key(owner, name)
+                    old_modules = (old_course or {}).get("subcourses", {})
+                    new_modules = course_data.get("subcourses", {})
+                    changed = {module: data for module, data in new_modules.items() if old_modules.get(module) != data}
+                    connection.executemany(UPSERT_MODULE, _module_rows(owner, course_id, changed))
+                    connection.executemany(
+                        "DELETE FROM modules WHERE course_id = ? AND name = ?",
+                        [(course_id, module) for module in old_modules if module not in new_modules]
+                    )
+            self._snapshots[owner] = copy_courses(courses)
+        return True
+
+    def last_saved(self, owner=DEFAULT_OWNER):
+        """Owner's course state as of the last load/save (None if unknown) - treat as read-only"""
+        with self._lock:
+            return self._snapshots.get(owner)
+
+    def replace_courses(self, courses, owner=DEFAULT_OWNER):
+        """Overwrite everything stored for ``owner`` with ``courses``"""
+        with self._lock:
+            self._snapshots.pop(owner, None)
+        return self.save_courses(courses, owner)
+
+    def import_writer(self, owner=DEFAULT_OWNER):
+        """Writer for streaming_import.import_courses: one transaction, rolled back on abort"""
+        return _SQLiteImportWriter(self, owner)
+
+    def record_operations(self, operations):
+        """Queue replication operations, keeping one per course
+
+        A newer operation for a course replaces the queued one but keeps its
+        ``base_updated`` - the version MongoDB held before any offline edit.
+        """
+        connection = self._connection()
+        with self._lock, connection:
+            connection.executemany(UPSERT_OPERATION, [_operation_row(operation) for operation in operations])
+
+    def pending_operations(self, limit, owner=DEFAULT_OWNER):
+        """Return up to ``limit`` of the owner's queued operations, oldest first"""
+        rows = self._connection().execute(
+            "SELECT * FROM outbox WHERE owner = ? ORDER BY created LIMIT ?", (owner, limit)
+        ).fetchall()
+        return [
+            {
+                "op_id": row["op_id"],
+                "owner": row["owner"],
+                "course_id": row["name"],
+                "op": row["op"],
+                "payload": json.loads(row["payload"]) if row["payload"] is not None else None,
+                "base_updated": row["base_updated"],
+                "created": row["created"]
+            }
+            for row in rows
+        ]
+
+    def complete_operations(self, op_ids):
+        """Drop replayed operations (a course re-queued since then keeps its newer operation)"""
+        connection = self._connection()
+        with self._lock, connection:
+            connection.executemany("DELETE FROM outbox WHERE op_id = ?", [(op_id,) for op_id in op_ids])
+
+    def count_operations(self, owner=None):
+        """Number of queued operations for ``owner`` (every owner if None)"""
+        if owner is None:
+            return self._connection().execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        return self._connection().execute("SELECT COUNT(*) FROM outbox WHERE owner = ?", (owner,)).fetchone()[0]
+
+    def course_aggregates(self, owner=DEFAULT_OWNER):
+        """Per-course counts and per-type totals of ``owner``, in the shape of aggregate_stats"""
+        connection = self._connection()
+        courses = connection.execute(
+            """
+            SELECT name, total_modules, completed_modules, updated,
+                   json_extract(data, '$.description') AS description, json_extract(data, '$.category') AS category
+            FROM courses WHERE owner = ? ORDER BY position
+            """,
+            (owner,)
+        ).fetchall()
+        types = connection.execute(
+            """
+            SELECT COALESCE(type, 'Module') AS type, COUNT(*) AS total, SUM(completed) AS completed
+            FROM modules WHERE owner = ? GROUP BY COALESCE(type, 'Module')
+            """,
+            (owner,)
+        ).fetchall()
+        return {
+            "courses": [
+                {
+                    "course": row["name"],
+                    "description": row["description"],
+                    "category": row["category"],
+                    "updated": row["updated"],
+                    "total": row["total_modules"],
+                    "completed": row["completed_modules"]
+                }
+                for row in courses
+            ],
+            "types": [{"type": row["type"], "total": row["total"], "completed": row["completed"]} for row in types]
+        }
+
+    def record_events(self, events, synced=False):
+        """Append completion events (see completion_log.new_event) and roll them up per day
+
+        Events already logged are skipped; returns the number that were new.
+        """
+        connection = self._connection()
+        added = 0
+        with self._lock, connection:
+            for event in events:
+                inserted = connection.execute(INSERT_EVENT, (
+                    event["_id"], event["owner"], event["course"], event["module"],
+                    1 if event["completed"] else 0, event["at"].isoformat(), event["day"], 1 if synced else 0
+                )).rowcount
+                if inserted:
+                    completed = 1 if event["completed"] else 0
+                    connection.execute(ADD_TO_DAY, (event["owner"], event["day"], completed, 1 - completed))
+                    added += 1
+        return added
+
+    def unsynced_events(self, limit, owner=DEFAULT_OWNER):
+        """Up to ``limit`` of the owner's events MongoDB hasn't received yet, oldest first"""
+        rows = self._connection().execute(
+            "SELECT * FROM completion_events WHERE owner = ? AND synced = 0 ORDER BY at LIMIT ?", (owner, limit)
+        ).fetchall()
+        return [
+            {
+                "_id": row["event_id"],
+                "owner": row["owner"],
+                "course": row["course"],
+                "module": row["module"],
+                "completed": bool(row["completed"]),
+                "at": datetime.fromisoformat(row["at"]),
+                "day": row["day"]
+            }
+            for row in rows
+        ]
+
+    def mark_events_synced(self, event_ids):
+        connection = self._connection()
+        with self._lock, connection:
+            connection.executemany(
+                "UPDATE completion_events SET synced = 1 WHERE event_id = ?", [(event_id,) for event_id in event_ids]
+            )
+
+    def has_days(self, owner=DEFAULT_OWNER):
+        return self._connection().execute(
+            "SELECT 1 FROM completion_days WHERE owner = ? LIMIT 1", (owner,)
+        ).fetchone() is not None
+
+    def iter_active_days(self, owner=DEFAULT_OWNER):
+        """Yield the owner's days with at least one completion, newest first (read lazily)"""
+        for row in self._connection().execute(
+            "SELECT day FROM completion_days WHERE owner = ? AND completed > 0 ORDER BY day DESC", (owner,)
+        ):
+            yield row["day"]
+
+    def net_completions_by_day(self, owner, since_day):
+        """{day: completions minus un-completions} for the owner's days from ``since_day`` on"""
+        return {
+            row["day"]: row["completed"] - row["uncompleted"]
+            for row in self._connection().execute(
+                "SELECT day, completed, uncompleted FROM completion_days WHERE owner = ? AND day >= ?", (owner, since_day)
+            )
+        }
+
+    def backfill_days(self, owner, counts):
+        """Seed the owner's rollups from ``{day: completed modules}`` (days already rolled up are kept)"""
+        connection = self._connection()
+        with self._lock, connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO completion_days (owner, day, completed, uncompleted) VALUES (?, ?, ?, 0)",
+                [(owner, day, count) for day, count in counts.items()]
+            )
+
+    def is_workspace_member(self, workspace, user):
+        """True if ``user`` is a member of ``workspace`` (the sqlite backend's copy of owners.is_member)"""
+        return self._connection().execute(
+            "SELECT 1 FROM workspace_members WHERE workspace = ? AND member = ?", (workspace, user)
+        ).fetchone() is not None
+
+    def add_workspace_member(self, workspace, user):
+        connection = self._connection()
+        with self._lock, connection:
+            connection.execute("INSERT OR IGNORE INTO workspace_members (workspace, member) VALUES (?, ?)", (workspace, user))
+
+    def remove_workspace_member(self, workspace, user):
+        connection = self._connection()
+        with self._lock, connection:
+            connection.execute("DELETE FROM workspace_members WHERE workspace = ? AND member = ?", (workspace, user))
+
+class _SQLiteImportWriter:
+    def __init__(self, store, owner):
+        self._store = store
+        self._owner = owner
+        self._store._lock.acquire()
+        self._connection = store._connection()
+        self._connection.execute("BEGIN")
+        self._connection.execute("DELETE FROM modules WHERE owner = ?", (owner,))
+        self._connection.execute("DELETE FROM courses WHERE owner = ?", (owner,))
+        self._position = 0
+
+    def add(self, name, data):
+        self._connection.execute(UPSERT_COURSE, _course_row(self._owner, name, data, self._position))
+        self._connection.executemany(
+            UPSERT_MODULE, _module_rows(self._owner, course_key(self._owner, name), data.get("subcourses", {}))
+        )
+        self._position += 1
+
+    def queue_operations(self, operations):
+        """Queue replication operations (see ``SQLiteStore.record_operations``) in the import's transaction"""
+        self._connection.executemany(UPSERT_OPERATION, [_operation_row(operation) for operation in operations])
+
+    def commit(self, **metadata):
+        try:
+            self._connection.commit()
+            self._store._snapshots.pop(self._owner, None)
+        finally:
+            self._store._lock.release()
+
+    def abort(self):
+        try:
+            self._connection.rollback()
+        finally:
+            self._store._lock.release()
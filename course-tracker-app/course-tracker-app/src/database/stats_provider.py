@@ -0,0 +1,106 @@
+"""Database statistics served from a TTL cache that refreshes in the background
+
+The database-wide figures (``dbStats``, ``$collStats``) are the same for every
+owner and are collected by one shared provider; each owner's provider only
+measures that owner's course document and counts its data.
+"""
+from datetime import datetime
+import threading
+import time
+from database.owners import DEFAULT_OWNER, document_id
+
+# MongoDB's maximum BSON document size
+MAX_DOCUMENT_SIZE = 16 * 1024 * 1024
+
+def _collection_stats(db, name):
+    """Document count (from collection metadata) and sizes for one collection"""
+    stats = {"documents": db[name].estimated_document_count()}
+    storage = next(db[name].aggregate([{"$collStats": {"storageStats": {}}}]), {}).get("storageStats", {})
+    stats.update({
+        "size": storage.get("size", 0),
+        "avg_document_size": storage.get("avgObjSize", 0),
+        "storage_size": storage.get("storageSize", 0),
+        "index_size": storage.get("totalIndexSize", 0)
+    })
+    return stats
+
+def collect_database_stats(db):
+    """Statistics of the whole database shown in the admin view - the same for every owner"""
+    db_stats = db.command("dbStats")
+    collections = {name: _collection_stats(db, name) for name in sorted(db.list_collection_names())}
+    return {
+        "courses_documents": collections.get("courses", {}).get("documents", 0),
+        "backup_documents": collections.get("courses_backup", {}).get("documents", 0),
+        "database_size": db_stats.get("dataSize", 0),
+        "storage_size": db_stats.get("storageSize", 0),
+        "indexes": db_stats.get("indexes", 0),
+        "collections": db_stats.get("collections", 0),
+        "collection_stats": collections,
+        "refreshed_at": datetime.now()
+    }
+
+def collect_owner_stats(db, owner=DEFAULT_OWNER):
+    """The owner's course document size and course/backup counts - reads of the owner's data only"""
+    document = next(db["courses"].aggregate([
+        {"$match": {"_id": document_id(owner)}},
+        {"$project": {"size": {"$bsonSize": "$$ROOT"}, "courses": "$summary.totals.courses"}}
+    ]), {})
+    size = document.get("size", 0)
+    return {
+        "owner_courses": document.get("courses") or 0,
+        "owner_backups": db["courses_backup"].count_documents({"owner": owner}),
+        "main_document_size": size,
+        "main_document_limit": MAX_DOCUMENT_SIZE,
+        "main_document_usage": size / MAX_DOCUMENT_SIZE,
+        "refreshed_at": datetime.now()
+    }
+
+class StatsProvider:
+    """Serve ``collect()`` results from a cache that is refreshed in the background
+
+    The first call collects synchronously. Afterwards callers always get the
+    cached value straight away; once it is older than ``ttl_seconds`` a
+    background thread collects a fresh one for the next call.
+    """
+
+    def __init__(self, collect, ttl_seconds=60.0):
+        self._collect = collect
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._value = None
+        self._collected_at = 0.0
+        self._refreshing = False
+
+    def get(self):
+        with self._lock:
+            value = self._value
+            stale = time.monotonic() - self._collected_at >= self._ttl_seconds
+            if value is not None and stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, name="stats-refresh", daemon=True).start()
+        if value is None:
+            return self.refresh()
+        return value
+
+    def refresh(self):
+        """Collect now and cache the result"""
+        value = self._collect()
+        with self._lock:
+            self._value = value
+            self._collected_at = time.monotonic()
+        return value
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            # Keep serving the last good value; the next call tries again
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._collected_at = 0.0
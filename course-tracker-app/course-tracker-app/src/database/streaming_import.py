@@ -0,0 +1,358 @@
+"""Incremental course import: parse, validate and batch-write one course at a time
+
+Accepts the NDJSON export format (``{"type": "course", "name", "data"}`` lines)
+and the legacy ``{"courses": {...}}`` JSON document, optionally gzip-compressed,
+without ever holding the whole payload in memory.
+"""
+from pymongo import InsertOne
+from datetime import datetime
+import codecs
+import gzip
+import hashlib
+import io
+import itertools
+import json
+from database import models, normalized_store, course_summary
+from database.owners import DEFAULT_OWNER, document_id
+
+READ_SIZE = 64 * 1024
+STAGING_COLLECTION = "courses_import"
+
+class ImportFormatError(ValueError):
+    """The payload is not a course export or contains an invalid course"""
+
+class _CountingReader(io.RawIOBase):
+    """Binary reader that counts how many bytes of the underlying source were consumed"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.consumed = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._raw.read(len(buffer))
+        self.consumed += len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+def open_source(source):
+    """Return (binary stream, total size in bytes or None, counting reader) for str, bytes or a file"""
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, (bytes, bytearray)):
+        total = len(source)
+        source = io.BytesIO(source)
+    else:
+        total = getattr(source, "size", None)
+
+    counter = _CountingReader(source)
+    stream = io.BufferedReader(counter, READ_SIZE)
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream)
+    return stream, total, counter
+
+class _JsonReader:
+    """Pull-parser over a UTF-8 byte stream that decodes one JSON value at a time"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size=READ_SIZE):
+        if self._eof:
+            return False
+        chunk = self._stream.read(size)
+        if not chunk:
+            self._eof = True
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(b"", final=True)
+        else:
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character ("" at end of input)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ImportFormatError(f"Expected '{char}' but found '{found or 'end of input'}'")
+        self._pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more input until it fits"""
+        self.peek()
+        read_size = READ_SIZE
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # An incomplete value just needs more input - read bigger chunks for big values
+                if self._fill(read_size):
+                    read_size *= 2
+                    continue
+                raise ImportFormatError(f"Invalid JSON: {e}") from e
+            if end == len(self._buffer) and not self._eof and not isinstance(value, (dict, list, str)):
+                # A number or literal at the end of the buffer might continue in the next chunk
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+def _iter_legacy_courses(reader, metadata):
+    """Yield (name, data) from a {"courses": {...}} document, collecting other top-level fields"""
+    reader.expect("{")
+    found_courses = False
+    while reader.peek() != "}":
+        key = reader.value()
+        reader.expect(":")
+        if key == "courses":
+            found_courses = True
+            reader.expect("{")
+            while reader.peek() != "}":
+                name = reader.value()
+                reader.expect(":")
+                yield name, reader.value()
+                if reader.peek() == ",":
+                    reader.expect(",")
+            reader.expect("}")
+        else:
+            metadata[key] = reader.value()
+        if reader.peek() == ",":
+            reader.expect(",")
+    reader.expect("}")
+    if not found_courses:
+        raise ImportFormatError("Invalid JSON format - missing 'courses' field")
+
+def _iter_ndjson_courses(stream, first_line, metadata):
+    """Yield (name, data) from NDJSON course lines"""
+    text = io.TextIOWrapper(stream, encoding="utf-8")
+    for line_number, line in enumerate(itertools.chain([first_line], text), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(f"Invalid JSON on line {line_number}: {e}") from e
+        if not isinstance(record, dict):
+            raise ImportFormatError(f"Line {line_number} is not a JSON object")
+        if record.get("type") == "course":
+            yield record.get("name"), record.get("data")
+        elif record.get("type") == "export":
+            metadata.update({key: value for key, value in record.items() if key != "type"})
+
+class _PrependedStream(io.RawIOBase):
+    """Put already-read bytes back in front of a binary stream"""
+
+    def __init__(self, head, stream):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size=-1):
+        if self._head:
+            data, self._head = self._head, b""
+            return data
+        return self._stream.read(size)
+
+def iter_courses(stream, metadata=None):
+    """Yield (course_name, course_data) pairs from an export stream, in either supported format"""
+    metadata = {} if metadata is None else metadata
+    # Bounded read - a minified legacy document may be a single huge line
+    first_line = stream.readline(READ_SIZE)
+    try:
+        header = json.loads(first_line)
+    except ValueError:
+        header = None
+
+    if isinstance(header, dict) and header.get("type") in ("export", "course"):
+        yield from _iter_ndjson_courses(stream, first_line.decode("utf-8"), metadata)
+    else:
+        yield from _iter_legacy_courses(_JsonReader(_PrependedStream(first_line, stream)), metadata)
+
+def validate_course(name, data):
+    """Raise ImportFormatError unless ``data`` is a course; returns its (total, completed) module counts"""
+    try:
+        return models.validate_course(name, data)
+    except models.ModelError as e:
+        raise ImportFormatError(str(e)) from e
+
+def _staging_suffix(owner):
+    """Keeps concurrent imports of different owners in separate staging areas"""
+    if owner == DEFAULT_OWNER:
+        return ""
+    return "_" + hashlib.sha1(owner.encode("utf-8")).hexdigest()[:12]
+
+class DocumentImportWriter:
+    """Stage courses one document each in a staging collection, then build the owner's document from them server-side
+
+    Staging never grows a single document, so it is bounded only by the
+    collection; the owner's document is assembled and swapped in by one
+    ``$merge`` - a single-document write, so readers see the old courses or
+    the new ones, never a mix.
+    """
+
+    def __init__(self, db, batch_size, owner=DEFAULT_OWNER):
+        self._collection = db["courses"]
+        self._staging = db[STAGING_COLLECTION + _staging_suffix(owner)]
+        self._batch_size = batch_size
+        self._batch = []
+        self._owner = owner
+        self._position = 0
+        self._staging.drop()
+
+    def add(self, name, data):
+        self._batch.append(InsertOne({"_id": self._position, "name": name, "data": data}))
+        self._position += 1
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            self._staging.bulk_write(self._batch, ordered=True)
+            self._batch = []
+
+    def commit(self, **metadata):
+        """Replace the owner's document with one built from the staged courses, without pulling them to the client"""
+        self.flush()
+        fields = {"owner": self._owner, "last_updated": datetime.now().isoformat(), **metadata}
+        if self._position == 0:
+            # Nothing staged for $group to build from - an empty import just clears the courses
+            self._collection.update_one(
+                {"_id": document_id(self._owner)},
+                {"$set": {"courses": {}, **fields}, "$inc": {"version": 1}},
+                upsert=True
+            )
+        else:
+            self._staging.aggregate([
+                {"$sort": {"_id": 1}},
+                {"$group": {"_id": None, "courses": {"$push": {"k": "$name", "v": "$data"}}}},
+                {"$project": {
+                    "_id": {"$literal": document_id(self._owner)},
+                    "courses": {"$arrayToObject": "$courses"},
+                    **{key: {"$literal": value} for key, value in fields.items()}
+                }},
+                {"$merge": {
+                    "into": self._collection.name,
+                    "on": "_id",
+                    # Replace the document but keep its version counting up
+                    "whenMatched": [{"$replaceWith": {"$mergeObjects": [
+                        "$$new", {"version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}}
+                    ]}}],
+                    "whenNotMatched": "insert"
+                }}
+            ])
+        self._staging.drop()
+
+    def abort(self):
+        self._staging.drop()
+
+class NormalizedImportWriter:
+    """Bulk-insert courses and modules into staging collections, then swap them in for the owner's documents"""
+
+    def __init__(self, db, batch_size, owner=DEFAULT_OWNER):
+        self._db = db
+        self._batch_size = batch_size
+        self._owner = owner
+        suffix = "_import" + _staging_suffix(owner)
+        self._courses = db[normalized_store.COURSE_COLLECTION + suffix]
+        self._modules = db[normalized_store.MODULE_COLLECTION + suffix]
+        self._courses.drop()
+        self._modules.drop()
+        self._course_ops = []
+        self._module_ops = []
+        self._position = 0
+
+    def add(self, name, data):
+        course_doc, module_docs = normalized_store.course_documents(self._owner, name, data, self._position)
+        self._position += 1
+        self._course_ops.append(InsertOne(course_doc))
+        self._module_ops.extend(InsertOne(doc) for doc in module_docs)
+        if len(self._course_ops) + len(self._module_ops) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._module_ops:
+            self._modules.bulk_write(self._module_ops, ordered=False)
+            self._module_ops = []
+        if self._course_ops:
+            self._courses.bulk_write(self._course_ops, ordered=False)
+            self._course_ops = []
+
+    def commit(self, **metadata):
+        """Replace the owner's documents with the staged ones (other owners are left alone)
+
+        The staged documents are merged in first and only then are the
+        owner's documents missing from the import deleted, so a failure part
+        way leaves the old and new courses side by side - never no courses -
+        and importing again converges. (``$merge`` can't run inside a
+        transaction, and standalone servers have none.)
+        """
+        self.flush()
+        for staging, target in ((self._modules, normalized_store.MODULE_COLLECTION),
+                                (self._courses, normalized_store.COURSE_COLLECTION)):
+            staging.aggregate([{"$merge": {"into": target, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}])
+            self._delete_missing(self._db[target], staging)
+        self._courses.drop()
+        self._modules.drop()
+
+    def _delete_missing(self, target, staging):
+        """Delete the owner's documents in ``target`` that have no counterpart in ``staging``"""
+        missing = target.aggregate([
+            {"$match": {"owner": self._owner}},
+            {"$lookup": {"from": staging.name, "localField": "_id", "foreignField": "_id", "as": "staged"}},
+            {"$match": {"staged": {"$size": 0}}},
+            {"$project": {"_id": 1}}
+        ])
+        ids = (doc["_id"] for doc in missing)
+        while True:
+            batch = list(itertools.islice(ids, self._batch_size))
+            if not batch:
+                break
+            target.delete_many({"_id": {"$in": batch}})
+
+    def abort(self):
+        self._courses.drop()
+        self._modules.drop()
+
+def import_courses(stream, writer, total_bytes=None, counter=None, progress_callback=None, analytics=None):
+    """Validate and write every course from ``stream``; returns (courses imported, metadata)
+
+    On any error the staged data is discarded and the stored courses are left untouched.
+    Courses are also counted into ``analytics`` (a utils.analytics.CourseAnalytics),
+    whose summary is committed along with them.
+    """
+    metadata = {}
+    imported = 0
+    try:
+        for name, data in iter_courses(stream, metadata):
+            total, completed = validate_course(name, data)
+            # Progress counters in the file may be stale - store recounted ones
+            data["_progress"] = {"total": total, "completed": completed}
+            writer.add(name, data)
+            if analytics is not None:
+                analytics.add(name, data)
+            imported += 1
+            if progress_callback is not None:
+                fraction = counter.consumed / total_bytes if counter is not None and total_bytes else None
+                progress_callback(imported, fraction)
+        stored = {"imported_at": datetime.now().isoformat()}
+        if analytics is not None:
+            stored["summary"] = course_summary.materialize(analytics.aggregates())
+        writer.commit(**stored)
+    except Exception:
+        writer.abort()
+        raise
+    return imported, metadata
@@ -0,0 +1,224 @@
+"""Debounced write-behind buffer: coalesces rapid saves into one background write"""
+from datetime import datetime
+import threading
+import time
+
+
+class WriteBehindQueue:
+    """Keep the latest state per key and hand it to ``writer`` once saves go quiet
+
+    ``writer(key, state)`` runs on a background thread and returns True when the
+    state was persisted. Saves arriving within ``delay_seconds`` of each other
+    are merged into a single write; ``max_delay_seconds`` bounds how long a
+    stream of edits (e.g. typing notes) can postpone it. Failed writes are kept
+    and retried after ``retry_seconds`` unless a newer state replaces them.
+    The last save and last error are tracked per key.
+    """
+
+    def __init__(self, writer, delay_seconds=1.0, max_delay_seconds=None, retry_seconds=5.0):
+        self._writer = writer
+        self._delay = delay_seconds
+        self._max_delay = max_delay_seconds if max_delay_seconds is not None else delay_seconds * 5
+        self._retry = retry_seconds
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._thread = None
+        self._stopped = False
+        self._in_flight = 0
+        self._writing = set()
+        # key -> {"last_saved", "error"} of that key's most recent write, and its count of failed writes
+        self._results = {}
+
+    def submit(self, key, state):
+        """Queue ``state`` as the newest value for ``key``"""
+        with self._condition:
+            now = time.monotonic()
+            entry = self._pending.get(key)
+            first_seen = entry["first_seen"] if entry else now
+            self._pending[key] = {
+                "state": state,
+                "first_seen": first_seen,
+                "due": min(now + self._delay, first_seen + self._max_delay)
+            }
+            self._ensure_worker()
+            self._condition.notify_all()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _next_due(self):
+        """Pop the entry whose debounce window has passed, or return the seconds to wait"""
+        now = time.monotonic()
+        key = min(self._pending, key=lambda k: self._pending[k]["due"])
+        entry = self._pending[key]
+        if self._stopped or entry["due"] <= now:
+            del self._pending[key]
+            return key, entry, 0
+        return None, None, entry["due"] - now
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._pending:
+                        if self._stopped:
+                            return
+                        self._condition.wait()
+                        continue
+                    key, entry, wait = self._next_due()
+                    if key is not None:
+                        self._in_flight += 1
+                        self._writing.add(key)
+                        break
+                    self._condition.wait(wait)
+
+            try:
+                saved = self._writer(key, entry["state"])
+                error = None if saved else "storage unavailable"
+            except Exception as e:
+                saved = False
+                error = str(e)
+
+            with self._condition:
+                self._in_flight -= 1
+                self._writing.discard(key)
+                result = self._results.setdefault(key, {"last_saved": None, "error": None, "failures": 0})
+                if saved:
+                    result["last_saved"] = datetime.now()
+                    result["error"] = None
+                else:
+                    result["failures"] += 1
+                    result["error"] = error
+                    if key not in self._pending and not self._stopped:
+                        # Nothing newer arrived - retry this state later
+                        entry["due"] = time.monotonic() + self._retry
+                        entry["first_seen"] = entry["due"]
+                        self._pending[key] = entry
+                self._condition.notify_all()
+
+    def _busy(self, key):
+        if key is None:
+            return bool(self._pending or self._in_flight)
+        return key in self._pending or key in self._writing
+
+    def _failures(self, key):
+        """Failed writes so far of ``key`` (of every key if None)"""
+        if key is None:
+            return sum(result["failures"] for result in self._results.values())
+        return self._results.get(key, {}).get("failures", 0)
+
+    def write_now(self, key=None):
+        """Start writing everything pending (or just ``key``) without waiting for it"""
+        with self._condition:
+            self._expedite(key)
+
+    def _expedite(self, key):
+        for pending_key, entry in self._pending.items():
+            if key is None or pending_key == key:
+                entry["due"] = 0
+        self._condition.notify_all()
+
+    def flush(self, timeout=None, key=None):
+        """Write everything pending (or just ``key``) now; return True if it was all persisted"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            failures = self._failures(key)
+            self._expedite(key)
+            while self._busy(key):
+                if self._failures(key) > failures:
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def stop(self, timeout=5.0):
+        """Flush pending writes and stop the background thread (used at shutdown)"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        return not self._pending
+
+    def status(self, key=None):
+        """Return {"state": "saved" | "pending" | "error", "pending_writes", "last_saved", "error"}
+
+        With ``key`` everything reported covers only that key's writes;
+        without it, the latest save and any error of all keys.
+        """
+        with self._condition:
+            if key is None:
+                pending_writes = len(self._pending)
+                in_flight = self._in_flight
+                results = list(self._results.values())
+            else:
+                pending_writes = 1 if key in self._pending else 0
+                in_flight = key in self._writing
+                results = [self._results[key]] if key in self._results else []
+            saved_times = [result["last_saved"] for result in results if result["last_saved"] is not None]
+            errors = [result["error"] for result in results if result["error"] is not None]
+            if errors:
+                state = "error"
+            elif pending_writes or in_flight:
+                state = "pending"
+            else:
+                state = "saved"
+            return {
+                "state": state,
+                "pending_writes": pending_writes,
+                "last_saved": max(saved_times, default=None),
+                "error": errors[0] if errors else None
+            }
+
+
+class SessionWatcher:
+    """Call ``on_close(key)`` for the keys a session saved to once that session has ended
+
+    ``is_active(session_id)`` is polled every ``interval_seconds`` on a
+    background thread while any watched session remains.
+    """
+
+    def __init__(self, is_active, on_close, interval_seconds=2.0):
+        self._is_active = is_active
+        self._on_close = on_close
+        self._interval = interval_seconds
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._thread = None
+
+    def watch(self, session_id, key):
+        with self._lock:
+            self._sessions.setdefault(session_id, set()).add(key)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="session-watcher", daemon=True)
+                self._thread.start()
+
+    def check(self):
+        """Hand the keys of every ended session to ``on_close``; returns the number of sessions that ended"""
+        with self._lock:
+            sessions = list(self._sessions)
+        ended = [session_id for session_id in sessions if not self._is_active(session_id)]
+        for session_id in ended:
+            with self._lock:
+                keys = self._sessions.pop(session_id, set())
+            for key in keys:
+                self._on_close(key)
+        return len(ended)
+
+    def _run(self):
+        while True:
+            time.sleep(self._interval)
+            try:
+                self.check()
+            except Exception:
+                pass
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
@@ -0,0 +1,39 @@
+"""Command-line export of one owner's course data as streaming NDJSON
+
+Usage: python src/export_courses.py [--gzip] [--output FILE] [--owner OWNER]
+"""
+import argparse
+import sys
+import os
+
+# Add the current directory to Python path so we can import from database, utils, etc.
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+# ...and the project root for the shared settings in config/
+project_root = os.path.dirname(os.path.abspath(current_dir))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from database.mongodb_client import export_to_ndjson
+from database.ndjson_export import write_stream
+from database.owners import DEFAULT_OWNER
+
+def main():
+    """Stream the export to a file or stdout"""
+    parser = argparse.ArgumentParser(description="Export course data as NDJSON (one course per line)")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip-compress the output")
+    parser.add_argument("--owner", default=DEFAULT_OWNER, help="User or workspace to export (default: the shared data)")
+    args = parser.parse_args()
+    
+    chunks = export_to_ndjson(compress=args.gzip, owner=args.owner)
+    if args.output:
+        with open(args.output, "wb") as output:
+            written = write_stream(chunks, output)
+        print(f"Exported {written} bytes to {args.output}", file=sys.stderr)
+    else:
+        write_stream(chunks, sys.stdout.buffer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Course analytics computed in a single pass
+
+:func:`analyze` walks every course and module once and collects all the
+metrics the components show - overall totals, per-course progress and
+status, courses per status, modules per type and the courses in progress -
+in one :class:`CourseAnalytics`. :func:`get_analytics` keeps that result in
+the session until its data changes, so every component of a rerun (and the
+reruns after it) share one computation.
+
+Module counts come from each course's ``_progress`` counters when it has
+them, so the totals and statuses take O(courses); only the per-type counts
+still visit every module, and ``count_types=False`` skips them. This is the
+one place course status and the overview statistics are computed - the
+stored summary, the module tables and both course stores call into it.
+"""
+import streamlit as st
+
+STATUSES = ("not_started", "in_progress", "completed")
+
+# Per-course (total, completed) module counters kept up to date by utils.helpers
+PROGRESS_KEY = "_progress"
+
+def course_status(total, completed):
+    """Status of a course from its module counts (a course without modules is not started)"""
+    if completed == 0:
+        return "not_started"
+    if completed == total:
+        return "completed"
+    return "in_progress"
+
+def percentage(completed, total):
+    """Share of ``completed`` in ``total`` as a percentage (0 when there is nothing to complete)"""
+    return completed / total * 100 if total > 0 else 0
+
+def count_modules(course_data):
+    """(total, completed) modules of a course: its progress counters, or a scan of its modules"""
+    counters = course_data.get(PROGRESS_KEY)
+    if isinstance(counters, dict):
+        return counters["total"], counters["completed"]
+    subcourses = course_data.get("subcourses", {})
+    return len(subcourses), sum(1 for module_data in subcourses.values() if module_data.get("completed", False))
+
+def overall_totals(total_courses, total_modules, completed_modules, percentage_sum, status_counts):
+    """Overview statistics from running totals (``percentage_sum`` adds up every course's percentage)"""
+    return {
+        "total_courses": total_courses,
+        "total_modules": total_modules,
+        "completed_modules": completed_modules,
+        "progress_percentage": percentage(completed_modules, total_modules),
+        "avg_progress": percentage_sum / total_courses if total_courses else 0,
+        "courses_not_started": status_counts["not_started"],
+        "courses_in_progress": status_counts["in_progress"],
+        "courses_completed": status_counts["completed"],
+        "completion_rate": percentage(status_counts["completed"], total_courses),
+    }
+
+class CourseAnalytics:
+    """Metrics of a set of courses, filled one course at a time with :meth:`add` or :meth:`add_counts`"""
+
+    def __init__(self, count_types=True):
+        self.count_types = count_types
+        # course name -> total, completed, percentage, remaining, status, types, category, description, updated
+        self.courses = {}
+        # module type -> {"total", "completed"} across all courses
+        self.types = {}
+        self.status_counts = dict.fromkeys(STATUSES, 0)
+        self.total_modules = 0
+        self.completed_modules = 0
+        self.percentage_sum = 0.0
+
+    def add(self, name, course_data):
+        """Count one course (and its module types, if this analytics counts them)"""
+        total, completed = count_modules(course_data)
+        course_types = {}
+        if self.count_types:
+            for module_data in course_data.get("subcourses", {}).values():
+                done = bool(module_data.get("completed", False))
+                module_type = module_data.get("type", "Module")
+                course_types[module_type] = course_types.get(module_type, 0) + 1
+                counts = self.types.get(module_type)
+                if counts is None:
+                    counts = self.types[module_type] = {"total": 0, "completed": 0}
+                counts["total"] += 1
+                counts["completed"] += done
+        self.add_counts(
+            name, total, completed,
+            category=course_data.get("category"),
+            description=course_data.get("description", ""),
+            updated=course_data.get("_meta", {}).get("updated"),
+            types=course_types
+        )
+
+    def add_counts(self, name, total, completed, category=None, description="", updated=None, types=None):
+        """Count one course from its module counts (e.g. a row of database-side aggregates)"""
+        status = course_status(total, completed)
+        share = percentage(completed, total)
+        self.courses[name] = {
+            "total": total,
+            "completed": completed,
+            "percentage": share,
+            "remaining": total - completed,
+            "status": status,
+            "types": types or {},
+            "category": category,
+            "description": description,
+            "updated": updated,
+        }
+        self.status_counts[status] += 1
+        self.total_modules += total
+        self.completed_modules += completed
+        self.percentage_sum += share
+
+    @property
+    def in_progress(self):
+        """Names of the courses with some but not all modules completed"""
+        return [name for name, course in self.courses.items() if course["status"] == "in_progress"]
+
+    def course(self, name):
+        """Progress of one course: total, completed, percentage, remaining (zeros if unknown)"""
+        course = self.courses.get(name)
+        if course is None:
+            return {"total": 0, "completed": 0, "percentage": 0, "remaining": 0}
+        return {key: course[key] for key in ("total", "completed", "percentage", "remaining")}
+
+    def overall(self):
+        """Totals across all courses, with the keys of ``module_table.overall_stats``"""
+        return overall_totals(
+            len(self.courses), self.total_modules, self.completed_modules, self.percentage_sum, self.status_counts
+        )
+
+    def aggregates(self):
+        """Per-course and per-type counts in the shape of ``database.aggregate_stats``"""
+        return {
+            "courses": [
+                {
+                    "course": name,
+                    "description": course["description"],
+                    "category": course["category"],
+                    "updated": course["updated"],
+                    "total": course["total"],
+                    "completed": course["completed"]
+                }
+                for name, course in self.courses.items()
+            ],
+            "types": [{"type": name, **counts} for name, counts in self.types.items()]
+        }
+
+def analyze(courses, count_types=True):
+    """Analytics of a whole course dict"""
+    analytics = CourseAnalytics(count_types)
+    for name, course_data in courses.items():
+        analytics.add(name, course_data)
+    return analytics
+
+def from_aggregates(aggregates):
+    """Analytics of per-course and per-type counts in the shape of ``database.aggregate_stats``"""
+    analytics = CourseAnalytics(count_types=False)
+    for row in aggregates["courses"]:
+        analytics.add_counts(
+            row["course"], row["total"] or 0, row["completed"] or 0,
+            category=row.get("category"), description=row.get("description"), updated=row.get("updated")
+        )
+    analytics.types = {row["type"]: {"total": row["total"], "completed": row["completed"]} for row in aggregates["types"]}
+    return analytics
+
+def get_analytics(courses):
+    """The session's analytics, recomputed only when its data version changes or it saves an edit"""
+    key = (
+        st.session_state.get("owner"),
+        st.session_state.get("courses_version"),
+        st.session_state.get("courses_revision", 0),
+        id(courses),
+        len(courses),
+    )
+    cached = st.session_state.get("course_analytics")
+    if cached is None or cached[0] != key:
+        cached = (key, analyze(courses))
+        st.session_state["course_analytics"] = cached
+    return cached[1]
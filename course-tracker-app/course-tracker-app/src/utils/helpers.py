@@ -1,35 +1,96 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from operator import itemgetter
+import heapq
 import pandas as pd
+from utils.analytics import PROGRESS_KEY, analyze, count_modules
 
-def calculate_course_stats(courses):
-    """Calculate comprehensive course statistics"""
-    if not courses:
-        return {
-            "total_courses": 0,
-            "total_modules": 0,
-            "completed_modules": 0,
-            "progress_percentage": 0
-        }
-    
-    total_courses = len(courses)
-    total_modules = 0
-    completed_modules = 0
-    
-    for course_name, course_data in courses.items():
-        subcourses = course_data.get("subcourses", {})
-        total_modules += len(subcourses)
-        completed_modules += sum(1 for sub_data in subcourses.values() 
-                               if sub_data.get("completed", False))
-    
-    progress_percentage = (completed_modules / total_modules * 100) if total_modules > 0 else 0
-    
-    return {
-        "total_courses": total_courses,
-        "total_modules": total_modules,
-        "completed_modules": completed_modules,
-        "progress_percentage": progress_percentage
+def refresh_progress(course_data):
+    """Recount the course's stored progress counters from its modules"""
+    # Without counters count_modules scans the modules
+    course_data.pop(PROGRESS_KEY, None)
+    total, completed = count_modules(course_data)
+    course_data[PROGRESS_KEY] = {"total": total, "completed": completed}
+    return course_data[PROGRESS_KEY]
+
+def ensure_progress(courses):
+    """Add or repair the progress counters of courses loaded from storage
+
+    Courses saved before the counters existed (or edited outside the app)
+    are recounted once; courses with consistent counters are left as they are.
+    """
+    for course_data in courses.values():
+        counters = course_data.get(PROGRESS_KEY)
+        if (not isinstance(counters, dict)
+                or counters.get("total") != len(course_data.get("subcourses", {}))
+                or not 0 <= counters.get("completed", -1) <= counters["total"]):
+            refresh_progress(course_data)
+    return courses
+
+def _progress_counts(course_data):
+    """(total, completed) from the stored counters, recounted if they are missing"""
+    counters = course_data.get(PROGRESS_KEY)
+    if not isinstance(counters, dict):
+        counters = refresh_progress(course_data)
+    return counters["total"], counters["completed"]
+
+def add_module(course_data, module_name, module_data):
+    """Add a module and count it; returns False if the module already exists"""
+    subcourses = course_data.setdefault("subcourses", {})
+    if module_name in subcourses:
+        return False
+    total, completed = _progress_counts(course_data)
+    subcourses[module_name] = module_data
+    course_data[PROGRESS_KEY] = {
+        "total": total + 1,
+        "completed": completed + (1 if module_data.get("completed", False) else 0)
+    }
+    return True
+
+def delete_module(course_data, module_name):
+    """Remove a module and uncount it"""
+    subcourses = course_data.get("subcourses", {})
+    if module_name not in subcourses:
+        return
+    total, completed = _progress_counts(course_data)
+    module_data = subcourses.pop(module_name)
+    course_data[PROGRESS_KEY] = {
+        "total": total - 1,
+        "completed": completed - (1 if module_data.get("completed", False) else 0)
     }
 
+def _stamp_completed(module_data, completed, now):
+    module_data["completed"] = completed
+    module_data["updated"] = now.isoformat()
+    if completed:
+        module_data["completion_date"] = now.strftime("%Y-%m-%d")
+    else:
+        module_data.pop("completion_date", None)
+
+def set_module_completed(course_data, module_name, completed, now=None):
+    """Mark one module (in)complete, stamping its dates and adjusting the completed counter"""
+    module_data = course_data["subcourses"][module_name]
+    total, completed_count = _progress_counts(course_data)
+    was_completed = module_data.get("completed", False)
+    _stamp_completed(module_data, completed, now or datetime.now())
+    course_data[PROGRESS_KEY] = {"total": total, "completed": completed_count + int(completed) - int(was_completed)}
+
+def set_all_modules_completed(course_data, completed, now=None):
+    """Mark every module of the course (in)complete; returns the names of the modules that changed state
+
+    Only those modules are stamped - modules already in that state keep their dates.
+    """
+    now = now or datetime.now()
+    subcourses = course_data.get("subcourses", {})
+    changed = [name for name, module_data in subcourses.items() if module_data.get("completed", False) != completed]
+    for name in changed:
+        _stamp_completed(subcourses[name], completed, now)
+    course_data[PROGRESS_KEY] = {"total": len(subcourses), "completed": len(subcourses) if completed else 0}
+    return changed
+
+def calculate_course_stats(courses):
+    """Calculate comprehensive course statistics from the progress counters (see utils.analytics)"""
+    return analyze(courses, count_types=False).overall()
+
 def calculate_course_progress(course_data):
     """Calculate progress for a single course"""
     if not course_data:
@@ -40,9 +101,7 @@ def calculate_course_progress(course_data):
             "remaining": 0
         }
     
-    subcourses = course_data.get("subcourses", {})
-    total = len(subcourses)
-    completed = sum(1 for sub_data in subcourses.values() if sub_data.get("completed", False))
+    total, completed = _progress_counts(course_data)
     percentage = (completed / total * 100) if total > 0 else 0
     
     return {
@@ -54,26 +113,28 @@ def calculate_course_progress(course_data):
 
 def get_recent_activities(courses, limit=5):
     """Get recent activities from course updates"""
-    activities = []
+    now = datetime.now().isoformat()
     
-    for course_name, course_data in courses.items():
-        subcourses = course_data.get("subcourses", {})
-        for sub_name, sub_data in subcourses.items():
-            if sub_data.get("completed", False):
-                completion_date = sub_data.get("completion_date", "")
-                updated_time = sub_data.get("updated", "")
-                
-                activities.append({
-                    "title": f"Completed: {sub_name}",
-                    "course": course_name,
-                    "timestamp": completion_date or updated_time or datetime.now().isoformat(),
-                    "type": "completion",
-                    "module_type": sub_data.get("type", "Module")
-                })
+    def completions():
+        for course_name, course_data in courses.items():
+            for sub_name, sub_data in course_data.get("subcourses", {}).items():
+                if sub_data.get("completed", False):
+                    timestamp = sub_data.get("completion_date", "") or sub_data.get("updated", "") or now
+                    yield timestamp, course_name, sub_name, sub_data
     
-    # Sort by timestamp (most recent first)
-    activities.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-    return activities[:limit]
+    # Keep only the `limit` most recent in a heap (O(n log limit)) instead of sorting every completion;
+    # ties keep their original order, as a stable sort would
+    latest = heapq.nlargest(limit, completions(), key=itemgetter(0))
+    return [
+        {
+            "title": f"Completed: {sub_name}",
+            "course": course_name,
+            "timestamp": timestamp,
+            "type": "completion",
+            "module_type": sub_data.get("type", "Module")
+        }
+        for timestamp, course_name, sub_name, sub_data in latest
+    ]
 
 def format_duration(minutes):
     """Format duration in minutes to human readable format"""
@@ -88,37 +149,27 @@ def format_duration(minutes):
         hours = (minutes % 1440) // 60
         return f"{days}d {hours}h" if hours > 0 else f"{days}d"
 
-def get_completion_streak(courses):
-    """Calculate current completion streak in days"""
-    # This is a mock implementation
-    # In a real app, you'd track daily completion data
-    return 12
+def get_completion_streak(courses, today=None):
+    """Calculate current completion streak in days from the modules' completion dates
+
+    The app reads streaks from the completion log (``get_learning_stats``);
+    this works on a plain course dict.
+    """
+    days = {
+        sub_data["completion_date"][:10]
+        for course_data in courses.values()
+        for sub_data in course_data.get("subcourses", {}).values()
+        if sub_data.get("completed", False) and sub_data.get("completion_date")
+    }
+    today = today or date.today()
+    # Today isn't over yet - a streak that reached yesterday still counts
+    day = today if today.isoformat() in days else today - timedelta(days=1)
+    streak = 0
+    while day.isoformat() in days:
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
 
 def get_study_statistics(courses):
     """Get detailed study statistics"""
-    stats = calculate_course_stats(courses)
-    
-    if not courses:
-        return {**stats, "avg_progress": 0, "courses_not_started": 0, "courses_in_progress": 0, "courses_completed": 0, "completion_rate": 0}
-    
-    # Calculate additional metrics
-    course_progress_list = []
-    for course_name, course_data in courses.items():
-        progress = calculate_course_progress(course_data)
-        course_progress_list.append(progress["percentage"])
-    
-    avg_progress = sum(course_progress_list) / len(course_progress_list) if course_progress_list else 0
-    
-    # Count courses by status
-    not_started = sum(1 for p in course_progress_list if p == 0)
-    in_progress = sum(1 for p in course_progress_list if 0 < p < 100)
-    completed = sum(1 for p in course_progress_list if p == 100)
-    
-    return {
-        **stats,
-        "avg_progress": avg_progress,
-        "courses_not_started": not_started,
-        "courses_in_progress": in_progress,
-        "courses_completed": completed,
-        "completion_rate": (completed / len(course_progress_list) * 100) if course_progress_list else 0
-    }
\ No newline at end of file
+    return analyze(courses, count_types=False).overall()
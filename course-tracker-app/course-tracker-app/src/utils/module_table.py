@@ -0,0 +1,380 @@
+"""Columnar module tables for the dashboard analytics
+
+The nested course dicts are flattened once per data version into pandas
+frames - one row per module and one row per course - and the dashboard,
+sidebar and course-view metrics are computed from those with vectorized
+group-bys instead of Python loops over every module on each rerun.
+
+A save of the session's own edits only replaces the rows of the courses it
+names (see ``database.mongodb_client.save_courses``), so an edit costs the
+changed course's modules rather than a rebuild of every table.
+"""
+from datetime import date
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.analytics import CourseAnalytics, course_status
+
+# Timeline ranges longer than this many days are downsampled to about this many points
+TIMELINE_MAX_POINTS = 60
+
+# Name-based course categories for the overview pie, checked in order (first match wins)
+NAME_CATEGORIES = (
+    ("Data Science", ("Data Scientist",)),
+    ("Analytics", ("SQL", "Analyst")),
+    ("ML/AI", ("ML", "Machine Learning")),
+    ("Business Intelligence", ("Power BI", "BI")),
+    ("Programming", ("Python",)),
+)
+
+def _parse_timestamps(values):
+    """Parse ISO timestamps/dates in one pass into a datetime64 array; anything unparseable becomes NaT"""
+    # Many modules share a timestamp (dates especially) - parse each distinct value once
+    codes, uniques = pd.factorize(pd.Series(values, dtype="object"))
+    parsed = pd.to_datetime(pd.Series(uniques, dtype="object"), errors="coerce", format="ISO8601", utc=True)
+    # Stored timestamps are naive local times - offsets are normalized to UTC, then dropped
+    parsed = parsed.dt.tz_localize(None).to_numpy()
+    result = np.full(len(codes), np.datetime64("NaT"), dtype=parsed.dtype if len(parsed) else "datetime64[ns]")
+    present = codes >= 0
+    result[present] = parsed[codes[present]]
+    return result
+
+MODULE_TIMESTAMPS = ("created", "updated", "completion_date")
+
+def _objects(values):
+    """1-d object array of ``values``"""
+    values = list(values)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def _module_columns(courses):
+    """Module table columns for ``courses`` as arrays ("course" holds positions in ``courses``)"""
+    course_codes = []
+    names = []
+    modules = []
+    for code, course_data in enumerate(courses.values()):
+        subcourses = course_data.get("subcourses", {})
+        course_codes.extend([code] * len(subcourses))
+        names.extend(subcourses)
+        modules.extend(subcourses.values())
+
+    columns = {
+        "course": np.array(course_codes, dtype=np.int32),
+        "module": _objects(names),
+        "type": _objects([module.get("type", "Module") for module in modules]),
+        "completed": np.array([bool(module.get("completed", False)) for module in modules], dtype=bool),
+    }
+    # All three timestamp columns in one parse
+    parsed = _parse_timestamps([module.get(field) for field in MODULE_TIMESTAMPS for module in modules])
+    for index, field in enumerate(MODULE_TIMESTAMPS):
+        columns[field] = parsed[index * len(modules):(index + 1) * len(modules)]
+    return columns
+
+def _module_frame(course_codes, course_dtype, module, type_codes, type_dtype, completed, timestamps):
+    # The codes are built here, so they are not validated again; the arrays are fresh, so not copied
+    return pd.DataFrame({
+        "course": pd.Categorical.from_codes(course_codes, dtype=course_dtype, validate=False),
+        "module": pd.Series(module, dtype="object", copy=False),
+        "type": pd.Categorical.from_codes(type_codes, dtype=type_dtype, validate=False),
+        "completed": completed,
+        **{field: timestamps[field] for field in MODULE_TIMESTAMPS},
+    }, copy=False)
+
+def build_module_table(courses):
+    """One row per module: course, module, type, completed, created, updated, completion_date"""
+    columns = _module_columns(courses)
+    type_codes, types = pd.factorize(columns["type"], sort=True)
+    return _module_frame(
+        columns["course"], pd.CategoricalDtype(list(courses)), columns["module"], type_codes.astype(np.int32),
+        pd.CategoricalDtype(list(types)), columns["completed"], columns
+    )
+
+def _course_columns(names, descriptions, categories, updated_raw, total, completed):
+    total = np.asarray(total, dtype=np.int64)
+    completed = np.asarray(completed, dtype=np.int64)
+    return {
+        "course": _objects(names),
+        "description": _objects(descriptions),
+        "category": _objects(categories),
+        "updated_raw": _objects(updated_raw),
+        "updated": _parse_timestamps(updated_raw),
+        "total": total,
+        "completed": completed,
+        "percentage": np.divide(completed * 100.0, total, out=np.zeros(len(total)), where=total > 0),
+        "status": _objects([course_status(t, c) for t, c in zip(total.tolist(), completed.tolist())]),
+    }
+
+def _course_frame(columns):
+    return pd.DataFrame({
+        name: pd.Series(values, dtype="object") if values.dtype == object else values
+        for name, values in columns.items()
+    })
+
+def _course_data_columns(courses, total, completed):
+    return _course_columns(
+        list(courses),
+        [course_data.get("description", "") for course_data in courses.values()],
+        [course_data.get("category", "") for course_data in courses.values()],
+        [course_data.get("_meta", {}).get("updated") for course_data in courses.values()],
+        total,
+        completed
+    )
+
+def build_course_table(courses, modules):
+    """One row per course with its module counts, progress and status (in course order)"""
+    codes = modules["course"].cat.codes.to_numpy()
+    return _course_frame(_course_data_columns(
+        courses,
+        np.bincount(codes, minlength=len(courses)),
+        np.bincount(codes, weights=modules["completed"].to_numpy(), minlength=len(courses))
+    ))
+
+def build_tables(courses):
+    """Module table and course table for ``courses``"""
+    modules = build_module_table(courses)
+    return {
+        "modules": modules,
+        "courses": build_course_table(courses, modules),
+    }
+
+def update_tables(tables, courses, course_ids):
+    """Tables for ``courses`` from the ``tables`` of an earlier state that differs only in ``course_ids``
+
+    The module table keeps each course's modules in one block, in course
+    order, so the new tables are the reused blocks of the other courses
+    with rebuilt blocks for the changed ones spliced in - array slices, no
+    regrouping. Values derived from ``tables`` that the change leaves valid
+    are carried over.
+    """
+    course_ids = set(course_ids)
+    course_names = list(courses)
+    changed = {name: courses[name] for name in course_names if name in course_ids}
+    modules, course_table = tables["modules"], tables["courses"]
+    old_names = course_table["course"].tolist()
+    old_rows = {name: row for row, name in enumerate(old_names)}
+    fresh = _module_columns(changed)
+    fresh_totals = np.bincount(fresh["course"], minlength=len(changed))
+    fresh_courses = _course_data_columns(
+        changed, fresh_totals, np.bincount(fresh["course"], weights=fresh["completed"], minlength=len(changed))
+    )
+
+    # Rows of each course: (from the fresh rows?, start, end), merging neighbouring runs
+    old_ends = np.cumsum(course_table["total"].to_numpy()).tolist()
+    old_blocks = {name: (end - total, end) for name, total, end in zip(old_names, course_table["total"].tolist(), old_ends)}
+    fresh_ends = np.cumsum(fresh_totals).tolist()
+    fresh_blocks = {name: (end - total, end) for name, total, end in zip(changed, fresh_totals.tolist(), fresh_ends)}
+    runs = []
+    for name in course_names:
+        is_fresh = name in fresh_blocks
+        start, end = fresh_blocks[name] if is_fresh else old_blocks[name]
+        if runs and runs[-1][0] == is_fresh and runs[-1][2] == start:
+            runs[-1][2] = end
+        else:
+            runs.append([is_fresh, start, end])
+
+    def splice(old, new):
+        return np.concatenate([(new if is_fresh else old)[start:end] for is_fresh, start, end in runs] or [old[:0]])
+
+    # Course and type codes of both sources, mapped to the new categories (kept when they are unchanged)
+    same_courses = old_names == course_names
+    old_course_codes = modules["course"].cat.codes.to_numpy().astype(np.int32)
+    if same_courses:
+        course_dtype = modules["course"].dtype
+        fresh_positions = np.array([old_rows[name] for name in changed], dtype=np.int32)
+    else:
+        course_dtype = pd.CategoricalDtype(course_names)
+        positions = pd.Index(course_names)
+        old_course_codes = positions.get_indexer(modules["course"].cat.categories).astype(np.int32)[old_course_codes]
+        fresh_positions = positions.get_indexer(list(changed)).astype(np.int32)
+    known_types = modules["type"].cat.categories
+    new_types = pd.Index(sorted(set(fresh["type"].tolist()))).difference(known_types)
+    type_dtype = pd.CategoricalDtype(known_types.append(new_types)) if len(new_types) else modules["type"].dtype
+    module_table = _module_frame(
+        splice(old_course_codes, fresh_positions[fresh["course"]]),
+        course_dtype,
+        splice(modules["module"].to_numpy(), fresh["module"]),
+        splice(
+            modules["type"].cat.codes.to_numpy().astype(np.int32),
+            type_dtype.categories.get_indexer(fresh["type"]).astype(np.int32)
+        ),
+        type_dtype,
+        splice(modules["completed"].to_numpy(), fresh["completed"]),
+        {field: splice(modules[field].to_numpy(), fresh[field]) for field in MODULE_TIMESTAMPS}
+    )
+
+    fresh_rows = {name: len(old_names) + row for row, name in enumerate(changed)}
+    take = [fresh_rows[name] if name in fresh_rows else old_rows[name] for name in course_names]
+    course_rows = _course_frame({
+        name: np.concatenate([course_table[name].to_numpy(), values])[take] for name, values in fresh_courses.items()
+    })
+
+    updated = {"modules": module_table, "courses": course_rows}
+    return _carry_derived(tables, updated, course_ids, same_courses)
+
+def _carry_derived(tables, updated, course_ids, same_courses):
+    """Reuse the values derived from ``tables`` that changing ``course_ids`` leaves valid"""
+    for key, value in tables.items():
+        if key == "category_counts" and same_courses:
+            # Derived from the course names only
+            updated[key] = value
+        elif isinstance(key, tuple) and key[1] not in course_ids:
+            # Per-course values (type counts, timelines) of the courses that didn't change
+            updated[key] = value
+    return updated
+
+def _changed_since(revision, current):
+    """Courses the session's saves after ``revision`` touched, or None if any save didn't say"""
+    changes = st.session_state.get("course_changes", {})
+    changed = set()
+    for step in range(revision + 1, current + 1):
+        course_ids = changes.get(step)
+        if course_ids is None:
+            return None
+        changed.update(course_ids)
+    return changed
+
+def get_tables(courses):
+    """The session's tables: rebuilt when its data version changes, patched for the courses its saves touched"""
+    key = (st.session_state.get("owner"), st.session_state.get("courses_version"), id(courses))
+    revision = st.session_state.get("courses_revision", 0)
+    cached = st.session_state.get("module_tables")
+    if cached is not None and cached[0] == key and cached[1] == revision:
+        return cached[2]
+    course_ids = _changed_since(cached[1], revision) if cached is not None and cached[0] == key else None
+    if course_ids is not None:
+        tables = update_tables(cached[2], courses, course_ids)
+    else:
+        tables = build_tables(courses)
+    st.session_state["module_tables"] = (key, revision, tables)
+    return tables
+
+def _derived(tables, name, build):
+    """Compute a value from the tables once and keep it with them (they never change once built)"""
+    if name not in tables:
+        tables[name] = build()
+    return tables[name]
+
+def build_aggregate_tables(aggregates):
+    """Course table and per-type totals from database-side aggregates (see database.aggregate_stats)
+
+    Has no module table - only the overview statistics can be derived from it.
+    """
+    rows = aggregates["courses"]
+    return {
+        "courses": _course_frame(_course_columns(
+            [row["course"] for row in rows],
+            [row.get("description") or "" for row in rows],
+            [row.get("category") or "" for row in rows],
+            [row.get("updated") for row in rows],
+            [row.get("total") or 0 for row in rows],
+            [row.get("completed") or 0 for row in rows]
+        )),
+        "type_totals": pd.DataFrame(aggregates["types"], columns=["type", "total", "completed"]),
+    }
+
+def get_aggregate_tables(aggregates):
+    """The session's tables for ``aggregates``, rebuilt only when a different result comes back"""
+    cached = st.session_state.get("aggregate_tables")
+    if cached is None or cached[0] is not aggregates:
+        cached = (aggregates, build_aggregate_tables(aggregates))
+        st.session_state["aggregate_tables"] = cached
+    return cached[1]
+
+def overall_stats(tables):
+    """Totals across all courses plus per-course status counts"""
+    return _derived(tables, "overall_stats", lambda: _overall_stats(tables["courses"]))
+
+def _overall_stats(course_table):
+    analytics = CourseAnalytics(count_types=False)
+    for position, (total, completed) in enumerate(zip(course_table["total"].tolist(), course_table["completed"].tolist())):
+        analytics.add_counts(position, total, completed)
+    return analytics.overall()
+
+def category_counts(tables):
+    """Number of courses per overview category, most common first"""
+    return _derived(tables, "category_counts", lambda: name_categories(tables["courses"]).value_counts())
+
+def name_categories(course_table):
+    """Overview category of each course, derived from its name"""
+    names = course_table["course"].astype(str)
+    conditions = [
+        np.logical_or.reduce([names.str.contains(keyword, regex=False).to_numpy() for keyword in keywords])
+        for _, keywords in NAME_CATEGORIES
+    ]
+    return pd.Series(
+        np.select(conditions, [category for category, _ in NAME_CATEGORIES], "General") if len(names) else [],
+        index=course_table.index,
+        dtype="object"
+    )
+
+def summary_frame(tables):
+    """The dashboard's course summary table"""
+    return _derived(tables, "summary_frame", lambda: _summary_frame(tables["courses"]))
+
+def _summary_frame(course_table):
+    updated = course_table["updated"].to_numpy()
+    formatted = np.char.replace(np.datetime_as_string(updated, unit="m"), "T", " ").tolist()
+    # Unparseable timestamps are shown as stored, missing ones as N/A
+    last_updated = [
+        text if parsed else ("N/A" if raw is None or raw != raw else raw)
+        for text, parsed, raw in zip(formatted, (~np.isnat(updated)).tolist(), course_table["updated_raw"].tolist())
+    ]
+    descriptions = [
+        "No description" if not text else text if len(text) <= 50 else text[:50] + "..."
+        for text in ("" if value is None or value != value else str(value) for value in course_table["description"].tolist())
+    ]
+    return pd.DataFrame({
+        "📚 Course Name": course_table["course"],
+        "📊 Total Modules": course_table["total"],
+        "✅ Completed": course_table["completed"],
+        "📈 Progress": pd.Series([f"{value:.1f}%" for value in course_table["percentage"].tolist()], dtype="object"),
+        "🕒 Last Updated": pd.Series(last_updated, dtype="object"),
+        "📝 Description": pd.Series(descriptions, dtype="object"),
+    })
+
+def module_type_counts(tables, course_name):
+    """Module counts by type for one course, most common first"""
+    return _derived(tables, ("type_counts", course_name), lambda: _module_type_counts(tables["modules"], course_name))
+
+def _module_type_counts(modules, course_name):
+    types = modules.loc[(modules["course"] == course_name).to_numpy(), "type"]
+    counts = types.value_counts(sort=True)
+    return counts[counts > 0].rename_axis(None).rename(None)
+
+def course_timeline(tables, course_name, days=30, today=None):
+    """Daily cumulative progress of one course over the last ``days`` days
+
+    Built from the completed modules' completion dates (their last update
+    when no date was stored). Long ranges are downsampled to about
+    TIMELINE_MAX_POINTS points, always keeping the last day.
+    """
+    today = today or date.today()
+    return _derived(
+        tables,
+        ("timeline", course_name, days, today),
+        lambda: _course_timeline(tables["modules"], course_name, days, today)
+    )
+
+def _course_timeline(modules, course_name, days, today):
+    in_course = (modules["course"] == course_name).to_numpy()
+    total = int(np.count_nonzero(in_course))
+    done = modules.loc[in_course & modules["completed"].to_numpy()]
+    when = done["completion_date"].fillna(done["updated"]).to_numpy().astype("datetime64[D]")
+
+    start = np.datetime64(today, "D") - (days - 1)
+    dated = ~np.isnat(when)
+    offsets = (when[dated] - start).astype(np.int64)
+    # Completions before the range (or without any date) are already done on its first day
+    already_done = np.count_nonzero(offsets < 0) + np.count_nonzero(~dated)
+    daily = np.bincount(offsets[(offsets >= 0) & (offsets < days)], minlength=days)
+    completed = already_done + np.cumsum(daily)
+
+    step = -(-days // TIMELINE_MAX_POINTS)
+    keep = np.arange(days - 1, -1, -step)[::-1]
+    progress = completed[keep] * 100.0 / total if total else np.zeros(len(keep))
+    return pd.DataFrame({
+        "Date": start + keep,
+        "Completed": completed[keep],
+        "Progress": progress
+    })
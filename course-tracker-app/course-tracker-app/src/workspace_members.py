@@ -0,0 +1,34 @@
+"""Command-line management of shared workspace members
+
+Usage: python src/workspace_members.py add|remove WORKSPACE USER
+"""
+import argparse
+import sys
+import os
+
+# Add the current directory to Python path so we can import from database, utils, etc.
+current_dir = os.path.dirname(__file__)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+# ...and the project root for the shared settings in config/
+project_root = os.path.dirname(os.path.abspath(current_dir))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from database.mongodb_client import set_workspace_member
+
+def main():
+    """Add or remove one member of a workspace"""
+    parser = argparse.ArgumentParser(description="Grant or revoke access to a shared workspace")
+    parser.add_argument("action", choices=["add", "remove"])
+    parser.add_argument("workspace", help="Workspace name, as used in ?workspace= links")
+    parser.add_argument("user", help="Signed-in user identity (email)")
+    args = parser.parse_args()
+    
+    if not set_workspace_member(args.workspace, args.user, member=args.action == "add"):
+        print("MongoDB is not reachable - nothing was changed", file=sys.stderr)
+        sys.exit(1)
+    print(f"{'Added' if args.action == 'add' else 'Removed'} {args.user} {'to' if args.action == 'add' else 'from'} {args.workspace}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
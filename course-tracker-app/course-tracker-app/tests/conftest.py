@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+# The app runs from src/ and its modules import each other as database.*, utils.*
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+@pytest.fixture
+def mongo_db():
+    """A scratch database on the local MongoDB (as in test_database), dropped afterwards"""
+    client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB is not running on localhost:27017")
+    yield client["course_tracker_test"]
+    client.drop_database("course_tracker_test")
+    client.close()
@@ -0,0 +1,32 @@
+import pytest
+from utils.analytics import analyze
+from utils.helpers import calculate_course_stats
+
+COURSES = {
+    "SQL": {"subcourses": {
+        "Joins": {"completed": True, "type": "Video"},
+        "Views": {"completed": False, "type": "Exercise"},
+        "Indexes": {"completed": False, "type": "Video"}
+    }, "description": "Queries", "_meta": {"updated": "2024-03-01T10:30:00"}},
+    "Python": {"subcourses": {"Intro": {"completed": True}}},
+    "Empty": {"subcourses": {}}
+}
+
+def test_one_pass_collects_course_status_and_type_metrics():
+    analytics = analyze(COURSES)
+    assert analytics.course("SQL") == {"total": 3, "completed": 1, "percentage": pytest.approx(100 / 3), "remaining": 2}
+    assert analytics.courses["SQL"]["types"] == {"Video": 2, "Exercise": 1}
+    assert analytics.courses["SQL"]["updated"] == "2024-03-01T10:30:00"
+    assert analytics.status_counts == {"not_started": 1, "in_progress": 1, "completed": 1}
+    assert analytics.in_progress == ["SQL"]
+    assert analytics.types == {"Video": {"total": 2, "completed": 1}, "Exercise": {"total": 1, "completed": 0},
+                               "Module": {"total": 1, "completed": 1}}
+    assert analytics.course("Missing")["total"] == 0
+
+def test_totals_come_from_the_progress_counters_without_visiting_modules():
+    # Counters disagree with the modules on purpose, to show which one is read
+    courses = {"SQL": {"subcourses": {"Joins": {"completed": False}}, "_progress": {"total": 4, "completed": 4}}}
+    stats = calculate_course_stats(courses)
+    assert (stats["total_modules"], stats["completed_modules"], stats["courses_completed"]) == (4, 4, 1)
+    assert analyze(courses, count_types=False).types == {}
+    assert calculate_course_stats({})["total_modules"] == 0
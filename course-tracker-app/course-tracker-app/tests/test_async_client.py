@@ -0,0 +1,39 @@
+import threading
+import time
+import pytest
+from database import async_client
+
+def test_operations_run_concurrently_and_results_keep_their_order():
+    # Each call waits for the other, so they only finish if they run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fetch(value):
+        barrier.wait()
+        return value
+
+    fetch_async = async_client._operation(fetch)
+    assert async_client.gather(fetch_async("stats"), fetch_async("backups"), timeout=5) == ["stats", "backups"]
+
+def test_errors_reach_the_caller():
+    def fail():
+        raise ValueError("broken backup")
+
+    with pytest.raises(ValueError, match="broken backup"):
+        async_client.run(async_client._operation(fail)(), timeout=5)
+
+def test_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(async_client, "_slots", threading.BoundedSemaphore(2))
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def call():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    call_async = async_client._operation(call)
+    async_client.gather(*(call_async() for _ in range(6)), timeout=5)
+    assert running[1] == 2
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from database import backup_store
+
+def _courses(completed):
+    return {"SQL": {"subcourses": {"Joins": {"completed": completed}, "Views": {"completed": False}}}}
+
+def test_deleting_the_head_backup_makes_it_unloadable(mongo_db):
+    first = backup_store.create_backup(mongo_db, _courses(False), owner="ana")
+    head = backup_store.create_backup(mongo_db, _courses(True), owner="ana")
+
+    assert backup_store.delete_backup(mongo_db, head, owner="ana")
+    assert backup_store.load_backup(mongo_db, head, owner="ana") is None
+    assert backup_store.load_backup(mongo_db, first, owner="ana") == _courses(False)
+
+    # The next backup is a checkpoint, not a delta against the deleted head
+    newest = backup_store.create_backup(mongo_db, _courses(True), owner="ana")
+    assert mongo_db[backup_store.BACKUP_COLLECTION].find_one({"_id": newest})["kind"] == "full"
+    assert backup_store.load_backup(mongo_db, newest, owner="ana") == _courses(True)
+
+def test_deleting_a_base_rebases_the_deltas_that_depend_on_it(mongo_db):
+    ids = [backup_store.create_backup(mongo_db, _courses(done), owner="ana") for done in (False, True, False)]
+
+    assert backup_store.delete_backup(mongo_db, ids[0], owner="ana")
+    child = mongo_db[backup_store.BACKUP_COLLECTION].find_one({"_id": ids[1]})
+    assert (child["kind"], child["base_seq"]) == ("full", None)
+    assert backup_store.load_backup(mongo_db, ids[1], owner="ana") == _courses(True)
+    assert backup_store.load_backup(mongo_db, ids[2], owner="ana") == _courses(False)
+
+def test_backup_whose_dependents_cannot_be_rebuilt_is_kept(mongo_db):
+    ids = [backup_store.create_backup(mongo_db, _courses(done), owner="ana") for done in (False, True, False, True)]
+    # Lose the checkpoint the chain replays from
+    mongo_db[backup_store.BACKUP_COLLECTION].delete_one({"_id": ids[0]})
+
+    assert not backup_store.delete_backup(mongo_db, ids[1], owner="ana")
+    assert mongo_db[backup_store.BACKUP_COLLECTION].find_one({"_id": ids[1]}) is not None
+
+def test_payloads_round_trip_compressed():
+    payload = {"sets": [[["SQL", "subcourses", "Joins", "completed"], True]], "unsets": [["Go"]]}
+    encoded = backup_store.encode_payload(payload)
+
+    assert backup_store.decode_payload(encoded) == payload
+    assert backup_store.decode_payload(backup_store.encode_payload(_courses(True))) == _courses(True)
+
+def test_deltas_replay_across_checkpoints(mongo_db):
+    states = [_courses(i % 2 == 1) for i in range(5)]
+    states[3]["Go"] = {"subcourses": {"Channels": {"completed": True}}}
+    ids = [backup_store.create_backup(mongo_db, state, checkpoint_interval=3, owner="ana") for state in states]
+
+    kinds = [mongo_db[backup_store.BACKUP_COLLECTION].find_one({"_id": backup_id})["kind"] for backup_id in ids]
+    assert kinds == ["full", "delta", "delta", "full", "delta"]
+    for backup_id, state in zip(ids, states):
+        assert backup_store.load_backup(mongo_db, backup_id, owner="ana") == state
+
+def test_sequence_numbers_taken_by_concurrent_backups_are_skipped(mongo_db):
+    first = backup_store.create_backup(mongo_db, _courses(False), owner="ana")
+    # Another backup took the next number but hasn't stored anything yet
+    meta = mongo_db[backup_store.BACKUP_META_COLLECTION]
+    meta.update_one({"_id": backup_store.head_id("ana")}, {"$inc": {"seq": 1}})
+    second = backup_store.create_backup(mongo_db, _courses(True), owner="ana")
+
+    entry = mongo_db[backup_store.BACKUP_COLLECTION].find_one({"_id": second})
+    assert (entry["seq"], entry["kind"], entry["base_seq"]) == (3, "delta", 1)
+    # The delta chains to the backup the head held, not to the skipped number
+    assert backup_store._replay(mongo_db, entry) == _courses(True)
+    assert backup_store.load_backup(mongo_db, first, owner="ana") == _courses(False)
+    assert meta.find_one({"_id": backup_store.head_id("ana")})["payload_seq"] == 3
+
+def test_cursor_round_trip():
+    backup = {"_id": "backup_ana_20240101_120000_3", "backup_created": datetime(2024, 1, 1, 12, 0, 0, 250000)}
+    token = backup_store.encode_cursor(backup)
+
+    assert backup_store.decode_cursor(token) == (backup["backup_created"], backup["_id"])
+
+def test_pages_cover_every_backup_once_newest_first(mongo_db):
+    created = datetime(2024, 1, 1, 12, 0, 0)
+    # Two backups share a timestamp, so the _id tie-break decides their order
+    for backup_id, minutes in (("b1", 0), ("b2", 1), ("b3", 1), ("b4", 2), ("b5", 3)):
+        mongo_db[backup_store.BACKUP_COLLECTION].insert_one(
+            {"_id": backup_id, "owner": "ana", "backup_created": created + timedelta(minutes=minutes), "kind": "full"}
+        )
+    mongo_db[backup_store.BACKUP_COLLECTION].insert_one({"_id": "other", "owner": "bo", "backup_created": created})
+
+    pages, token = [], None
+    while True:
+        page, token = backup_store.list_backups(mongo_db, 2, after=token, owner="ana")
+        pages.append([backup["_id"] for backup in page])
+        if token is None:
+            break
+
+    assert pages == [["b5", "b4"], ["b3", "b2"], ["b1"]]
@@ -0,0 +1,61 @@
+import copy
+from database.change_tracker import build_update, diff_paths, apply_delta, changed_keys
+
+def _courses():
+    return {
+        "Data Science": {
+            "description": "Learn data science",
+            "notes": "",
+            "subcourses": {
+                "Intro": {"completed": False, "type": "Lesson"},
+                "Pandas": {"completed": True, "type": "Exercise", "completion_date": "2024-01-02"}
+            }
+        }
+    }
+
+def test_toggle_sends_only_module_paths():
+    old = _courses()
+    new = copy.deepcopy(old)
+    new["Data Science"]["subcourses"]["Intro"]["completed"] = True
+    del new["Data Science"]["subcourses"]["Pandas"]["completion_date"]
+
+    update = build_update(old, new)
+    assert update == {
+        "$set": {"courses.Data Science.subcourses.Intro.completed": True},
+        "$unset": {"courses.Data Science.subcourses.Pandas.completion_date": ""}
+    }
+
+def test_no_changes_produces_empty_update():
+    assert build_update(_courses(), _courses()) == {}
+
+def test_missing_snapshot_sets_whole_field():
+    new = _courses()
+    assert build_update(None, new) == {"$set": {"courses": new}}
+
+def test_dotted_keys_collapse_to_safe_parent():
+    old = _courses()
+    new = copy.deepcopy(old)
+    new["Data Science"]["subcourses"]["Python 3.12"] = {"completed": False}
+    new["Data Science"]["notes"] = "Keep going"
+
+    update = build_update(old, new)
+    assert update["$set"]["courses.Data Science.subcourses"] == new["Data Science"]["subcourses"]
+    assert update["$set"]["courses.Data Science.notes"] == "Keep going"
+    assert "$unset" not in update
+
+def test_apply_delta_round_trip():
+    old = _courses()
+    new = copy.deepcopy(old)
+    new["Data Science"]["subcourses"]["Intro"]["completed"] = True
+    del new["Data Science"]["subcourses"]["Pandas"]
+    new["SQL"] = {"subcourses": {}}
+
+    sets, unsets = diff_paths(old, new)
+    assert apply_delta(copy.deepcopy(old), sets, unsets) == new
+
+def test_changed_keys_lists_added_changed_and_removed_courses():
+    old = {"Python": {"notes": ""}, "SQL": {"notes": ""}, "R": {}}
+    new = {"Python": {"notes": "done"}, "SQL": {"notes": ""}, "Go": {}}
+
+    assert sorted(changed_keys(old, new)) == ["Go", "Python", "R"]
+    assert changed_keys(None, new) is None
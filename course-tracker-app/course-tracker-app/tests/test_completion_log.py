@@ -0,0 +1,34 @@
+from datetime import date
+from database.completion_log import streak_length, summarize, day_counts
+
+TODAY = date(2024, 3, 10)
+
+def test_streak_counts_consecutive_days_up_to_today_or_yesterday():
+    assert streak_length(["2024-03-10", "2024-03-09", "2024-03-08", "2024-03-06"], TODAY) == 3
+    assert streak_length(["2024-03-09", "2024-03-08"], TODAY) == 2
+    assert streak_length(["2024-03-08", "2024-03-07"], TODAY) == 0
+    assert streak_length([], TODAY) == 0
+
+def test_streak_stops_reading_at_the_first_gap():
+    read = []
+
+    def days():
+        for day in ["2024-03-10", "2024-03-09", "2024-03-01", "2024-02-29"]:
+            read.append(day)
+            yield day
+
+    assert streak_length(days(), TODAY) == 2
+    assert read == ["2024-03-10", "2024-03-09", "2024-03-01"]
+
+def test_summary_nets_uncompletions_over_the_last_seven_days():
+    net_by_day = {"2024-03-10": 2, "2024-03-08": -1, "2024-03-04": 3, "2024-03-03": 5}
+    stats = summarize(["2024-03-10", "2024-03-08", "2024-03-04"], net_by_day, TODAY)
+    assert stats == {"streak_days": 1, "completed_this_week": 4, "completed_today": 2}
+
+def test_day_counts_seed_from_stored_completion_dates():
+    courses = {"SQL": {"subcourses": {
+        "Joins": {"completed": True, "completion_date": "2024-03-09"},
+        "Views": {"completed": True, "completion_date": "2024-03-09"},
+        "Indexes": {"completed": False, "completion_date": "2024-03-08"}
+    }}}
+    assert day_counts(courses) == {"2024-03-09": 2}
@@ -1,8 +1,8 @@
 import pytest
-from src.components.sidebar import Sidebar
-from src.components.dashboard import Dashboard
-from src.components.course_view import CourseView
-from src.components.metrics import calculate_course_stats
+from components.sidebar import Sidebar
+from components.dashboard import Dashboard
+from components.course_view import CourseView
+from components.metrics import calculate_course_stats
 
 def test_sidebar_initialization():
     sidebar = Sidebar()
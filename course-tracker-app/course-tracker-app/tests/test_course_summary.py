@@ -0,0 +1,71 @@
+import copy
+import json
+import pytest
+from database.course_summary import changes, from_stored, materialize, summarize
+from utils.analytics import analyze
+
+COURSES = {
+    "SQL Basics": {
+        "category": "Data",
+        "subcourses": {"Joins": {"completed": True, "type": "Video"}, "Views": {"completed": False, "type": "Exercise"}}
+    },
+    "Python": {"category": "Data", "subcourses": {"Intro": {"completed": True}}},
+    "Empty": {"subcourses": {}}
+}
+
+def test_summary_totals_match_the_overview_statistics():
+    summary = summarize(analyze(COURSES).aggregates(), last_updated="2024-03-01T10:30:00")
+    assert (summary["total_courses"], summary["total_modules"], summary["completed_modules"]) == (3, 3, 2)
+    assert (summary["courses_not_started"], summary["courses_in_progress"], summary["courses_completed"]) == (1, 1, 1)
+    assert summary["courses"][0] == {"course": "SQL Basics", "total": 2, "completed": 1, "percentage": 50.0}
+    assert summary["categories"] == [{"category": "Data", "courses": 2}, {"category": "Uncategorized", "courses": 1}]
+    assert {row["type"]: (row["total"], row["completed"]) for row in summary["types"]} == {
+        "Video": (1, 1), "Exercise": (1, 0), "Module": (1, 1)
+    }
+    assert summary["last_updated"] == "2024-03-01T10:30:00"
+
+def test_missing_counts_from_the_database_are_taken_as_zero():
+    aggregates = analyze(COURSES).aggregates()
+    aggregates["courses"][2].update(total=None, completed=None)
+    assert summarize(aggregates, "now") == summarize(analyze(COURSES).aggregates(), "now")
+
+def _apply(document, update):
+    """Apply $set/$unset/$inc with dotted paths the way MongoDB does"""
+    document = copy.deepcopy(document)
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            *parents, last = path.split(".")
+            target = document
+            for key in parents:
+                target = target.setdefault(key, {})
+            if operator == "$set":
+                target[last] = value
+            elif operator == "$unset":
+                target.pop(last, None)
+            else:
+                target[last] = target.get(last, 0) + value
+    return document
+
+def test_changes_update_only_the_changed_rows_and_totals():
+    stored = {"summary": materialize(analyze(COURSES).aggregates(), "now")}
+    courses = {**COURSES, "SQL Basics": {"category": "Data", "subcourses": {"Joins": {"completed": True, "type": "Video"}}}}
+    del courses["Python"]
+    courses["Go.dev"] = {"category": "Systems", "subcourses": {"Tour": {"completed": False, "type": "Video"}}}
+    update = changes(COURSES, courses, ["SQL Basics", "Python", "Go.dev"], last_updated="now")
+
+    updated = from_stored(_apply(stored, update)["summary"])
+    expected = summarize(analyze(courses).aggregates(), "now")
+    # The percentage sum is adjusted by $inc, so allow for float rounding
+    assert updated.pop("avg_progress") == pytest.approx(expected.pop("avg_progress"))
+    assert updated == expected
+    # The unchanged course's row isn't sent
+    assert not any("Empty" in json.dumps(value) for value in update["$set"].values())
+
+def test_toggling_one_module_sends_a_small_update():
+    courses = {f"Course {i}": {"subcourses": {f"Module {j}": {"completed": False} for j in range(20)}} for i in range(300)}
+    toggled = copy.deepcopy(courses)
+    toggled["Course 7"]["subcourses"]["Module 3"]["completed"] = True
+    update = changes(courses, toggled, ["Course 7"], last_updated="now")
+
+    assert len(json.dumps(update)) < 1024
+    assert from_stored(_apply({"summary": materialize(analyze(courses).aggregates(), "now")}, update)["summary"])["completed_modules"] == 1
@@ -1,7 +1,7 @@
 from pymongo import MongoClient
 import pytest
-from src.database.mongodb_client import get_db
-from src.database.models import Course
+from database.mongodb_client import get_db
+from database.models import course_document
 
 @pytest.fixture(scope="module")
 def db():
@@ -15,13 +15,10 @@ def test_get_db(db):
 
 def test_course_model(db):
     course_data = {
-        "course_name": "Test Course",
         "subcourses": {},
-        "description": "A course for testing.",
-        "total_modules": 0
+        "description": "A course for testing."
     }
-    course = Course(**course_data)
-    db.courses.insert_one(course.__dict__)
+    db.courses.insert_one(course_document("Test Course", course_data))
 
     retrieved_course = db.courses.find_one({"course_name": "Test Course"})
     assert retrieved_course["course_name"] == "Test Course"
@@ -0,0 +1,53 @@
+from database.invalidation import InProcessBus, PollingBus, create_bus
+
+def test_subscribers_receive_changed_course_ids():
+    received = []
+    bus = InProcessBus()
+    bus.subscribe(lambda owner, version, course_ids: received.append((owner, version, course_ids)))
+
+    bus.publish(None, "main", 1, ["Python"])
+    bus.publish(None, "main", 2, ["SQL", "Python"])
+    bus.publish(None, "main", 2, ["SQL"])
+
+    assert received == [("main", 1, ["Python"]), ("main", 2, ["SQL", "Python"])]
+
+def test_missed_version_invalidates_everything():
+    received = []
+    bus = InProcessBus()
+    bus.subscribe(lambda owner, version, course_ids: received.append((owner, version, course_ids)))
+
+    bus.publish(None, "main", 1, ["Python"])
+    bus.publish(None, "main", 3, ["SQL"])
+
+    assert received[-1] == ("main", 3, None)
+
+def test_versions_are_tracked_per_owner():
+    received = []
+    bus = InProcessBus()
+    bus.subscribe(lambda owner, version, course_ids: received.append((owner, version, course_ids)))
+
+    bus.publish(None, "alice", 1, ["Python"])
+    bus.publish(None, "bob", 1, ["SQL"])
+    bus.publish(None, "alice", 2, ["Go"])
+
+    assert received == [("alice", 1, ["Python"]), ("bob", 1, ["SQL"]), ("alice", 2, ["Go"])]
+
+def test_polling_bus_delivers_changes_published_by_another_instance(mongo_db):
+    received = []
+    writer = PollingBus(lambda: mongo_db)
+    reader = PollingBus(lambda: mongo_db)
+    reader.subscribe(lambda owner, version, course_ids: received.append((owner, version, course_ids)))
+
+    # The first poll only sets the starting point
+    reader.poll()
+    writer.publish(mongo_db, "alice", 1, ["Python"])
+    writer.publish(mongo_db, "alice", 2, ["SQL"])
+    reader.poll()
+    # Records still inside the clock-skew window are read again but not redelivered
+    reader.poll()
+
+    assert received == [("alice", 1, ["Python"]), ("alice", 2, ["SQL"])]
+
+def test_create_bus_picks_the_requested_kind():
+    assert type(create_bus("memory", lambda: None)) is InProcessBus
+    assert type(create_bus("polling", lambda: None)) is PollingBus
@@ -0,0 +1,51 @@
+import copy
+import pytest
+from database.models import ModelError, copy_courses, course_document, validate_course, validate_courses
+
+COURSES = {
+    "Data Science": {
+        "subcourses": {
+            "Python Basics": {"completed": True, "type": "Video", "completion_date": "2024-01-02", "rating": 5},
+            "Statistics": {"completed": False}
+        },
+        "description": "Learn the fundamentals of Data Science.",
+        "_meta": {"created": "2024-01-01T00:00:00", "updated": "2024-01-02T00:00:00"},
+        "tags": ["python"]
+    }
+}
+
+def test_validation_counts_modules_and_leaves_data_unchanged():
+    courses = copy.deepcopy(COURSES)
+    assert validate_courses(courses) is courses
+    assert courses == COURSES
+    assert validate_course("Data Science", courses["Data Science"]) == (2, 1)
+    document = course_document("Data Science", courses["Data Science"])
+    assert (document["course_name"], document["total_modules"], document["completed_modules"]) == ("Data Science", 2, 1)
+
+@pytest.mark.parametrize("name, data", [
+    ("Broken", {"subcourses": {"Intro": {"completed": "yes"}}}),
+    ("Broken", {"subcourses": {"Intro": ["not", "a", "module"]}}),
+    ("Broken", {"subcourses": ["Intro"]}),
+    ("Broken", "not a course"),
+    ("  ", {}),
+])
+def test_invalid_course_is_rejected(name, data):
+    with pytest.raises(ModelError):
+        validate_course(name, data)
+
+def test_copy_is_independent():
+    copied = copy_courses(COURSES)
+    assert copied == COURSES
+    copied["Data Science"]["_meta"]["updated"] = "later"
+    copied["Data Science"]["tags"].append("sql")
+    assert COURSES["Data Science"]["_meta"]["updated"] == "2024-01-02T00:00:00"
+    assert COURSES["Data Science"]["tags"] == ["python"]
+
+def test_copy_adds_no_defaults_and_shares_no_containers():
+    courses = {"A": {"subcourses": {"m": {"notes": ["x"]}}, "description": {"text": "d"}}, "B": {}}
+    copied = copy_courses(courses)
+    assert copied == courses
+    copied["A"]["subcourses"]["m"]["notes"].append("y")
+    copied["A"]["description"]["text"] = "changed"
+    assert courses["A"]["subcourses"]["m"]["notes"] == ["x"]
+    assert courses["A"]["description"] == {"text": "d"}
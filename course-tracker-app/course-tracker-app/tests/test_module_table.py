@@ -0,0 +1,82 @@
+import copy
+from datetime import date
+import pandas as pd
+from utils.module_table import (
+    build_tables, update_tables, build_aggregate_tables, overall_stats, summary_frame, category_counts, module_type_counts, course_timeline
+)
+
+COURSES = {
+    "SQL Basics": {
+        "subcourses": {
+            "Joins": {"completed": True, "type": "Video", "completion_date": "2024-03-01"},
+            "Views": {"completed": False, "type": "Exercise"}
+        },
+        "description": "x" * 60,
+        "_meta": {"updated": "2024-03-01T10:30:00"}
+    },
+    "Python": {"subcourses": {"Intro": {"completed": True}}, "_meta": {"updated": "yesterday"}},
+    "Empty": {"subcourses": {}}
+}
+
+def test_course_statistics_are_grouped_from_the_module_table():
+    tables = build_tables(COURSES)
+    assert len(tables["modules"]) == 3
+    stats = overall_stats(tables)
+    assert (stats["total_modules"], stats["completed_modules"]) == (3, 2)
+    assert (stats["courses_not_started"], stats["courses_in_progress"], stats["courses_completed"]) == (1, 1, 1)
+    assert category_counts(tables).to_dict() == {"Analytics": 1, "Programming": 1, "General": 1}
+    assert module_type_counts(tables, "SQL Basics").to_dict() == {"Video": 1, "Exercise": 1}
+    assert module_type_counts(tables, "Empty").empty
+
+def test_summary_formats_dates_and_descriptions():
+    summary = summary_frame(build_tables(COURSES))
+    assert summary["🕒 Last Updated"].tolist() == ["2024-03-01 10:30", "yesterday", "N/A"]
+    assert summary["📈 Progress"].tolist() == ["50.0%", "100.0%", "0.0%"]
+    assert summary["📝 Description"].tolist() == ["x" * 50 + "...", "No description", "No description"]
+
+def test_aggregate_tables_give_the_same_overview_as_the_module_table():
+    aggregates = {
+        "courses": [
+            {"course": "SQL Basics", "description": "x" * 60, "category": None,
+             "updated": "2024-03-01T10:30:00", "total": 2, "completed": 1},
+            {"course": "Python", "description": None, "category": None, "updated": "yesterday", "total": 1, "completed": 1},
+            {"course": "Empty", "description": None, "category": None, "updated": None, "total": 0, "completed": 0}
+        ],
+        "types": [{"type": "Video", "total": 1, "completed": 1}]
+    }
+    tables = build_aggregate_tables(aggregates)
+    expected = build_tables(COURSES)
+    assert overall_stats(tables) == overall_stats(expected)
+    assert category_counts(tables).to_dict() == category_counts(expected).to_dict()
+    assert summary_frame(tables).equals(summary_frame(expected))
+    assert tables["type_totals"].to_dict("records") == aggregates["types"]
+
+def test_timeline_accumulates_completion_dates_and_downsamples_long_ranges():
+    tables = build_tables(COURSES)
+    week = course_timeline(tables, "SQL Basics", 7, today=date(2024, 3, 4))
+    assert week["Completed"].tolist() == [0, 0, 0, 1, 1, 1, 1]
+    assert week["Progress"].iloc[-1] == 50
+
+    year = course_timeline(tables, "SQL Basics", 365, today=date(2024, 3, 4))
+    assert len(year) <= 60
+    assert str(year["Date"].iloc[-1].date()) == "2024-03-04"
+    assert year["Completed"].iloc[-1] == 1
+
+def test_updating_changed_courses_matches_a_rebuild():
+    tables = build_tables(COURSES)
+    courses = copy.deepcopy(COURSES)
+    courses["SQL Basics"]["subcourses"]["Views"].update(completed=True, type="Quiz", completion_date="2024-03-02")
+    del courses["Python"]
+    courses["Go"] = {"subcourses": {"Tour": {"completed": False, "type": "Lab"}}}
+
+    updated = update_tables(tables, courses, ["SQL Basics", "Python", "Go"])
+    rebuilt = build_tables(courses)
+    pd.testing.assert_frame_equal(updated["courses"], rebuilt["courses"])
+    by_module = ["course", "module"]
+    pd.testing.assert_frame_equal(
+        updated["modules"].astype({"course": str, "type": str}).sort_values(by_module, ignore_index=True),
+        rebuilt["modules"].astype({"course": str, "type": str}).sort_values(by_module, ignore_index=True)
+    )
+    assert list(updated["modules"]["course"].cat.categories) == list(courses)
+    assert module_type_counts(updated, "SQL Basics").to_dict() == {"Video": 1, "Quiz": 1}
+    assert overall_stats(updated) == overall_stats(rebuilt)
@@ -0,0 +1,72 @@
+from pymongo.errors import ServerSelectionTimeoutError
+import pytest
+from database import mongodb_client
+
+class FakeClient:
+    def __init__(self, reachable):
+        self.reachable = reachable
+        self.closed = False
+        self.admin = self
+
+    def command(self, name):
+        if not self.reachable:
+            raise ServerSelectionTimeoutError("no servers")
+        return {"ok": 1}
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mongodb_client.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(mongodb_client, "STORAGE_BACKEND", "mongo")
+    monkeypatch.setattr(mongodb_client, "CIRCUIT_BREAKER_COOLDOWN_SECONDS", 10)
+    monkeypatch.setattr(mongodb_client, "CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS", 30)
+    monkeypatch.setattr(mongodb_client, "_client", None)
+    monkeypatch.setattr(mongodb_client, "_circuit", {"open_until": 0.0, "failures": 0})
+    return now
+
+def test_failed_connection_opens_the_circuit_with_growing_cooldowns(clock, monkeypatch):
+    created = []
+
+    def create_client():
+        created.append(FakeClient(reachable=False))
+        return created[-1]
+
+    monkeypatch.setattr(mongodb_client, "_create_client", create_client)
+
+    assert mongodb_client.get_client() is None
+    assert mongodb_client.is_circuit_open() and created[0].closed
+    assert mongodb_client._circuit["open_until"] - clock[0] == 10
+    # While open, calls fail fast without trying to connect
+    assert mongodb_client.get_client() is None
+    assert len(created) == 1
+
+    for cooldown in (20, 30, 30):
+        clock[0] = mongodb_client._circuit["open_until"]
+        assert mongodb_client.get_client() is None
+        assert mongodb_client._circuit["open_until"] - clock[0] == cooldown
+
+def test_successful_connection_closes_the_circuit_and_is_shared(clock, monkeypatch):
+    clients = iter([FakeClient(reachable=False), FakeClient(reachable=True)])
+    monkeypatch.setattr(mongodb_client, "_create_client", lambda: next(clients))
+
+    assert mongodb_client.get_client() is None
+    clock[0] = mongodb_client._circuit["open_until"]
+    client = mongodb_client.get_client()
+
+    assert client is not None and mongodb_client.get_client() is client
+    assert not mongodb_client.is_circuit_open()
+    assert mongodb_client._circuit["failures"] == 0
+
+def test_connection_errors_during_operations_trip_the_circuit(clock, monkeypatch):
+    client = FakeClient(reachable=True)
+    monkeypatch.setattr(mongodb_client, "_client", client)
+
+    mongodb_client.record_failure(ValueError("bad document"))
+    assert not mongodb_client.is_circuit_open()
+
+    mongodb_client.record_failure(ServerSelectionTimeoutError("no servers"))
+    assert mongodb_client.is_circuit_open()
+    assert client.closed and mongodb_client._client is None
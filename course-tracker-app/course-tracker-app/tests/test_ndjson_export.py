@@ -0,0 +1,49 @@
+import gzip
+import io
+import json
+from database import ndjson_export, normalized_store, streaming_import
+from database.owners import document_id
+
+COURSES = {
+    "SQL": {"subcourses": {"Joins": {"completed": True}, "Views": {"completed": False}}, "description": "Queries"},
+    "Go": {"subcourses": {}}
+}
+
+def test_export_is_a_header_then_one_line_per_course():
+    lines = [json.loads(chunk) for chunk in ndjson_export.iter_ndjson(COURSES.items())]
+
+    assert (lines[0]["type"], lines[0]["export_version"]) == ("export", ndjson_export.EXPORT_VERSION)
+    assert [(line["type"], line["name"], line["data"]) for line in lines[1:]] == [
+        ("course", name, data) for name, data in COURSES.items()
+    ]
+
+def test_export_reads_courses_only_as_it_is_consumed():
+    read = []
+
+    def courses():
+        for item in COURSES.items():
+            read.append(item[0])
+            yield item
+
+    chunks = ndjson_export.iter_ndjson(courses())
+    next(chunks)
+    assert read == []
+    next(chunks)
+    assert read == ["SQL"]
+
+def test_gzip_export_imports_back():
+    output = io.BytesIO()
+    written = ndjson_export.write_stream(ndjson_export.gzip_chunks(ndjson_export.iter_ndjson(COURSES.items()), 16), output)
+
+    assert written == len(output.getvalue())
+    assert gzip.decompress(output.getvalue()).count(b"\n") == len(COURSES) + 1
+    stream, _, _ = streaming_import.open_source(output.getvalue())
+    assert dict(streaming_import.iter_courses(stream)) == COURSES
+
+def test_document_and_normalized_courses_iterate_in_order(mongo_db):
+    mongo_db["courses"].insert_one({"_id": document_id("ana"), "courses": COURSES})
+    normalized_store.save_courses(mongo_db, {}, COURSES, owner="ana")
+
+    assert list(ndjson_export.iter_document_courses(mongo_db, batch_size=1, owner="ana")) == list(COURSES.items())
+    assert list(ndjson_export.iter_normalized_courses(mongo_db, owner="ana")) == list(COURSES.items())
+    assert list(ndjson_export.iter_document_courses(mongo_db, owner="bo")) == []
@@ -0,0 +1,46 @@
+from database import normalized_store
+from database.owners import document_id
+
+def test_migrated_document_is_not_migrated_again(mongo_db):
+    db = mongo_db
+    db["courses"].insert_one({"_id": document_id("ana"), "courses": {
+        "SQL": {"subcourses": {"Joins": {"completed": True}}},
+        "Python": {"subcourses": {}}
+    }})
+    assert normalized_store.migrate_from_main_document(db, "ana") == 2
+    assert db["courses"].find_one({"_id": document_id("ana")})["migrated_to"] == "normalized"
+
+    for name in ("SQL", "Python"):
+        normalized_store.delete_course(db, "ana", name)
+    assert normalized_store.is_empty(db, "ana")
+    # Deleting every course must not bring the legacy copy back on the next start
+    assert normalized_store.migrate_from_main_document(db, "ana") == 0
+    assert normalized_store.is_empty(db, "ana")
+
+COURSES = {
+    "SQL": {"category": "Data", "subcourses": {"Views": {"completed": False}, "Joins": {"completed": True, "type": "Lab"}}},
+    "Python": {"subcourses": {}}
+}
+
+def test_course_documents_rebuild_the_course():
+    course_doc, module_docs = normalized_store.course_documents("ana", "SQL", COURSES["SQL"], 0)
+
+    assert (course_doc["status"], course_doc["total_modules"], course_doc["completed_modules"]) == ("in_progress", 2, 1)
+    assert {doc["course_id"] for doc in module_docs} == {course_doc["_id"]}
+    rebuilt = normalized_store.build_course(course_doc, reversed(module_docs))
+    assert rebuilt == COURSES["SQL"]
+    assert list(rebuilt["subcourses"]) == ["Views", "Joins"]
+
+def test_save_writes_only_the_changes_and_loads_back(mongo_db):
+    db = mongo_db
+    assert normalized_store.save_courses(db, None, COURSES, owner="ana")
+    assert normalized_store.load_courses(db, "ana") == COURSES
+
+    changed = {
+        "SQL": {"category": "Data", "subcourses": {"Views": {"completed": True}}},
+        "Go": {"subcourses": {"Channels": {"completed": False}}}
+    }
+    assert normalized_store.save_courses(db, COURSES, changed, owner="ana")
+    assert normalized_store.load_courses(db, "ana") == changed
+    assert db[normalized_store.COURSE_COLLECTION].find_one({"owner": "ana", "name": "SQL"})["status"] == "completed"
+    assert normalized_store.load_courses(db, "bo") == {}
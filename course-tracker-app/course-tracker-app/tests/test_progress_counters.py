@@ -0,0 +1,58 @@
+from datetime import datetime
+from utils.analytics import count_modules
+from utils.helpers import (
+    add_module, delete_module, set_module_completed, set_all_modules_completed,
+    ensure_progress, calculate_course_stats, calculate_course_progress,
+    get_recent_activities
+)
+
+def test_edits_keep_counters_in_step_with_modules():
+    course = {"subcourses": {}, "_progress": {"total": 0, "completed": 0}}
+    assert add_module(course, "Intro", {"completed": False})
+    assert add_module(course, "Joins", {"completed": True})
+    assert not add_module(course, "Intro", {"completed": True})
+    set_module_completed(course, "Intro", True)
+    set_module_completed(course, "Joins", False)
+    assert "completion_date" not in course["subcourses"]["Joins"]
+    delete_module(course, "Intro")
+    assert course["_progress"] == {"total": 1, "completed": 0}
+
+    set_all_modules_completed(course, True)
+    assert calculate_course_progress(course)["percentage"] == 100
+    total, completed = count_modules(course)
+    assert course["_progress"] == {"total": total, "completed": completed}
+
+def test_marking_all_modules_stamps_only_the_ones_that_changed():
+    done = {"completed": True, "updated": "2024-01-02T09:00:00", "completion_date": "2024-01-02"}
+    course = {"subcourses": {"Intro": dict(done), "Joins": {"completed": False}}}
+    now = datetime(2024, 3, 1, 12, 0)
+
+    assert set_all_modules_completed(course, True, now) == ["Joins"]
+    assert course["subcourses"]["Intro"] == done
+    assert course["subcourses"]["Joins"]["completion_date"] == "2024-03-01"
+    assert set_all_modules_completed(course, True, now) == []
+
+def test_missing_or_stale_counters_are_recounted_on_load():
+    courses = ensure_progress({
+        "Python": {"subcourses": {"Intro": {"completed": True}, "Loops": {"completed": False}}},
+        "SQL": {"subcourses": {"Joins": {"completed": True}}, "_progress": {"total": 5, "completed": 5}}
+    })
+    assert courses["Python"]["_progress"] == {"total": 2, "completed": 1}
+    assert courses["SQL"]["_progress"] == {"total": 1, "completed": 1}
+    assert calculate_course_stats(courses)["completed_modules"] == 2
+
+def test_recent_activities_are_the_latest_completions_in_order():
+    courses = {
+        "SQL": {"subcourses": {
+            "Joins": {"completed": True, "completion_date": "2024-01-02"},
+            "Views": {"completed": True, "completion_date": "2024-01-05"},
+            "Indexes": {"completed": False, "completion_date": "2024-02-01"}
+        }},
+        "Python": {"subcourses": {
+            "Loops": {"completed": True, "updated": "2024-01-05T10:00:00"},
+            "Intro": {"completed": True, "completion_date": "2024-01-05"}
+        }}
+    }
+    activities = get_recent_activities(courses, limit=3)
+    assert [activity["title"] for activity in activities] == ["Completed: Loops", "Completed: Views", "Completed: Intro"]
+    assert activities[0]["course"] == "Python"
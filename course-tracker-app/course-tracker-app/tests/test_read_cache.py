@@ -0,0 +1,69 @@
+import pytest
+import threading
+from database.read_cache import VersionedCache, freeze, thaw
+
+def test_frozen_courses_are_read_only_and_thaw_to_plain_copies():
+    courses = freeze({"Python": {"subcourses": {"Intro": {"completed": True}}, "tags": ["a"]}})
+
+    with pytest.raises(TypeError):
+        courses["SQL"] = {}
+    with pytest.raises(TypeError):
+        courses["Python"]["subcourses"]["Intro"]["completed"] = False
+
+    copy = thaw(courses)
+    copy["Python"]["subcourses"]["Intro"]["completed"] = False
+    assert copy["Python"]["tags"] == ["a"]
+    assert courses["Python"]["subcourses"]["Intro"]["completed"] is True
+
+def test_cache_reloads_only_when_version_changes():
+    state = {"version": 1, "loads": 0}
+
+    def load():
+        state["loads"] += 1
+        return state["version"], {"Python": {"version": state["version"]}}
+
+    cache = VersionedCache()
+    first = cache.get("main", lambda: state["version"], load)
+    assert cache.get("main", lambda: state["version"], load) is first
+    assert state["loads"] == 1
+
+    state["version"] = 2
+    assert cache.get("main", lambda: state["version"], load)["Python"]["version"] == 2
+    assert state["loads"] == 2
+
+    cache.put("main", 3, {"Python": {"version": 3}})
+    state["version"] = 3
+    assert cache.get("main", lambda: state["version"], load)["Python"]["version"] == 3
+    assert state["loads"] == 2
+
+def test_slow_load_of_one_key_does_not_block_others_and_is_shared():
+    release = threading.Event()
+    loads = []
+
+    def slow_load():
+        loads.append("main")
+        release.wait(5)
+        return 1, {"Python": {}}
+
+    cache = VersionedCache()
+    readers = [threading.Thread(target=cache.get, args=("main", lambda: 1, slow_load)) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    # Another owner is served while "main" is still loading
+    assert cache.get("ana", lambda: 1, lambda: (1, {"SQL": {}})) == {"SQL": {}}
+
+    release.set()
+    for reader in readers:
+        reader.join(5)
+    assert loads == ["main"]
+    assert cache.version("main") == 1
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = VersionedCache()
+
+    def load():
+        cache.invalidate("main")
+        return 1, {"Python": {}}
+
+    assert cache.get("main", lambda: 1, load) == {"Python": {}}
+    assert cache.version("main") is None
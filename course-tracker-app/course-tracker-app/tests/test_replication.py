@@ -0,0 +1,83 @@
+from database import replication
+from database.owners import document_id
+from database.sqlite_store import SQLiteStore
+
+def _course(updated, completed=False):
+    return {"subcourses": {"Joins": {"completed": completed}}, "_meta": {"updated": updated}}
+
+def test_operations_cover_changed_added_and_removed_courses():
+    previous = {"SQL": _course("t1"), "Go": _course("t1"), "Same": _course("t1")}
+    courses = {"SQL": _course("t2", True), "Python": _course(None), "Same": _course("t1")}
+    operations = {operation["course_id"]: operation for operation in replication.build_operations(previous, courses, "ana")}
+
+    assert set(operations) == {"SQL", "Python", "Go"}
+    assert (operations["SQL"]["op"], operations["SQL"]["base_updated"]) == ("upsert", "t1")
+    assert operations["SQL"]["payload"] == courses["SQL"]
+    assert operations["Python"]["base_updated"] is None
+    # A new version without its own stamp gets one, so it can be told apart from the base
+    assert replication.course_stamp(operations["Python"]["payload"]) is not None
+    assert "_meta" in courses["Python"] and courses["Python"]["_meta"]["updated"] is None
+    assert (operations["Go"]["op"], operations["Go"]["payload"], operations["Go"]["base_updated"]) == ("delete", None, "t1")
+    assert {operation["owner"] for operation in operations.values()} == {"ana"}
+
+def test_outbox_keeps_one_operation_per_course_with_the_first_base(tmp_path):
+    store = SQLiteStore(str(tmp_path / "courses.db"))
+    first = replication.build_operations({"SQL": _course("t1")}, {"SQL": _course("t2")}, "ana")
+    again = replication.build_operations({"SQL": _course("t2")}, {"SQL": _course("t3", True)}, "ana")
+    store.record_operations(first)
+    store.record_operations(again)
+
+    [pending] = store.pending_operations(10, "ana")
+    assert (pending["op_id"], pending["base_updated"]) == (again[0]["op_id"], "t1")
+    assert pending["payload"] == _course("t3", True)
+    assert store.count_operations("bo") == 0
+
+def test_offline_import_queues_upserts_and_deletes_with_the_imported_courses(tmp_path):
+    store = SQLiteStore(str(tmp_path / "courses.db"))
+    previous = {"SQL": _course("t1"), "Go": _course("t1"), "Same": _course("t1")}
+    store.save_courses(previous, "ana")
+    writer = replication.OutboxImportWriter(store.import_writer("ana"), previous, "ana")
+    for name, data in {"SQL": _course("t2", True), "Same": _course("t1"), "Rust": _course(None)}.items():
+        writer.add(name, data)
+    writer.commit()
+
+    pending = {operation["course_id"]: operation for operation in store.pending_operations(10, "ana")}
+    assert {name: (operation["op"], operation["base_updated"]) for name, operation in pending.items()} == {
+        "SQL": ("upsert", "t1"), "Rust": ("upsert", None), "Go": ("delete", "t1")
+    }
+    # The local copy carries the stamp its operation replays
+    assert store.load_courses("ana")["Rust"] == pending["Rust"]["payload"]
+
+def test_aborted_offline_import_queues_nothing(tmp_path):
+    store = SQLiteStore(str(tmp_path / "courses.db"))
+    store.save_courses({"SQL": _course("t1")}, "ana")
+    writer = replication.OutboxImportWriter(store.import_writer("ana"), {"SQL": _course("t1")}, "ana")
+    writer.add("SQL", _course("t2", True))
+    writer.abort()
+
+    assert store.count_operations("ana") == 0
+    assert store.load_courses("ana") == {"SQL": _course("t1")}
+
+def test_replay_is_retried_safely_after_an_interruption(tmp_path, mongo_db):
+    mongo_db["courses"].insert_one({"_id": document_id("ana"), "courses": {"SQL": _course("t1"), "Go": _course("t1")}})
+    store = SQLiteStore(str(tmp_path / "courses.db"))
+    operations = replication.build_operations(
+        {"SQL": _course("t1"), "Go": _course("t1")}, {"SQL": _course("t2", True)}, "ana"
+    )
+    store.record_operations(operations)
+    # An earlier replay applied these and recorded it, but died before clearing the outbox
+    replication._apply_document(mongo_db, operations, "ana")
+    replication._mark_applied(mongo_db, operations)
+
+    assert replication.replay(mongo_db, store, "document", 10, "ana") == (0, [])
+    assert store.count_operations("ana") == 0
+    assert mongo_db["courses"].find_one({"_id": document_id("ana")})["courses"] == {"SQL": _course("t2", True)}
+
+def test_replay_keeps_the_server_copy_on_conflict(tmp_path, mongo_db):
+    mongo_db["courses"].insert_one({"_id": document_id("ana"), "courses": {"SQL": _course("server")}})
+    store = SQLiteStore(str(tmp_path / "courses.db"))
+    store.record_operations(replication.build_operations({"SQL": _course("t1")}, {"SQL": _course("t2", True)}, "ana"))
+
+    assert replication.replay(mongo_db, store, "document", 10, "ana") == (0, ["SQL"])
+    assert mongo_db["courses"].find_one({"_id": document_id("ana")})["courses"] == {"SQL": _course("server")}
+    assert mongo_db[replication.CONFLICT_COLLECTION].find_one({"course_id": "SQL"})["local"] == _course("t2", True)
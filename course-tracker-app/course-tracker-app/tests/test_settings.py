@@ -0,0 +1,34 @@
+import os
+import pytest
+from config.settings import PROJECT_ROOT, load_settings
+
+NO_ENV_FILE = os.path.join(PROJECT_ROOT, "tests", "missing.env")
+
+def test_settings_read_typed_values_and_legacy_names(monkeypatch):
+    monkeypatch.delenv("MONGODB_URI", raising=False)
+    monkeypatch.setenv("MONGO_URI", "mongodb://db:27017/")
+    monkeypatch.setenv("MONGODB_MAX_POOL_SIZE", "50")
+    monkeypatch.setenv("COURSE_WRITE_BEHIND_SECONDS", "0.5")
+    monkeypatch.setenv("LOCAL_STORE_PATH", "data/test.db")
+
+    settings = load_settings(NO_ENV_FILE)
+    assert settings.mongodb_uri == settings.mongo_uri == "mongodb://db:27017/"
+    assert settings.mongodb_max_pool_size == 50
+    assert settings.write_behind_seconds == 0.5
+    assert settings.local_store_path == os.path.join(PROJECT_ROOT, "data", "test.db")
+
+def test_invalid_setting_names_the_variable(monkeypatch):
+    monkeypatch.setenv("MODULE_PAGE_SIZE", "many")
+    with pytest.raises(ValueError, match="MODULE_PAGE_SIZE"):
+        load_settings(NO_ENV_FILE)
+
+@pytest.mark.parametrize("variable, value", [
+    ("COURSE_STORAGE_MODE", "Normalized"),
+    ("COURSE_STORAGE_BACKEND", "mongodb"),
+    ("COURSE_STATS_MODE", "database"),
+    ("COURSE_INVALIDATION_BUS", "redis"),
+])
+def test_unknown_choice_is_rejected(monkeypatch, variable, value):
+    monkeypatch.setenv(variable, value)
+    with pytest.raises(ValueError, match=variable):
+        load_settings(NO_ENV_FILE)
@@ -0,0 +1,54 @@
+import sqlite3
+from database.sqlite_store import SQLiteStore
+
+COURSES = {
+    "SQL": {
+        "subcourses": {"Joins": {"completed": True, "type": "Video"}, "Views": {"completed": False}},
+        "description": "Queries",
+        "_meta": {"updated": "2024-03-01T10:30:00"}
+    },
+    "Python": {"subcourses": {}, "category": "Programming"}
+}
+
+def test_courses_round_trip_per_owner_in_order(tmp_path):
+    path = str(tmp_path / "courses.db")
+    store = SQLiteStore(path)
+    store.save_courses(COURSES, "ana")
+    store.save_courses({"Go": {"subcourses": {}}}, "bo")
+
+    courses = SQLiteStore(path).load_courses("ana")
+    assert courses == COURSES and list(courses) == ["SQL", "Python"]
+    assert list(SQLiteStore(path).load_courses("bo")) == ["Go"]
+
+def test_save_writes_only_changes_and_removals(tmp_path):
+    path = str(tmp_path / "courses.db")
+    store = SQLiteStore(path)
+    store.save_courses(COURSES, "ana")
+    edited = {"SQL": {**COURSES["SQL"], "subcourses": {"Joins": {"completed": False, "type": "Video"}}}}
+    store.save_courses(edited, "ana")
+
+    assert SQLiteStore(path).load_courses("ana") == edited
+    assert store.course_aggregates("ana")["courses"] == [{
+        "course": "SQL", "description": "Queries", "category": None,
+        "updated": "2024-03-01T10:30:00", "total": 1, "completed": 0
+    }]
+
+def test_connections_use_wal_journal(tmp_path):
+    path = str(tmp_path / "courses.db")
+    store = SQLiteStore(path)
+    assert store._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # WAL is a property of the database file, seen by every later connection
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_workspace_membership_is_granted_and_revoked_per_user(tmp_path):
+    store = SQLiteStore(str(tmp_path / "courses.db"))
+    assert not store.is_workspace_member("team", "ana@example.com")
+
+    store.add_workspace_member("team", "ana@example.com")
+    store.add_workspace_member("team", "ana@example.com")
+    assert store.is_workspace_member("team", "ana@example.com")
+    assert not store.is_workspace_member("team", "bo@example.com")
+    assert not store.is_workspace_member("other", "ana@example.com")
+
+    store.remove_workspace_member("team", "ana@example.com")
+    assert not store.is_workspace_member("team", "ana@example.com")
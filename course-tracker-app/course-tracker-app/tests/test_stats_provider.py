@@ -0,0 +1,34 @@
+import time
+from database.owners import document_id
+from database.stats_provider import StatsProvider, collect_owner_stats
+
+def test_stale_stats_are_served_while_refreshing_in_background():
+    calls = []
+
+    def collect():
+        calls.append(len(calls) + 1)
+        return {"collected": len(calls)}
+
+    provider = StatsProvider(collect, ttl_seconds=0.05)
+    assert provider.get() == {"collected": 1}
+    assert provider.get() == {"collected": 1}
+
+    time.sleep(0.1)
+    # Stale: the cached value comes back immediately and a refresh starts
+    assert provider.get() == {"collected": 1}
+    for _ in range(50):
+        if provider.get() == {"collected": 2}:
+            break
+        time.sleep(0.01)
+    assert provider.get() == {"collected": 2}
+
+def test_owner_stats_measure_only_that_owners_data(mongo_db):
+    mongo_db["courses"].insert_many([
+        {"_id": document_id("ana"), "owner": "ana", "courses": {"SQL": {}}, "summary": {"totals": {"courses": 1}}},
+        {"_id": document_id("bo"), "owner": "bo", "courses": {"Go": {"notes": "x" * 1000}}}
+    ])
+    mongo_db["courses_backup"].insert_many([{"owner": "ana"}, {"owner": "bo"}, {"owner": "bo"}])
+
+    stats = collect_owner_stats(mongo_db, "ana")
+    assert (stats["owner_courses"], stats["owner_backups"]) == (1, 1)
+    assert 0 < stats["main_document_size"] < collect_owner_stats(mongo_db, "bo")["main_document_size"]
@@ -0,0 +1,89 @@
+import gzip
+import json
+import pytest
+from database import streaming_import, normalized_store
+from database.owners import document_id
+from database.sqlite_store import SQLiteStore
+
+COURSES = {
+    "SQL": {"subcourses": {"Joins": {"completed": True}, "Views": {"completed": False}}, "description": "Queries"},
+    "v1.0 \u00e9t\u00e9": {"subcourses": {}}
+}
+
+def _ndjson(courses):
+    lines = [{"type": "export", "exported_at": "2024-03-01"}]
+    lines += [{"type": "course", "name": name, "data": data} for name, data in courses.items()]
+    return "\n".join(json.dumps(line) for line in lines) + "\n"
+
+PAYLOADS = {
+    "legacy minified": json.dumps({"exported_at": "2024-03-01", "courses": COURSES}),
+    "legacy indented": json.dumps({"exported_at": "2024-03-01", "courses": COURSES}, indent=2),
+    "legacy gzip": gzip.compress(json.dumps({"exported_at": "2024-03-01", "courses": COURSES}).encode("utf-8")),
+    "ndjson": _ndjson(COURSES),
+    "ndjson gzip": gzip.compress(_ndjson(COURSES).encode("utf-8")),
+}
+
+@pytest.mark.parametrize("payload", PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_every_export_format_yields_the_courses_and_metadata(payload):
+    stream, total, _ = streaming_import.open_source(payload)
+    metadata = {}
+    assert dict(streaming_import.iter_courses(stream, metadata)) == COURSES
+    assert metadata == {"exported_at": "2024-03-01"}
+    assert total == len(payload if isinstance(payload, bytes) else payload.encode("utf-8"))
+
+@pytest.mark.parametrize("payload, message", [
+    ('{"exported_at": "2024-03-01"}', "missing 'courses'"),
+    ('{"courses": {"SQL": {"subcourses": {"Joins": {"completed": "yes"}}}}}', "non-boolean"),
+    ('{"courses": {"SQL": {"subcourses": []}}}', "invalid 'subcourses'"),
+    ('{"courses": {"SQL": ', "Invalid JSON"),
+    ('{"type": "export"}\n{"type": "course", "name": "SQL", "data": {}}\nnot json\n', "line 3"),
+    ('{"type": "course", "name": "", "data": {}}\n', "Invalid course name"),
+    ('{"type": "export"}\n[1, 2]\n', "Line 2 is not a JSON object"),
+])
+def test_invalid_imports_are_rejected_and_leave_stored_courses_alone(tmp_path, payload, message):
+    store = SQLiteStore(str(tmp_path / "courses.db"))
+    store.save_courses({"Kept": {"subcourses": {}}}, "ana")
+    stream, _, _ = streaming_import.open_source(payload)
+
+    with pytest.raises(streaming_import.ImportFormatError, match=message):
+        streaming_import.import_courses(stream, store.import_writer("ana"))
+    assert SQLiteStore(store.path).load_courses("ana") == {"Kept": {"subcourses": {}}}
+
+def test_valid_import_replaces_the_owners_courses(tmp_path):
+    store = SQLiteStore(str(tmp_path / "courses.db"))
+    store.save_courses({"Kept": {"subcourses": {}}}, "ana")
+    stream, _, _ = streaming_import.open_source(PAYLOADS["ndjson"])
+
+    imported, metadata = streaming_import.import_courses(stream, store.import_writer("ana"))
+    assert (imported, metadata) == (2, {"exported_at": "2024-03-01"})
+    loaded = SQLiteStore(store.path).load_courses("ana")
+    assert list(loaded) == list(COURSES)
+    assert loaded["SQL"]["subcourses"] == COURSES["SQL"]["subcourses"]
+
+def _import(db, writer_class, courses, owner="ana"):
+    stream, _, _ = streaming_import.open_source(json.dumps({"courses": courses}))
+    return streaming_import.import_courses(stream, writer_class(db, 2, owner))[0]
+
+def test_document_import_builds_the_owner_document_from_staged_courses(mongo_db):
+    mongo_db["courses"].insert_one({"_id": document_id("ana"), "version": 4, "courses": {"Old": {"subcourses": {}}}})
+    courses = {f"Course {i}": {"subcourses": {"Intro": {"completed": i % 2 == 0}}} for i in range(5)}
+    courses["v1.0 notes"] = {"subcourses": {}}
+
+    assert _import(mongo_db, streaming_import.DocumentImportWriter, courses) == 6
+    doc = mongo_db["courses"].find_one({"_id": document_id("ana")})
+    assert doc["courses"] == courses and list(doc["courses"]) == list(courses)
+    assert doc["version"] == 5
+    assert "courses_import" + streaming_import._staging_suffix("ana") not in mongo_db.list_collection_names()
+
+def test_normalized_import_replaces_only_the_owners_courses(mongo_db):
+    old = {"Old": {"subcourses": {"Gone": {"completed": True}}}, "Kept": {"subcourses": {"Intro": {"completed": False}}}}
+    normalized_store.save_courses(mongo_db, None, old, "ana")
+    normalized_store.save_courses(mongo_db, None, {"Other": {"subcourses": {}}}, "bo")
+
+    new = {"Kept": {"subcourses": {"Intro": {"completed": True}}}, "New": {"subcourses": {}}}
+    assert _import(mongo_db, streaming_import.NormalizedImportWriter, new) == 2
+    loaded = normalized_store.load_courses(mongo_db, "ana")
+    assert {name: {m: d["completed"] for m, d in c["subcourses"].items()} for name, c in loaded.items()} == {
+        "Kept": {"Intro": True}, "New": {}
+    }
+    assert list(normalized_store.load_courses(mongo_db, "bo")) == ["Other"]
@@ -1,5 +1,5 @@
 import pytest
-from src.utils.helpers import format_course_data, calculate_progress_percentage
+from utils.helpers import format_course_data, calculate_progress_percentage
 
 def test_format_course_data():
     course_data = {
@@ -0,0 +1,93 @@
+import time
+from database.write_behind import WriteBehindQueue, SessionWatcher
+
+def test_saves_within_window_are_coalesced():
+    writes = []
+    queue = WriteBehindQueue(lambda key, state: writes.append((key, state)) or True, delay_seconds=0.2)
+
+    for value in range(5):
+        queue.submit("main", {"version": value})
+    assert queue.status()["state"] == "pending"
+
+    assert queue.flush(timeout=2)
+    assert writes == [("main", {"version": 4})]
+    assert queue.status()["state"] == "saved"
+    queue.stop()
+
+def test_failed_write_reports_error():
+    queue = WriteBehindQueue(lambda key, state: False, delay_seconds=0.01, retry_seconds=60)
+
+    try:
+        queue.submit("main", {"version": 1})
+        assert not queue.flush(timeout=2)
+
+        status = queue.status()
+        assert status["state"] == "error"
+        assert status["pending_writes"] == 1
+    finally:
+        queue.stop()
+
+def test_flush_and_status_per_key():
+    writes = []
+    queue = WriteBehindQueue(lambda key, state: writes.append(key) or True, delay_seconds=60)
+
+    queue.submit("alice", {"version": 1})
+    queue.submit("bob", {"version": 1})
+    assert queue.flush(timeout=2, key="alice")
+
+    assert writes == ["alice"]
+    assert queue.status("alice")["pending_writes"] == 0
+    assert queue.status("bob")["state"] == "pending"
+    queue.stop()
+
+def test_errors_and_last_save_are_reported_per_key():
+    queue = WriteBehindQueue(lambda key, state: key != "bob", delay_seconds=0.01, retry_seconds=60)
+
+    queue.submit("alice", {"version": 1})
+    queue.submit("bob", {"version": 1})
+    assert queue.flush(timeout=2, key="alice")
+    assert not queue.flush(timeout=2, key="bob")
+
+    assert queue.status("alice")["state"] == "saved"
+    assert queue.status("alice")["last_saved"] is not None
+    assert queue.status("bob")["state"] == "error"
+    assert queue.status("bob")["last_saved"] is None
+    assert queue.status()["state"] == "error"
+    queue.stop()
+
+def test_flushing_one_key_ignores_failures_of_other_keys():
+    def write(key, state):
+        time.sleep(0.05)
+        return key != "bob"
+
+    queue = WriteBehindQueue(write, delay_seconds=60, retry_seconds=60)
+    try:
+        queue.submit("bob", {"version": 1})
+        queue.submit("alice", {"version": 1})
+        queue.write_now("bob")
+        # bob's write fails while alice's flush waits behind it
+        assert queue.flush(timeout=2, key="alice")
+        assert queue.status("alice")["state"] == "saved"
+    finally:
+        queue.stop()
+
+def test_closed_session_writes_its_saves_without_waiting():
+    writes = []
+    queue = WriteBehindQueue(lambda key, state: writes.append(key) or True, delay_seconds=60)
+    active = {"s1", "s2"}
+    watcher = SessionWatcher(lambda session_id: session_id in active, queue.write_now, interval_seconds=60)
+
+    queue.submit("alice", {"version": 1})
+    queue.submit("bob", {"version": 1})
+    watcher.watch("s1", "alice")
+    watcher.watch("s2", "bob")
+    assert watcher.check() == 0
+
+    active.discard("s1")
+    assert watcher.check() == 1
+    deadline = time.monotonic() + 2
+    while not writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writes == ["alice"]
+    assert queue.status("bob")["state"] == "pending"
+    queue.stop()